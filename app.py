@@ -1,20 +1,162 @@
-from fastapi import FastAPI, Request
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import HTMLResponse, RedirectResponse
 from uvicorn import run as app_run
 
-from typing import Optional
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
 
 # Importing constants and pipeline modules from the project
-from src.constants import APP_HOST, APP_PORT
-from src.pipline.prediction_pipeline import VehicleData, VehicleDataClassifier
-from src.pipline.training_pipeline import TrainPipeline
+from src.constants import (APP_HOST, APP_PORT, APP_TRAINING_ENABLED, PREDICTION_BATCH_MAX_RECORDS,
+                           PREDICTION_BULK_MAX_BYTES)
+from src.entity.config_entity import VehiclePredictorConfig
+from src.logger import logging
+from src.metrics import (CONTENT_TYPE_LATEST, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT, HTTP_REQUESTS_TOTAL,
+                         PREDICTION_ERRORS_TOTAL, STAGE_SECONDS, registry)
+from src.pipline.batch_scheduler import MicroBatchScheduler
+from src.pipline.columnar_codec import (NotAcceptableError, RequestTooLargeError, UnprocessableColumnsError,
+                                        UnsupportedMediaTypeError, negotiate_response_media_type, request_media_type,
+                                        score_columnar_request)
+from src.pipline.inference_executor import InferenceOverloadedError, inference_executor
+from src.pipline.model_cache import model_cache
+from src.pipline.prediction_cache import prediction_cache
+from src.pipline.prediction_pipeline import (VehicleData, predict_records, predict_records_with_probabilities,
+                                             score_vehicle_csv_chunk)
+from src.pipline.shadow_scorer import shadow_scorer
+from src.pipline.training_job import TrainingJobConflictError, training_job_runner
+
+
+def warm_model_cache() -> None:
+    """
+    Loads the production model into the process-wide cache.
+    Failures are logged only, the next prediction request retries the load.
+    """
+    try:
+        model_cache.get_model()
+    except Exception as e:
+        logging.error(f"Model warm-up failed: {e}")
+
+
+# Collects concurrent single-row predictions into one vectorized model call on the inference pool
+prediction_scheduler = MicroBatchScheduler(predict_fn=predict_records, executor=inference_executor)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the model in the background so the server accepts connections right away,
+    # requests arriving before the load finishes wait on the same in-flight load
+    asyncio.get_running_loop().run_in_executor(None, warm_model_cache)
+    # picks up models promoted by the model pusher while the server runs
+    model_cache.start_refresher()
+    if VehiclePredictorConfig().micro_batch_enabled:
+        await prediction_scheduler.start()
+    if shadow_scorer.enabled:
+        shadow_scorer.start()
+    yield
+    await prediction_scheduler.stop()
+    shadow_scorer.stop()
+    model_cache.stop_refresher()
+    inference_executor.shutdown()
+    training_job_runner.shutdown()
+
+
+def overload_response(e: Exception) -> Optional[JSONResponse]:
+    """
+    Maps a full inference queue to 503 and an inference timeout to 504.
+    """
+    if isinstance(e, InferenceOverloadedError):
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=503)
+    if isinstance(e, TimeoutError):
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=504)
+    return None
+
+async def read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Reads the request body, refusing it as soon as it is known to exceed max_bytes: from the
+    Content-Length header before anything is read, or while streaming a chunked body.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and int(content_length) > max_bytes:
+        raise RequestTooLargeError(f"Request body of {content_length} bytes exceeds the limit of {max_bytes} bytes")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise RequestTooLargeError(f"Request body exceeds the limit of {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def record_prediction_error(route: str, e: Exception) -> None:
+    PREDICTION_ERRORS_TOTAL.inc(route, type(e).__name__)
+
+async def submit_shadow_scoring(route: str, records, predictions) -> None:
+    # runs on the event loop once the response is sent, the hand-over itself never blocks
+    shadow_scorer.submit(route, records, predictions)
+
+def shadow_task(route: str, records, predictions) -> Optional[BackgroundTask]:
+    """
+    Background task scoring the request with the challenger model after the response went out.
+    """
+    if not shadow_scorer.enabled:
+        return None
+    return BackgroundTask(submit_shadow_scoring, route, records, predictions)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware recording request counts, latency and requests in flight.
+    Requests are labelled with the matched route template, not the raw path, to keep the
+    number of series bounded.
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # the router stores the matched route in the shared scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route_path)
+            HTTP_REQUESTS_TOTAL.inc(route_path, scope["method"], str(status_code))
+
+
+# Queue depths already tracked by the scheduler and the executor
+registry.callback_gauge("inference_executor_pending_jobs", "Inference jobs running or waiting for a worker",
+                        lambda: inference_executor.stats()["pending"])
+registry.callback_gauge("prediction_scheduler_queued_requests", "Requests waiting to join a micro-batch",
+                        lambda: prediction_scheduler.stats()["queued"])
 
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount the 'static' directory for serving static files (like CSS)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -34,6 +176,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record metrics outermost so CORS handling is part of the measured request time
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """
+    Same 422 body as FastAPI's default handler without the rejected input values, NaN and
+    Infinity are rejected precisely because JSON responses cannot carry them.
+    """
+    errors = [{key: value for key, value in error.items() if key != "input"} for error in exc.errors()]
+    return JSONResponse({"detail": jsonable_encoder(errors)}, status_code=422)
+
 class DataForm:
     """
     DataForm class to handle and process incoming form data.
@@ -72,6 +226,33 @@ class DataForm:
         self.Vehicle_Age_gt_2_Years = form.get("Vehicle_Age_gt_2_Years")
         self.Vehicle_Damage_Yes = form.get("Vehicle_Damage_Yes")
 
+class VehicleDataRecord(BaseModel):
+    """
+    One vehicle record of a JSON batch prediction request.
+    """
+    # NaN and Infinity are valid JSON for the parser but not valid vehicle values
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    Gender: int
+    Age: int
+    Driving_License: int
+    Region_Code: float
+    Previously_Insured: int
+    Annual_Premium: float
+    Policy_Sales_Channel: float
+    Vintage: int
+    Vehicle_Age_lt_1_Year: int
+    Vehicle_Age_gt_2_Years: int
+    Vehicle_Damage_Yes: int
+
+
+class BatchPredictionRequest(BaseModel):
+    """
+    JSON body of POST /predict/batch.
+    """
+    records: List[VehicleDataRecord] = Field(..., min_length=1, max_length=PREDICTION_BATCH_MAX_RECORDS)
+    return_probabilities: bool = False
+
 # Route to render the main page with the form
 @app.get("/", tags=["authentication"])
 async def index(request: Request):
@@ -79,21 +260,74 @@ async def index(request: Request):
     Renders the main HTML form page for vehicle data input.
     """
     return templates.TemplateResponse(
-            "vehicledata.html",{"request": request, "context": "Rendering"})
+            request, "vehicledata.html", {"context": "Rendering"})
+
+# Readiness probe, reports ready once the production model is warm in the cache
+@app.get("/health/ready")
+async def readinessRouteClient():
+    """
+    Returns 200 when the model is loaded and 503 while it is still loading.
+    """
+    status = model_cache.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+# Achieved batch sizes of the micro-batch scheduler
+@app.get("/predict/stats")
+async def predictionStatsRouteClient():
+    """
+    Returns the counters of the micro-batch scheduler, the inference executor, the prediction cache
+    and the shadow scorer.
+    """
+    return {"scheduler": prediction_scheduler.stats(), "executor": inference_executor.stats(),
+            "cache": prediction_cache.stats(), "shadow": shadow_scorer.stats()}
+
+# Champion and challenger predictions collected by shadow scoring
+@app.get("/predict/shadow")
+async def shadowResultsRouteClient(limit: int = 1000, drain: bool = False):
+    """
+    Returns the shadow scoring counters and up to `limit` buffered champion/challenger comparisons,
+    oldest first. With drain=true the returned comparisons are removed from the buffer.
+    """
+    return {"stats": shadow_scorer.stats(), "results": shadow_scorer.results(limit=max(0, limit), drain=drain)}
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metricsRouteClient():
+    """
+    Returns the serving metrics in the Prometheus text format. Under the prefork server the
+    series of every worker are returned, labelled with their worker index, see src/metrics.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE_LATEST)
 
 # Route to trigger the model training process
 @app.get("/train")
 async def trainRouteClient():
     """
-    Endpoint to initiate the model training pipeline.
+    Endpoint to start the model training pipeline as a background job.
+    Training runs in its own process, poll /train/{job_id} for its progress.
     """
+    if not APP_TRAINING_ENABLED:
+        return JSONResponse({"status": False, "error": "Training is disabled on this server"}, status_code=403)
     try:
-        train_pipeline = TrainPipeline()
-        train_pipeline.run_pipeline()
-        return Response("Training successful!!!")
+        job = await run_in_threadpool(training_job_runner.submit)
+        return JSONResponse({"job_id": job["job_id"], "status": job["status"],
+                             "status_url": f"/train/{job['job_id']}"}, status_code=202)
 
+    except TrainingJobConflictError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=409)
     except Exception as e:
-        return Response(f"Error Occurred! {e}")
+        return JSONResponse({"status": False, "error": f"Error Occurred! {e}"}, status_code=500)
+
+# Route to report the progress of a training job
+@app.get("/train/{job_id}")
+async def trainStatusRouteClient(job_id: str):
+    """
+    Returns the status, current stage and per-stage timings of a training job.
+    """
+    job = training_job_runner.get(job_id)
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown training job {job_id}"}, status_code=404)
+    return job
 
 # Route to handle form submission and make predictions
 @app.post("/")
@@ -103,7 +337,8 @@ async def predictRouteClient(request: Request):
     """
     try:
         form = DataForm(request)
-        await form.get_vehicle_data()
+        with STAGE_SECONDS.time("form_parse"):
+            await form.get_vehicle_data()
         
         vehicle_data = VehicleData(
                                 Gender= form.Gender,
@@ -119,26 +354,138 @@ async def predictRouteClient(request: Request):
                                 Vehicle_Damage_Yes = form.Vehicle_Damage_Yes
                                 )
 
-        # Convert form data into a DataFrame for the model
-        vehicle_df = vehicle_data.get_vehicle_input_data_frame()
-
-        # Initialize the prediction pipeline
-        model_predictor = VehicleDataClassifier()
+        # Validate the form data into a compact record, no DataFrame is built on this path
+        with STAGE_SECONDS.time("record_build"):
+            vehicle_record = vehicle_data.get_vehicle_record()
 
-        # Make a prediction and retrieve the result
-        value = model_predictor.predict(dataframe=vehicle_df)[0]
+        if prediction_scheduler.is_running:
+            # Let the scheduler batch this row with other concurrent requests
+            value = await prediction_scheduler.submit(vehicle_record)
+        else:
+            # Make a prediction on the inference pool and retrieve the result
+            value = (await inference_executor.run(predict_records, [vehicle_record]))[0]
 
         # Interpret the prediction result as 'Response-Yes' or 'Response-No'
         status = "Response-Yes" if value == 1 else "Response-No"
 
         # Render the same HTML page with the prediction result
-        return templates.TemplateResponse(
-            "vehicledata.html",
-            {"request": request, "context": status},
-        )
+        with STAGE_SECONDS.time("template_render"):
+            return templates.TemplateResponse(
+                request,
+                "vehicledata.html",
+                {"context": status},
+                background=shadow_task("/", [vehicle_record], [value]),
+            )
         
     except Exception as e:
-        return {"status": False, "error": f"{e}"}
+        record_prediction_error("/", e)
+        return overload_response(e) or {"status": False, "error": f"{e}"}
+
+# Route to score many vehicle records with one vectorized model call
+@app.post("/predict/batch")
+async def batchPredictRouteClient(batch: BatchPredictionRequest):
+    """
+    Endpoint to receive a JSON batch of vehicle records and return one prediction per record.
+    """
+    try:
+        # The validated request models go straight into the feature matrix, no DataFrame is built
+        # Score on the inference pool so the event loop keeps serving other connections
+        if batch.return_probabilities:
+            values, probabilities = await inference_executor.run(predict_records_with_probabilities, batch.records)
+        else:
+            values, probabilities = await inference_executor.run(predict_records, batch.records), None
+
+        response = {
+            "predictions": [int(value) for value in values],
+            "labels": ["Response-Yes" if value == 1 else "Response-No" for value in values],
+        }
+        if probabilities is not None:
+            response["probabilities"] = probabilities.tolist()
+        return JSONResponse(response, background=shadow_task("/predict/batch", batch.records, values))
+
+    except Exception as e:
+        record_prediction_error("/predict/batch", e)
+        return overload_response(e) or JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+# Route to score bulk service-to-service traffic in a binary columnar format
+@app.post("/predict/bulk")
+async def bulkPredictRouteClient(request: Request, return_probabilities: bool = False):
+    """
+    Endpoint to receive vehicle records as Arrow IPC record batches or msgpack columns and return
+    one prediction per record. The Content-Type header selects the request codec, the Accept header
+    the response codec (Arrow, msgpack or JSON), by default the response uses the request's format.
+    """
+    try:
+        request_type = request_media_type(request.headers.get("content-type"))
+        response_type = negotiate_response_media_type(request.headers.get("accept"), request_type)
+        body = await read_limited_body(request, PREDICTION_BULK_MAX_BYTES)
+        # decoding, scoring and encoding all run on the inference pool
+        content = await inference_executor.run(score_columnar_request, body, request_type, response_type,
+                                               return_probabilities)
+        return Response(content, media_type=response_type)
+
+    except RequestTooLargeError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=413)
+    except UnsupportedMediaTypeError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=415)
+    except NotAcceptableError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=406)
+    except UnprocessableColumnsError as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=422)
+    except ValueError as e:
+        # a body that cannot be decoded or lacks columns, model failures arrive as MyException
+        record_prediction_error("/predict/bulk", e)
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=400)
+    except Exception as e:
+        record_prediction_error("/predict/bulk", e)
+        return overload_response(e) or JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+# Route to score a large CSV upload chunk by chunk and stream the scored rows back
+@app.post("/predict/csv")
+async def csvPredictRouteClient(file: UploadFile = File(...)):
+    """
+    Endpoint to receive a CSV file of raw or encoded vehicle records and stream it back with a
+    prediction and an error column: rows with missing ("na", empty) or invalid values are not
+    scored, their error column names the offending columns instead. The upload is spooled to
+    disk and parsed, scored and written out in chunks of csv_chunk_size rows, so memory use
+    does not grow with the file size.
+    """
+    try:
+        reader = pd.read_csv(file.file, chunksize=VehiclePredictorConfig().csv_chunk_size)
+        # Score the first chunk before answering so a malformed file still gets a proper error status
+        first_chunk = await run_in_threadpool(next, reader, None)
+        if first_chunk is None:
+            return JSONResponse({"status": False, "error": "Uploaded CSV file is empty"}, status_code=400)
+        first_scored = await inference_executor.run(score_vehicle_csv_chunk, first_chunk, True)
+    except ValueError as e:
+        # not a CSV file or vehicle columns missing, pandas parser errors are ValueErrors too
+        record_prediction_error("/predict/csv", e)
+        await file.close()
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=400)
+    except Exception as e:
+        record_prediction_error("/predict/csv", e)
+        await file.close()
+        return overload_response(e) or JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+
+    async def scored_chunks():
+        try:
+            yield first_scored
+            while True:
+                chunk = await run_in_threadpool(next, reader, None)
+                if chunk is None:
+                    break
+                yield await inference_executor.run(score_vehicle_csv_chunk, chunk, False)
+        except Exception as e:
+            # the status line is already sent, abort the stream so the client sees a truncated response
+            record_prediction_error("/predict/csv", e)
+            logging.error(f"Streaming CSV scoring failed: {e}")
+            raise
+        finally:
+            reader.close()
+            await file.close()
+
+    return StreamingResponse(scored_chunks(), media_type="text/csv",
+                             headers={"Content-Disposition": f'attachment; filename="scored_{file.filename}"'})
 
 # Main entry point to start the FastAPI server
 if __name__ == "__main__":
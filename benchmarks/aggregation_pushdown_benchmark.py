@@ -0,0 +1,120 @@
+"""
+Equivalence and cost of the MongoDB aggregation pushdown against the pandas path.
+
+Loads a synthetic vehicle collection into a scratch database of a (local) mongod, exports it
+both ways and checks that the encoded export equals the raw export after the DataTransformation
+encodings. Reports, per path, the wall time, the client CPU time and the bytes the server sent
+(from serverStatus network.bytesOut, so run it against a mongod nobody else is using).
+
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/aggregation_pushdown_benchmark.py
+    python benchmarks/aggregation_pushdown_benchmark.py --url mongodb://localhost:27017 --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from src.components.data_transformation import DataTransformation
+from src.configuration.mongo_db_connection import MongoDBClient
+from src.constants import TARGET_COLUMN
+from src.data_access.proj1_data import Proj1Data
+from src.utils.main_utils import apply_schema_dtypes
+
+SCRATCH_DATABASE_NAME = "pushdown_benchmark"
+SCRATCH_COLLECTION_NAME = "vehicles"
+
+
+def synthetic_documents(n_rows: int, seed: int = 0):
+    """Raw documents as uploaded from the vehicle insurance CSV, with a few "na" values."""
+    rng = np.random.default_rng(seed)
+    vehicle_ages = np.array(["< 1 Year", "1-2 Year", "> 2 Years"])
+    columns = {
+        "id": np.arange(1, n_rows + 1),
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 86, n_rows),
+        "Driving_License": (rng.random(n_rows) < 0.998).astype(np.int64),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(np.float64),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": vehicle_ages[rng.choice(3, n_rows, p=[0.43, 0.52, 0.05])],
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": np.round(2630 + rng.lognormal(10.2, 0.6, n_rows)),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(np.float64),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": (rng.random(n_rows) < 0.12).astype(np.int64),
+    }
+    documents = pd.DataFrame(columns).astype(object).to_dict("records")
+    for index in rng.choice(n_rows, max(1, n_rows // 1000), replace=False):
+        documents[index]["Annual_Premium"] = "na"
+    return documents
+
+
+def pandas_encoded(frame: pd.DataFrame) -> pd.DataFrame:
+    """The raw export after the encodings DataTransformation applies."""
+    transformation = DataTransformation.__new__(DataTransformation)
+    transformation._schema_config = {"drop_columns": "_id"}
+    features = frame.drop(columns=[TARGET_COLUMN])
+    features = transformation._map_gender_column(features)
+    features = transformation._drop_id_column(features)
+    features = transformation._create_dummy_columns(features)
+    return transformation._rename_columns(features)
+
+
+def export(proj1_data: Proj1Data, database, pushdown: bool, batch_size: int):
+    bytes_before = database.client.admin.command("serverStatus")["network"]["bytesOut"]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    frame = pd.concat(proj1_data.iter_collection_chunks(SCRATCH_COLLECTION_NAME, database_name=SCRATCH_DATABASE_NAME,
+                                                        batch_size=batch_size, sort_key="_id", pushdown=pushdown),
+                      ignore_index=True)
+    frame = apply_schema_dtypes(frame)
+    wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    bytes_out = database.client.admin.command("serverStatus")["network"]["bytesOut"] - bytes_before
+    return frame, wall_seconds, cpu_seconds, bytes_out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="MongoDB connection string, MONGODB_URL when omitted")
+    parser.add_argument("--rows", type=int, default=381109)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch collection for the next run")
+    args = parser.parse_args()
+
+    mongo_client = MongoDBClient(database_name=SCRATCH_DATABASE_NAME, mongo_db_url=args.url)
+    collection = mongo_client.database[SCRATCH_COLLECTION_NAME]
+    if collection.estimated_document_count() != args.rows:
+        collection.drop()
+        documents = synthetic_documents(args.rows)
+        for start in range(0, len(documents), 50000):
+            collection.insert_many(documents[start:start + 50000], ordered=False)
+    proj1_data = Proj1Data(mongo_client=mongo_client)
+
+    try:
+        raw, raw_wall, raw_cpu, raw_bytes = export(proj1_data, mongo_client.database, False, args.batch_size)
+        encoded, encoded_wall, encoded_cpu, encoded_bytes = export(proj1_data, mongo_client.database, True,
+                                                                   args.batch_size)
+        expected = pandas_encoded(raw).astype(np.float64)
+        actual = encoded.drop(columns=["_id", TARGET_COLUMN]).astype(np.float64)
+        if list(expected.columns) != list(actual.columns) or not expected.equals(actual) \
+                or not raw[TARGET_COLUMN].equals(encoded[TARGET_COLUMN]):
+            sys.exit("pushdown export differs from the pandas path")
+        print(f"{args.rows} documents, exports equal after encoding")
+        print(f"{'path':>9} {'wall s':>7} {'client cpu s':>13} {'MB sent':>8}")
+        print(f"{'pandas':>9} {raw_wall:>7.2f} {raw_cpu:>13.2f} {raw_bytes / 1e6:>8.1f}")
+        print(f"{'pushdown':>9} {encoded_wall:>7.2f} {encoded_cpu:>13.2f} {encoded_bytes / 1e6:>8.1f}")
+        encode_start = time.process_time()
+        pandas_encoded(raw)
+        print(f"pandas encodings after the raw export: {time.process_time() - encode_start:.2f} s cpu")
+    finally:
+        if not args.keep:
+            collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Size and read/write time of the tabular training artifacts as CSV against Parquet and Feather.
+
+Generates a raw vehicle dataset shaped like the exported collection (Mongo _id, schema.yaml
+columns and dtypes, categories as text) and, for every format, reports the file size, the
+write time, the time to read it back with the schema dtypes and the time to read only the
+columns DataTransformation needs (everything but _id).
+
+    python benchmarks/artifact_format_benchmark.py
+    python benchmarks/artifact_format_benchmark.py --rows 1000000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from src.utils.main_utils import apply_schema_dtypes, read_dataframe, write_dataframe
+
+
+def synthetic_raw_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Raw exported rows: _id, text categories and the numeric schema columns."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "_id": [f"{value:024x}" for value in rng.integers(0, 2 ** 62, n_rows)],
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 86, n_rows),
+        "Driving_License": (rng.random(n_rows) < 0.998).astype(np.int64),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(np.float64),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], n_rows, p=[0.43, 0.52, 0.05]),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": np.round(2630 + rng.lognormal(10.2, 0.6, n_rows)),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(np.float64),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": (rng.random(n_rows) < 0.12).astype(np.int64),
+    })
+    return apply_schema_dtypes(frame)
+
+
+def median_seconds(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=381109, help="rows of the dataset, default the size of the "
+                                                                  "original vehicle insurance data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frame = synthetic_raw_frame(args.rows)
+    feature_columns = [column for column in frame.columns if column != "_id"]
+    print(f"{args.rows} rows, {frame.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+    print(f"{'format':>16} {'size MB':>8} {'write s':>8} {'read s':>7} {'read w/o _id s':>15} {'dtypes kept':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        formats = [
+            ("csv", "data.csv", lambda path: write_dataframe(path, frame),
+             lambda path, columns=None: read_dataframe(path, columns=columns)),
+            ("parquet snappy", "snappy.parquet", lambda path: write_dataframe(path, frame, compression="snappy"),
+             lambda path, columns=None: read_dataframe(path, columns=columns)),
+            ("parquet zstd", "zstd.parquet", lambda path: write_dataframe(path, frame, compression="zstd"),
+             lambda path, columns=None: read_dataframe(path, columns=columns)),
+            ("feather zstd", "data.feather", lambda path: frame.to_feather(path, compression="zstd"),
+             lambda path, columns=None: apply_schema_dtypes(pd.read_feather(path, columns=columns))),
+        ]
+        for name, file_name, write, read in formats:
+            path = os.path.join(tmp_dir, file_name)
+            write_seconds = median_seconds(lambda: write(path), args.repeat)
+            read_seconds = median_seconds(lambda: read(path), args.repeat)
+            pruned_seconds = median_seconds(lambda: read(path, feature_columns), args.repeat)
+            restored = read(path)
+            if len(restored) != len(frame) or list(restored.columns) != list(frame.columns):
+                sys.exit(f"{name} read back a different frame")
+            dtypes_kept = restored.dtypes.astype(str).equals(frame.dtypes.astype(str))
+            print(f"{name:>16} {os.path.getsize(path) / 1e6:>8.1f} {write_seconds:>8.3f} {read_seconds:>7.3f} "
+                  f"{pruned_seconds:>15.3f} {str(dtypes_kept):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Decode and encode cost of the bulk request formats against JSON, per batch of rows.
+
+For every format the request body of a synthetic batch is decoded into the model's float64
+input matrix (JSON: parsing and BatchPredictionRequest validation as in /predict/batch, then
+the record fast path; Arrow and msgpack: the /predict/bulk decoders) and the predictions and
+probabilities are encoded into a response body. Prints the median time of each step and the
+body sizes.
+
+    python benchmarks/columnar_codec_benchmark.py
+    python benchmarks/columnar_codec_benchmark.py --rows 100000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from forest_inference_benchmark import synthetic_vehicle_frame, train_benchmark_model
+
+from app import BatchPredictionRequest
+from src.entity.compiled_model import CompiledModel
+from src.pipline.columnar_codec import (ARROW_STREAM_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, decode_columns, encode_arrow,
+                                        encode_json, encode_msgpack)
+from src.pipline.prediction_pipeline import VEHICLE_DATA_COLUMNS
+
+
+def median_ms(fn, repeat: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def arrow_body(frame) -> bytes:
+    import pyarrow
+    import pyarrow.ipc
+
+    table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def msgpack_body(frame, binary: bool) -> bytes:
+    import msgpack
+
+    if binary:
+        return msgpack.packb({"columns": {column: frame[column].to_numpy(np.float64).tobytes()
+                                          for column in VEHICLE_DATA_COLUMNS}})
+    return msgpack.packb({"columns": {column: frame[column].tolist() for column in VEHICLE_DATA_COLUMNS}})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per request")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--train-rows", type=int, default=5000, help="training rows of the model providing "
+                                                                     "the preprocessor and the predictions")
+    args = parser.parse_args()
+
+    model = CompiledModel.from_model(train_benchmark_model(args.train_rows))
+    preprocessor = model.preprocessor
+    frame = synthetic_vehicle_frame(args.rows, seed=1)[VEHICLE_DATA_COLUMNS]
+    probabilities = model.predict_proba(frame)
+    result = {"prediction": model.classes_.take(np.argmax(probabilities, axis=1)).astype(np.int64)}
+    result.update({f"probability_{label}": np.ascontiguousarray(probabilities[:, index])
+                   for index, label in enumerate(model.classes_.tolist())})
+    expected = preprocessor.to_array(frame)
+
+    json_body = json.dumps({"records": frame.to_dict("records"), "return_probabilities": True}).encode()
+
+    def decode_json():
+        batch = BatchPredictionRequest.model_validate(json.loads(json_body))
+        return preprocessor.records_to_array(batch.records)
+
+    def encode_json_response():
+        # the response /predict/batch builds from the model output
+        values = result["prediction"]
+        return json.dumps({"predictions": [int(value) for value in values],
+                           "labels": ["Response-Yes" if value == 1 else "Response-No" for value in values],
+                           "probabilities": probabilities.tolist()}).encode()
+
+    formats = [("json", json_body, decode_json, encode_json_response)]
+    for name, body, media_type, encode in (
+            ("arrow", arrow_body(frame), ARROW_STREAM_MEDIA_TYPE, encode_arrow),
+            ("msgpack bin", msgpack_body(frame, binary=True), MSGPACK_MEDIA_TYPE, encode_msgpack),
+            ("msgpack array", msgpack_body(frame, binary=False), MSGPACK_MEDIA_TYPE, encode_msgpack)):
+        formats.append((name, body,
+                        lambda body=body, media_type=media_type: preprocessor.columns_to_array(
+                            decode_columns(body, media_type)),
+                        lambda encode=encode: encode(result)))
+
+    print(f"{args.rows} rows per request, median of {args.repeat}")
+    print(f"{'format':>14} {'request KB':>11} {'decode ms':>10} {'response KB':>12} {'encode ms':>10} "
+          f"{'us/row':>7}")
+    for name, body, decode, encode in formats:
+        if not np.array_equal(decode(), expected):
+            sys.exit(f"{name} decoded a different feature matrix")
+        decode_ms = median_ms(decode, args.repeat)
+        encode_ms = median_ms(encode, args.repeat)
+        response = encode()
+        print(f"{name:>14} {len(body) / 1024:>11.1f} {decode_ms:>10.2f} {len(response) / 1024:>12.1f} "
+              f"{encode_ms:>10.2f} {(decode_ms + encode_ms) * 1000 / args.rows:>7.2f}")
+    # JSON responses from /predict/bulk use the shared encoder
+    print(f"{'json (bulk)':>14} {'':>11} {'':>10} {len(encode_json(result)) / 1024:>12.1f} "
+          f"{median_ms(lambda: encode_json(result), args.repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Memory of the training data with the pandas default dtypes against the compact schema dtypes.
+
+Writes synthetic train and test artifacts (benchmarks/synthetic_dataset.py) with int64/float64
+columns, then runs DataTransformation on them (custom encodings, scalers, SMOTEENN) once with
+DATA_COMPACT_DTYPES=0 and once with DATA_COMPACT_DTYPES=1, each in its own process so the peak
+RSS of one run does not hide the other. Reports the deep memory of the loaded train frame and
+the peak RSS of loading the train set and of the whole transformation (Linux, read from
+/proc/self/status).
+
+    python benchmarks/dtype_memory_report.py --rows 1000000
+    DATA_INGESTION_PUSHDOWN=1 python benchmarks/dtype_memory_report.py --rows 1000000 --format csv
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+
+def rss_mb(field: str = "VmHWM") -> float:
+    """Peak (VmHWM) or current (VmRSS) resident memory of this process, unlike ru_maxrss the
+    peak is not inherited from the parent across fork and exec."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} missing from /proc/self/status")
+
+
+def reset_peak_rss() -> None:
+    # 5 resets VmHWM to the current RSS
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+def write_artifacts(data_dir: str, n_rows: int, file_format: str, seed: int) -> tuple:
+    from synthetic_dataset import SyntheticVehicleData
+
+    from src.utils.main_utils import DataFrameChunkWriter
+
+    generator = SyntheticVehicleData(seed=seed)
+    train_file_path = os.path.join(data_dir, f"train.{file_format}")
+    test_file_path = os.path.join(data_dir, f"test.{file_format}")
+    # int64/float64 files, the dtypes are decided when the artifacts are read
+    with DataFrameChunkWriter(train_file_path, generator.column_types) as train_writer, \
+            DataFrameChunkWriter(test_file_path, generator.column_types) as test_writer:
+        for frame in generator.iter_frames(n_rows, chunk_rows=500000):
+            test_mask = frame["id"] % 5 == 0
+            train_writer.write(frame[~test_mask])
+            test_writer.write(frame[test_mask])
+    return train_file_path, test_file_path
+
+
+def measure(train_file_path: str, test_file_path: str, artifact_dir: str) -> dict:
+    """Runs in the child process, DATA_COMPACT_DTYPES is read when src.constants is imported."""
+    from src.components.data_transformation import DataTransformation
+    from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+    from src.entity.config_entity import DataTransformationConfig
+
+    baseline = rss_mb("VmRSS")
+    reset_peak_rss()
+    transformation = DataTransformation(
+        data_ingestion_artifact=DataIngestionArtifact(trained_file_path=train_file_path,
+                                                      test_file_path=test_file_path),
+        data_transformation_config=DataTransformationConfig(artifact_dir=artifact_dir),
+        data_validation_artifact=DataValidationArtifact(validation_status=True, message="",
+                                                        validation_report_file_path=""))
+    train_df = transformation.read_data(train_file_path, columns=transformation._feature_columns(train_file_path))
+    frame_mb = train_df.memory_usage(deep=True).sum() / 1e6
+    dtypes = {column: str(dtype) for column, dtype in train_df.dtypes.items()}
+    del train_df
+    loaded = rss_mb()
+    reset_peak_rss()
+    transformation.initiate_data_transformation()
+    return {"train_frame_mb": frame_mb, "baseline_rss_mb": baseline, "loaded_rss_mb": loaded,
+            "transformed_rss_mb": rss_mb(), "dtypes": dtypes}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=381109)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=("parquet", "csv"), default="parquet")
+    parser.add_argument("--measure", nargs=3, metavar=("TRAIN", "TEST", "ARTIFACT_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        train_file_path, test_file_path = write_artifacts(data_dir, args.rows, args.format, args.seed)
+        results = {}
+        for compact in ("0", "1"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", train_file_path,
+                                     test_file_path, os.path.join(data_dir, f"artifact_{compact}")],
+                                    env={**os.environ, "DATA_COMPACT_DTYPES": compact},
+                                    check=True, capture_output=True, text=True).stdout
+            results[compact] = json.loads(output.splitlines()[-1])
+
+    default, compact = results["0"], results["1"]
+    print(f"{args.rows} rows, {args.format} artifacts")
+    print(f"{'':>28} {'default':>9} {'compact':>9}")
+    for key, label in (("train_frame_mb", "train frame MB"), ("baseline_rss_mb", "RSS after imports MB"),
+                       ("loaded_rss_mb", "peak RSS loading train MB"),
+                       ("transformed_rss_mb", "peak RSS transformation MB")):
+        print(f"{label:>28} {default[key]:>9.1f} {compact[key]:>9.1f}")
+    for column, dtype in compact["dtypes"].items():
+        if dtype != default["dtypes"][column]:
+            print(f"{column:>28} {default['dtypes'][column]:>9} {dtype:>9}")
+
+
+if __name__ == "__main__":
+    main()
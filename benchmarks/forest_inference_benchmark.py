@@ -0,0 +1,117 @@
+"""
+Latency benchmark of the sklearn MyModel against the CompiledModel used for serving,
+both from a DataFrame and from VehicleRecord objects (the pandas-free serving path).
+
+Trains a forest with the ModelTrainerConfig parameters (200 trees, depth 10) on synthetic
+vehicle data, or loads a saved model.pkl with --model-path, checks that both paths give
+bit-identical probabilities and prints the per-call latency for several batch sizes.
+
+    python benchmarks/forest_inference_benchmark.py
+    python benchmarks/forest_inference_benchmark.py --model-path artifact/<ts>/model_trainer/trained_model/model.pkl
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from src.entity.compiled_model import CompiledModel
+from src.entity.config_entity import ModelTrainerConfig
+from src.entity.estimator import MyModel
+from src.pipline.prediction_pipeline import VehicleRecord
+from src.utils.main_utils import load_object
+
+
+def synthetic_vehicle_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    vehicle_age = rng.choice(3, size=n_rows, p=[0.52, 0.43, 0.05])
+    return pd.DataFrame({
+        "Gender": rng.integers(0, 2, n_rows),
+        "Age": rng.integers(20, 86, n_rows),
+        "Driving_License": (rng.random(n_rows) < 0.998).astype(int),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(float),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Annual_Premium": np.round(2630 + rng.lognormal(10.2, 0.6, n_rows)),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(float),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Vehicle_Age_lt_1_Year": (vehicle_age == 1).astype(int),
+        "Vehicle_Age_gt_2_Years": (vehicle_age == 2).astype(int),
+        "Vehicle_Damage_Yes": rng.integers(0, 2, n_rows),
+    })
+
+
+def train_benchmark_model(n_rows: int) -> MyModel:
+    config = ModelTrainerConfig()
+    features = synthetic_vehicle_frame(n_rows)
+    noise = np.random.default_rng(1).random(n_rows) < 0.15
+    target = (((features["Age"] > 35) & (features["Vehicle_Damage_Yes"] == 1)
+               & (features["Previously_Insured"] == 0)).to_numpy() ^ noise).astype(int)
+    preprocessor = Pipeline(steps=[("Preprocessor", ColumnTransformer(
+        transformers=[("StandardScaler", StandardScaler(), ["Age", "Vintage"]),
+                      ("MinMaxScaler", MinMaxScaler(), ["Annual_Premium"])],
+        remainder="passthrough"))])
+    forest = RandomForestClassifier(n_estimators=config._n_estimators,
+                                    min_samples_split=config._min_samples_split,
+                                    min_samples_leaf=config._min_samples_leaf,
+                                    max_depth=config._max_depth,
+                                    criterion=config._criterion,
+                                    random_state=config._random_state)
+    forest.fit(preprocessor.fit_transform(features), target)
+    return MyModel(preprocessing_object=preprocessor, trained_model_object=forest)
+
+
+def time_per_call(fn, dataframe: pd.DataFrame, repeat: int) -> float:
+    fn(dataframe)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(dataframe)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="saved MyModel pickle, a synthetic model is trained when omitted")
+    parser.add_argument("--train-rows", type=int, default=20000)
+    parser.add_argument("--check-rows", type=int, default=50000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 512, 4096])
+    args = parser.parse_args()
+
+    model = load_object(args.model_path) if args.model_path else train_benchmark_model(args.train_rows)
+    compiled = CompiledModel.from_model(model)
+
+    check_df = synthetic_vehicle_frame(args.check_rows, seed=7)
+    sklearn_proba = model.predict_proba(check_df)
+    compiled_proba = compiled.predict_proba(check_df)
+    identical = np.array_equal(sklearn_proba, compiled_proba) and \
+        np.array_equal(model.predict(check_df), compiled.predict(check_df))
+    print(f"{model} vs {compiled}: bit-identical on {args.check_rows} rows: {identical}")
+
+    records = [VehicleRecord.from_mapping(row) for row in check_df.iloc[:max(args.batch_sizes)].to_dict("records")]
+    identical = identical and np.array_equal(compiled.predict_records(records),
+                                             model.predict(check_df.iloc[:len(records)]))
+
+    print(f"{'rows':>6} {'sklearn ms':>12} {'compiled ms':>12} {'records ms':>12} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        batch = check_df.iloc[:batch_size]
+        repeat = max(3, 2000 // batch_size)
+        sklearn_ms = time_per_call(model.predict, batch, min(repeat, 50)) * 1000
+        compiled_ms = time_per_call(compiled.predict, batch, repeat) * 1000
+        records_ms = time_per_call(compiled.predict_records, records[:batch_size], repeat) * 1000
+        print(f"{batch_size:>6} {sklearn_ms:>12.3f} {compiled_ms:>12.3f} {records_ms:>12.3f} "
+              f"{sklearn_ms / records_ms:>7.1f}x")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cold start benchmark of the serving entry point.
+
+Imports each module in a fresh interpreter several times and reports the median wall time,
+the slowest imports (from python -X importtime) and whether any training-only or model
+loading dependency was imported. Exits with status 1 when the serving entry point pulls in
+one of them, so the check can run in CI.
+
+    python benchmarks/import_time_benchmark.py
+    python benchmarks/import_time_benchmark.py --modules serve app src.pipline.training_pipeline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the serving entry point must not import at startup
+DEFERRED_MODULES = ["imblearn", "pymongo", "certifi", "boto3", "sklearn", "src.pipline.training_pipeline",
+                    "src.components.data_transformation", "src.configuration.mongo_db_connection"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+preloaded = set(sys.modules)  # e.g. modules imported by .pth files of the environment
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = [m for m in {deferred!r} if m in sys.modules and m not in preloaded]
+print(json.dumps({{"seconds": seconds, "deferred_loaded": loaded}}))
+"""
+
+
+def measure_import(module: str) -> dict:
+    script = IMPORT_SCRIPT.format(module=module, deferred=DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """
+    Returns the top cumulative import times in seconds as reported by python -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["serve", "app"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        median = statistics.median(run["seconds"] for run in runs)
+        deferred_loaded = runs[-1]["deferred_loaded"]
+        print(f"import {module}: median {median * 1000:.0f} ms over {args.repeat} fresh interpreters")
+        for seconds, name in slowest_imports(module, args.top):
+            print(f"    {seconds * 1000:8.1f} ms  {name}")
+        if deferred_loaded:
+            print(f"    imported at startup: {', '.join(deferred_loaded)}")
+            failed = failed or module == "serve"
+        else:
+            print("    no training or model loading dependencies imported")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Load generator for the prediction service.
+
+Sends synthetic vehicle payloads to POST / (the HTML form) and POST /predict/batch and
+reports throughput and p50/p95/p99/p99.9 latency per endpoint. Results can be saved as JSON
+to compare runs across commits.
+
+Two modes:
+  in-process (default)  drives the FastAPI app through its ASGI interface in this process,
+                        with a stub model (or --model-path) and no network or S3 access
+  --url                 sends HTTP/1.1 requests over keep-alive connections to a running
+                        server, e.g. one started with a local model artifact:
+                            python benchmarks/load_test.py --export-model /tmp/model.vmdl
+                            PREDICTION_MODEL_ARTIFACT_PATH=/tmp/model.vmdl python serve.py
+
+Without --rate every worker sends its next request as soon as the previous one finished
+(closed loop). With --rate requests are started on a fixed schedule and latency is measured
+from the scheduled start, so a server that falls behind shows up as queueing latency instead
+of being hidden by fewer requests (open loop).
+
+    python benchmarks/load_test.py --concurrency 32 --duration 10
+    python benchmarks/load_test.py --endpoints form --rate 500 --duration 30 --output results.json
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+PERCENTILES = (("p50", 50.0), ("p95", 95.0), ("p99", 99.0), ("p999", 99.9))
+
+
+def synthetic_vehicle_payload(rng: random.Random) -> Dict[str, float]:
+    """One vehicle record with the value ranges of the training data."""
+    vehicle_age = rng.choices((0, 1, 2), weights=(52, 43, 5))[0]
+    return {
+        "Gender": rng.randint(0, 1),
+        "Age": rng.randint(20, 85),
+        "Driving_License": 1 if rng.random() < 0.998 else 0,
+        "Region_Code": float(rng.randint(0, 52)),
+        "Previously_Insured": rng.randint(0, 1),
+        "Annual_Premium": float(round(2630 + rng.lognormvariate(10.2, 0.6))),
+        "Policy_Sales_Channel": float(rng.randint(1, 163)),
+        "Vintage": rng.randint(10, 299),
+        "Vehicle_Age_lt_1_Year": int(vehicle_age == 1),
+        "Vehicle_Age_gt_2_Years": int(vehicle_age == 2),
+        "Vehicle_Damage_Yes": rng.randint(0, 1),
+    }
+
+
+def build_request(endpoint: str, rng: random.Random, batch_size: int) -> Tuple[str, str, bytes]:
+    """Returns path, content type and body of one request to the endpoint."""
+    if endpoint == "form":
+        return "/", "application/x-www-form-urlencoded", urlencode(synthetic_vehicle_payload(rng)).encode()
+    if endpoint == "batch":
+        records = [synthetic_vehicle_payload(rng) for _ in range(batch_size)]
+        return "/predict/batch", "application/json", json.dumps({"records": records}).encode()
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+class AsgiClient:
+    """
+    Minimal in-process ASGI client: runs the app lifespan and sends requests straight to the
+    app callable, so the measured time is the app's own time without sockets or HTTP parsing.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._lifespan_task: Optional[asyncio.Task] = None
+        self._lifespan_events: Optional[asyncio.Queue] = None
+        self._lifespan_done: Dict[str, asyncio.Future] = {}
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._lifespan_events = asyncio.Queue()
+        self._lifespan_done = {"startup": loop.create_future(), "shutdown": loop.create_future()}
+
+        async def send(message):
+            phase = message["type"].split(".")[1]
+            future = self._lifespan_done[phase]
+            if message["type"].endswith("failed"):
+                future.set_exception(RuntimeError(message.get("message", f"lifespan {phase} failed")))
+            else:
+                future.set_result(None)
+
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(self.app(scope, self._lifespan_events.get, send))
+        await self._lifespan_events.put({"type": "lifespan.startup"})
+        await self._lifespan_done["startup"]
+
+    async def close(self) -> None:
+        await self._lifespan_events.put({"type": "lifespan.shutdown"})
+        await self._lifespan_done["shutdown"]
+        await self._lifespan_task
+
+    async def request(self, method: str, path: str, content_type: str, body: bytes) -> Tuple[int, bytes]:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"loadtest"), (b"content-type", content_type.encode()),
+                        (b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 80), "state": {},
+        }
+        request_sent = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        status_code, chunks = 500, []
+
+        async def send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status_code, b"".join(chunks)
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection, requests are sent one after the other."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, content_type: str, body: bytes) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode()
+        try:
+            self._writer.write(head + body)
+            await self._writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        header_block = await self._reader.readuntil(b"\r\n\r\n")
+        lines = header_block.decode("latin-1").split("\r\n")
+        status_code = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status_code, body
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader, self._writer = None, None
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-percent * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(endpoint: str, latencies: List[float], status_counts: Counter, errors: Counter,
+              elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies)
+    latency_ms = {"min": latencies[0] * 1000 if latencies else 0.0,
+                  "mean": sum(latencies) / total * 1000 if total else 0.0}
+    latency_ms.update({name: percentile(latencies, percent) * 1000 for name, percent in PERCENTILES})
+    latency_ms["max"] = latencies[-1] * 1000 if latencies else 0.0
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "ok": sum(count for status, count in status_counts.items() if 200 <= status < 300),
+        "status_counts": {str(status): count for status, count in sorted(status_counts.items())},
+        "errors": dict(errors),
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "latency_ms": latency_ms,
+    }
+
+
+async def run_endpoint(endpoint: str, send_request, args, make_connection) -> dict:
+    """
+    Runs one endpoint for the configured duration (or number of requests) with the configured
+    concurrency, in closed loop or, with --rate, on a fixed schedule.
+    """
+    rng = random.Random(args.seed)
+    latencies: List[float] = []
+    status_counts: Counter = Counter()
+    errors: Counter = Counter()
+    requests_left = [args.requests] if args.requests else None
+    loop = asyncio.get_running_loop()
+    measuring = [False]
+
+    # payloads are built up front so the client does not compete with the app for the event loop
+    payloads = [build_request(endpoint, rng, args.batch_size) for _ in range(args.payloads)]
+    tickets: Optional[asyncio.Queue] = asyncio.Queue(maxsize=args.concurrency * 4) if args.rate else None
+
+    async def worker(worker_index: int, deadline: float) -> None:
+        connection = make_connection()
+        sent = worker_index
+        try:
+            while True:
+                if tickets is not None:
+                    scheduled = await tickets.get()
+                    if scheduled is None:
+                        return
+                else:
+                    scheduled = loop.time()
+                    if scheduled >= deadline:
+                        return
+                if requests_left is not None:
+                    if requests_left[0] <= 0:
+                        return
+                    requests_left[0] -= 1
+                path, content_type, body = payloads[sent % len(payloads)]
+                sent += args.concurrency
+                try:
+                    status_code, _ = await send_request(connection, "POST", path, content_type, body)
+                except Exception as e:
+                    status_code = 0
+                    if measuring[0]:
+                        errors[type(e).__name__] += 1
+                if measuring[0]:
+                    latencies.append(loop.time() - scheduled)
+                    status_counts[status_code] += 1
+        finally:
+            if hasattr(connection, "close"):
+                await connection.close()
+
+    async def schedule(deadline: float) -> None:
+        interval = 1.0 / args.rate
+        next_start = loop.time()
+        while next_start < deadline:
+            delay = next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await tickets.put(next_start)
+            next_start += interval
+        for _ in range(args.concurrency):
+            await tickets.put(None)
+
+    async def run_phase(seconds: float) -> None:
+        deadline = loop.time() + seconds if not args.requests or not measuring[0] else float("inf")
+        tasks = [asyncio.create_task(worker(index, deadline)) for index in range(args.concurrency)]
+        if tickets is not None:
+            if deadline == float("inf"):
+                # a fixed number of requests at a fixed rate
+                deadline = loop.time() + args.requests / args.rate
+            tasks.append(asyncio.create_task(schedule(deadline)))
+        await asyncio.gather(*tasks)
+
+    if args.warmup > 0:
+        await run_phase(args.warmup)
+    measuring[0] = True
+    start = loop.time()
+    await run_phase(args.duration)
+    return summarize(endpoint, latencies, status_counts, errors, loop.time() - start)
+
+
+def load_benchmark_model(args):
+    if args.model_path:
+        if args.model_path.endswith(".vmdl"):
+            from src.entity.model_artifact import load_model_artifact
+            return load_model_artifact(args.model_path)
+        from src.utils.main_utils import load_object
+        return load_object(args.model_path)
+    # small synthetic forest with the production parameters, trained locally in a few seconds
+    from forest_inference_benchmark import train_benchmark_model
+    return train_benchmark_model(args.train_rows)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args) -> dict:
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+        make_connection = lambda: HttpConnection(host, port)
+
+        async def send_request(connection, method, path, content_type, body):
+            return await connection.request(method, path, content_type, body)
+
+        client = None
+    else:
+        from app import app
+        from src.pipline.model_cache import model_cache
+
+        model = load_benchmark_model(args)
+        model_cache.loader = lambda: model
+        client = AsgiClient(app)
+        await client.start()
+        make_connection = lambda: None
+
+        async def send_request(connection, method, path, content_type, body):
+            return await client.request(method, path, content_type, body)
+
+    try:
+        results = []
+        for endpoint in args.endpoints:
+            result = await run_endpoint(endpoint, send_request, args, make_connection)
+            latency = result["latency_ms"]
+            print(f"{endpoint:>6}: {result['requests']} requests, {result['ok']} ok, "
+                  f"{result['throughput_rps']:.0f} req/s, p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, "
+                  f"p99 {latency['p99']:.2f} ms, p99.9 {latency['p999']:.2f} ms, max {latency['max']:.2f} ms")
+            if result["errors"] or result["ok"] < result["requests"]:
+                print(f"        status {result['status_counts']} errors {result['errors']}")
+            results.append(result)
+    finally:
+        if client is not None:
+            await client.close()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "mode": "http" if args.url else "in-process",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "export_model")},
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server, the app runs in-process when omitted")
+    parser.add_argument("--endpoints", nargs="+", choices=["form", "batch"], default=["form", "batch"])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent connections / workers")
+    parser.add_argument("--rate", type=float, help="total requests per second (open loop), unlimited when omitted")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per endpoint")
+    parser.add_argument("--requests", type=int, help="measured requests per endpoint, instead of --duration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each endpoint")
+    parser.add_argument("--batch-size", type=int, default=100, help="records per /predict/batch request")
+    parser.add_argument("--payloads", type=int, default=1000, help="distinct synthetic payloads to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-path", help="model.pkl or model.vmdl for in-process runs, a stub model is "
+                                             "trained when omitted")
+    parser.add_argument("--train-rows", type=int, default=20000, help="training rows of the stub model")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--export-model", help="only write the stub model as a model artifact to this path, "
+                                               "for serving it with PREDICTION_MODEL_ARTIFACT_PATH")
+    args = parser.parse_args()
+
+    if args.export_model:
+        from src.entity.compiled_model import CompiledModel
+        from src.entity.model_artifact import save_model_artifact
+        save_model_artifact(CompiledModel.from_model(load_benchmark_model(args)), args.export_model)
+        print(f"Wrote {args.export_model}")
+        return
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
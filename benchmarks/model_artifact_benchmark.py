@@ -0,0 +1,123 @@
+"""
+Load time and memory benchmark of model.pkl against the memory-mapped model artifact.
+
+Saves a model (a synthetic forest with the ModelTrainerConfig parameters, or --model-path)
+in both formats, then loads each one in fresh interpreters and reports the load time, the
+resident memory and how much of it is private to the process. Several processes mapping
+the same artifact share its pages, so their private memory stays small, while every process
+unpickling model.pkl holds its own copy of the trees.
+
+    python benchmarks/model_artifact_benchmark.py
+    python benchmarks/model_artifact_benchmark.py --model-path artifact/<ts>/model_trainer/trained_model/model.pkl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from forest_inference_benchmark import synthetic_vehicle_frame, train_benchmark_model
+
+from src.entity.compiled_model import CompiledModel
+from src.entity.model_artifact import load_model_artifact, save_model_artifact
+from src.utils.main_utils import load_object, save_object
+
+LOAD_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {project_root!r})
+
+def memory_kb():
+    fields = {{}}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3:
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {{"rss_kb": fields["Rss"], "private_kb": fields["Private_Clean"] + fields["Private_Dirty"]}}
+
+import numpy as np, pandas as pd
+baseline = memory_kb()
+start = time.perf_counter()
+if {kind!r} == "pickle":
+    from src.utils.main_utils import load_object
+    model = load_object({path!r})
+else:
+    from src.entity.model_artifact import load_model_artifact
+    model = load_model_artifact({path!r})
+load_seconds = time.perf_counter() - start
+frame = pd.read_pickle({frame_path!r})
+start = time.perf_counter()
+model.predict(frame)
+predict_seconds = time.perf_counter() - start
+after = memory_kb()
+print(json.dumps({{"load_seconds": load_seconds, "first_predict_seconds": predict_seconds,
+                  "rss_kb": after["rss_kb"] - baseline["rss_kb"],
+                  "private_kb": after["private_kb"] - baseline["private_kb"]}}))
+{hold}
+"""
+
+
+def run_load(kind: str, path: str, frame_path: str, hold: bool = False) -> subprocess.Popen:
+    script = LOAD_SCRIPT.format(project_root=PROJECT_ROOT, kind=kind, path=path, frame_path=frame_path,
+                                hold="sys.stdout.flush(); sys.stdin.read()" if hold else "")
+    return subprocess.Popen([sys.executable, "-c", script], cwd=PROJECT_ROOT, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, text=True)
+
+
+def read_result(process: subprocess.Popen) -> dict:
+    return json.loads(process.stdout.readline())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="saved MyModel pickle, a synthetic model is trained when omitted")
+    parser.add_argument("--train-rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=4, help="concurrent processes for the shared memory run")
+    args = parser.parse_args()
+
+    model = load_object(args.model_path) if args.model_path else train_benchmark_model(args.train_rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, "model.pkl")
+        artifact_path = os.path.join(tmp_dir, "model.vmdl")
+        frame_path = os.path.join(tmp_dir, "frame.pkl")
+        save_object(pickle_path, model)
+        start = time.perf_counter()
+        save_model_artifact(CompiledModel.from_model(model), artifact_path)
+        print(f"converted in {time.perf_counter() - start:.2f}s: model.pkl {os.path.getsize(pickle_path) / 1e6:.1f} MB, "
+              f"model.vmdl {os.path.getsize(artifact_path) / 1e6:.1f} MB")
+
+        frame = synthetic_vehicle_frame(1000, seed=3)
+        frame.to_pickle(frame_path)
+        identical = (model.predict(frame) == load_model_artifact(artifact_path).predict(frame)).all()
+        print(f"artifact predictions identical to the pickle: {identical}")
+
+        print(f"{'format':>8} {'load ms':>10} {'1st predict ms':>15} {'rss MB':>8} {'private MB':>11}")
+        for kind, path in (("pickle", pickle_path), ("artifact", artifact_path)):
+            runs = [read_result(process) for process in
+                    [run_load(kind, path, frame_path) for _ in range(args.repeat)]]
+            print(f"{kind:>8} {statistics.median(r['load_seconds'] for r in runs) * 1000:>10.1f} "
+                  f"{statistics.median(r['first_predict_seconds'] for r in runs) * 1000:>15.1f} "
+                  f"{statistics.median(r['rss_kb'] for r in runs) / 1024:>8.1f} "
+                  f"{statistics.median(r['private_kb'] for r in runs) / 1024:>11.1f}")
+
+        print(f"{args.processes} processes holding the model at the same time:")
+        for kind, path in (("pickle", pickle_path), ("artifact", artifact_path)):
+            processes = [run_load(kind, path, frame_path, hold=True) for _ in range(args.processes)]
+            runs = [read_result(process) for process in processes]
+            for process in processes:
+                process.communicate("")
+            print(f"{kind:>8} total private memory {sum(r['private_kb'] for r in runs) / 1024:.1f} MB")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Offline run of the training pipeline on synthetic data, timing every stage.
+
+Bulk-loads benchmarks/synthetic_dataset.py rows into an in-memory MongoDB stand-in (mongomock,
+the default) or a local mongod (--mongo-url) and runs the pipeline on them with the ingestion
+settings of the environment (DATA_INGESTION_*, DATA_ARTIFACT_FORMAT, ...). Prints the wall time
+and the peak RSS after each stage.
+
+Model evaluation and the model pusher talk to S3, they run with --through-pusher once the AWS
+variables point to an S3 compatible endpoint, e.g. a local MinIO or moto_server:
+AWS_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=... AWS_SECRET_ACCESS_KEY=...
+
+    python benchmarks/pipeline_benchmark.py --rows 100000
+    python benchmarks/pipeline_benchmark.py --rows 10000000 --mongo-url mongodb://localhost:27017 --keep
+    DATA_INGESTION_SPLIT_MODE=hash python benchmarks/pipeline_benchmark.py --rows 1000000 --output run.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import types
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from synthetic_dataset import SyntheticVehicleData
+
+from src.constants import DATA_INGESTION_COLLECTION_NAME, DATABASE_NAME
+from src.data_access.aggregation_pushdown import register_mongomock_operators
+from src.data_access.proj1_data import Proj1Data
+from src.entity.config_entity import TrainingPipelineConfig
+from src.pipline.training_pipeline import TrainingPipeline
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def connect(mongo_url):
+    """Returns the client wrapper Proj1Data reads from, on a local mongod or mongomock."""
+    if mongo_url:
+        from src.configuration.mongo_db_connection import MongoDBClient
+
+        return MongoDBClient(database_name=DATABASE_NAME, mongo_db_url=mongo_url)
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("the in-memory stand-in needs mongomock (pip install mongomock), or pass --mongo-url")
+    # DATA_INGESTION_PUSHDOWN=1 runs the encoding pipeline, which needs $toDouble
+    register_mongomock_operators()
+    client = mongomock.MongoClient()
+    return types.SimpleNamespace(client=client, database=client[DATABASE_NAME], database_name=DATABASE_NAME)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", help="local mongod to load the data into, mongomock when omitted")
+    parser.add_argument("--keep", action="store_true",
+                        help="reuse a collection that already holds --rows documents and keep it afterwards")
+    parser.add_argument("--through-pusher", action="store_true",
+                        help="also run model evaluation and the model pusher (needs S3 or a local endpoint)")
+    parser.add_argument("--output", help="write the timings as JSON to this file")
+    args = parser.parse_args()
+
+    mongo_client = connect(args.mongo_url)
+    collection = mongo_client.database[DATA_INGESTION_COLLECTION_NAME]
+    timings = {}
+    if not (args.keep and collection.estimated_document_count() == args.rows):
+        start = time.perf_counter()
+        collection.drop()
+        SyntheticVehicleData(seed=args.seed).load_collection(collection, args.rows)
+        timings["load"] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}
+
+    started = {}
+
+    def record(stage: str, event: str) -> None:
+        if event == "started":
+            started[stage] = time.perf_counter()
+        else:
+            timings[stage] = {"seconds": time.perf_counter() - started[stage], "peak_rss_mb": peak_rss_mb(),
+                              "status": event}
+
+    pipeline = TrainingPipeline(TrainingPipelineConfig.for_run("benchmark"), stage_callback=record,
+                                proj1_data=Proj1Data(mongo_client=mongo_client))
+    try:
+        if args.through_pusher:
+            pipeline.run_pipeline()
+        else:
+            ingestion = pipeline._run_stage("data_ingestion", pipeline.start_data_ingestion)
+            validation = pipeline._run_stage("data_validation", pipeline.start_data_validation, ingestion)
+            transformation = pipeline._run_stage("data_transformation", pipeline.start_data_transformation,
+                                                 ingestion, validation)
+            pipeline._run_stage("model_trainer", pipeline.start_model_trainer, transformation)
+    finally:
+        if not args.keep:
+            collection.drop()
+        print(f"{args.rows} rows, artifacts in {pipeline.training_pipeline_config.artifact_dir}")
+        print(f"{'stage':>20} {'seconds':>9} {'rows/s':>11} {'peak RSS MB':>12}")
+        for stage, timing in timings.items():
+            print(f"{stage:>20} {timing['seconds']:>9.2f} {args.rows / timing['seconds']:>11,.0f} "
+                  f"{timing['peak_rss_mb']:>12.0f}{'' if timing.get('status', 'completed') == 'completed' else ' failed'}")
+        if args.output:
+            with open(args.output, "w") as output_file:
+                json.dump({"rows": args.rows, "mongo": "mongod" if args.mongo_url else "mongomock",
+                           "stages": timings}, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Synthetic vehicle insurance data at production scale, to benchmark the pipeline offline.
+
+Rows follow the column types of config/schema.yaml and the distributions of
+config/synthetic_data.yaml (skewed Age, Region_Code and Policy_Sales_Channel hot spots, the
+Annual_Premium floor, an imbalanced Response driven by Previously_Insured, Vehicle_Damage,
+Vehicle_Age and Age). They have the raw layout of the uploaded CSV: id, categories as text.
+Every chunk of rows is generated from its own seed, so a given seed and chunk size always
+give the same data and shards can be generated in parallel.
+
+    # 10M rows as Parquet shards of 1M rows on 4 processes
+    python benchmarks/synthetic_dataset.py --rows 10000000 --output-dir synthetic --workers 4
+    # 1M documents bulk-loaded into a local mongod, replacing the collection
+    python benchmarks/synthetic_dataset.py --rows 1000000 --mongo-url mongodb://localhost:27017 --drop
+
+benchmarks/pipeline_benchmark.py loads the data into an in-memory MongoDB stand-in or a local
+mongod and times every training stage on it.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from src.constants import (DATA_ARTIFACT_FORMAT, DATA_INGESTION_COLLECTION_NAME, DATABASE_NAME, SCHEMA_FILE_PATH,
+                           TARGET_COLUMN)
+from src.utils.main_utils import DataFrameChunkWriter, get_schema_column_types, read_yaml_file
+
+SYNTHETIC_DATA_CONFIG_FILE_PATH = os.path.join("config", "synthetic_data.yaml")
+# Rows the Response intercept is calibrated on
+CALIBRATION_ROWS = 200000
+
+
+class SyntheticVehicleData:
+    """
+    Generates raw vehicle insurance rows chunk by chunk.
+
+    :param seed: Seed of the whole dataset, chunk i is drawn from the seed sequence (seed, i)
+    :param config_file_path: Distributions of the columns and the Response model
+    :param schema_file_path: Column names, order and types
+    """
+
+    def __init__(self, seed: int = 42, config_file_path: str = SYNTHETIC_DATA_CONFIG_FILE_PATH,
+                 schema_file_path: str = SCHEMA_FILE_PATH) -> None:
+        self.seed = seed
+        self.config = read_yaml_file(file_path=config_file_path)
+        self.column_types = get_schema_column_types(schema_file_path)
+        missing = [column for column in self.column_types
+                   if column not in ("id", TARGET_COLUMN) and column not in self.config["columns"]]
+        if missing:
+            raise ValueError(f"{config_file_path} has no distribution for the schema columns {missing}")
+        self.intercept = self._calibrate_intercept()
+
+    def _sample_column(self, rng: np.random.Generator, spec: dict, column_type: str, n_rows: int) -> np.ndarray:
+        if "choice" in spec:
+            values = np.array(list(spec["choice"]), dtype=object if column_type == "category" else np.float64)
+            probabilities = np.array(list(spec["choice"].values()), dtype=np.float64)
+            if "other" in spec:
+                low, high = spec["other"]
+                column = rng.integers(low, high + 1, n_rows).astype(np.float64)
+                picks = rng.choice(len(values) + 1, size=n_rows,
+                                   p=np.append(probabilities, max(0.0, 1 - probabilities.sum())))
+                chosen = picks < len(values)
+                column[chosen] = values[picks[chosen]]
+            else:
+                column = values[rng.choice(len(values), size=n_rows, p=probabilities / probabilities.sum())]
+        elif "uniform" in spec:
+            low, high = spec["uniform"]
+            column = rng.integers(low, high + 1, n_rows).astype(np.float64)
+        elif "normal_mixture" in spec:
+            weights, means, stds = np.array(spec["normal_mixture"], dtype=np.float64).T
+            components = rng.choice(len(weights), size=n_rows, p=weights / weights.sum())
+            column = rng.normal(means[components], stds[components])
+        elif "lognormal" in spec:
+            mean, sigma = spec["lognormal"]
+            column = rng.lognormal(mean, sigma, n_rows)
+            if "point_mass" in spec:
+                value, probability = spec["point_mass"]
+                column[rng.random(n_rows) < probability] = value
+        else:
+            raise ValueError(f"Unknown distribution {spec}")
+
+        if column_type == "category":
+            return column
+        if "clip" in spec:
+            column = np.clip(column, *spec["clip"])
+        if column_type == "int":
+            return np.rint(column).astype(np.int64)
+        if "decimals" in spec:
+            column = np.round(column, spec["decimals"])
+        return column.astype(np.float64)
+
+    def _features(self, rng: np.random.Generator, n_rows: int, first_id: int) -> Dict[str, np.ndarray]:
+        columns = {}
+        for column, column_type in self.column_types.items():
+            if column == "id":
+                columns[column] = np.arange(first_id, first_id + n_rows, dtype=np.int64)
+            elif column != TARGET_COLUMN:
+                columns[column] = self._sample_column(rng, self.config["columns"][column], column_type, n_rows)
+        return columns
+
+    def _response_score(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        response = self.config["response"]
+        score = np.zeros(len(columns["id"]))
+        for column, levels in response.get("levels", {}).items():
+            for value, coefficient in levels.items():
+                score += coefficient * (columns[column] == value)
+        for column, bands in response.get("bands", {}).items():
+            lower = -np.inf
+            for upper, coefficient in bands:
+                score += coefficient * ((columns[column] >= lower) & (columns[column] < upper))
+                lower = upper
+        return score
+
+    def _calibrate_intercept(self) -> float:
+        """Solves the intercept giving positive_rate positives on a calibration sample."""
+        rng = np.random.default_rng([self.seed, 2 ** 32 - 1])
+        score = self._response_score(self._features(rng, CALIBRATION_ROWS, 1))
+        target, low, high = self.config["response"]["positive_rate"], -30.0, 30.0
+        for _ in range(60):
+            intercept = (low + high) / 2
+            if np.mean(1 / (1 + np.exp(-(intercept + score)))) < target:
+                low = intercept
+            else:
+                high = intercept
+        return (low + high) / 2
+
+    def frame(self, n_rows: int, first_id: int = 1, chunk_index: int = 0) -> pd.DataFrame:
+        """
+        Returns one chunk of rows in schema order.
+
+        :param first_id: id of the first row, ids are consecutive
+        :param chunk_index: Position of the chunk in the dataset, selects its random stream
+        """
+        rng = np.random.default_rng([self.seed, chunk_index])
+        columns = self._features(rng, n_rows, first_id)
+        probability = 1 / (1 + np.exp(-(self.intercept + self._response_score(columns))))
+        columns[TARGET_COLUMN] = (rng.random(n_rows) < probability).astype(np.int64)
+        return pd.DataFrame({column: columns[column] for column in self.column_types})
+
+    def iter_frames(self, n_rows: int, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_rows)):
+            yield self.frame(min(chunk_rows, n_rows - start), first_id=start + 1, chunk_index=chunk_index)
+
+    def write_shard(self, file_path: str, n_rows: int, first_id: int, chunk_index: int) -> int:
+        with DataFrameChunkWriter(file_path, self.column_types) as writer:
+            writer.write(self.frame(n_rows, first_id=first_id, chunk_index=chunk_index))
+        return n_rows
+
+    def write_shards(self, output_dir: str, n_rows: int, rows_per_shard: int,
+                     file_format: str = DATA_ARTIFACT_FORMAT, workers: int = 1) -> List[str]:
+        """
+        Writes the dataset as part-00000.<file_format>, ... shards of rows_per_shard rows, the
+        same rows as iter_frames(n_rows, rows_per_shard). Returns the shard paths in id order.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        starts = list(range(0, n_rows, rows_per_shard))
+        shard_paths = [os.path.join(output_dir, f"part-{index:05d}.{file_format}") for index in range(len(starts))]
+        jobs = [(shard_path, min(rows_per_shard, n_rows - start), start + 1, index)
+                for index, (shard_path, start) in enumerate(zip(shard_paths, starts))]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(self.write_shard, *job) for job in jobs]:
+                    future.result()
+        else:
+            for job in jobs:
+                self.write_shard(*job)
+        return shard_paths
+
+    def load_collection(self, collection, n_rows: int, chunk_rows: int = 100000, batch_size: int = 10000) -> int:
+        """
+        Bulk-loads the dataset into a MongoDB collection (pymongo or an in-memory stand-in such
+        as mongomock) with unordered insert_many batches, returns the number of documents.
+        """
+        documents = 0
+        for frame in self.iter_frames(n_rows, chunk_rows):
+            records = frame.to_dict("records")
+            for start in range(0, len(records), batch_size):
+                collection.insert_many(records[start:start + batch_size], ordered=False)
+            documents += len(records)
+        return documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=381109)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=1000000, help="rows per shard or generated chunk")
+    parser.add_argument("--output-dir", help="write CSV/Parquet shards into this directory")
+    parser.add_argument("--format", choices=("parquet", "csv"), default=DATA_ARTIFACT_FORMAT)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating shards")
+    parser.add_argument("--mongo-url", help="bulk-load into this MongoDB instead")
+    parser.add_argument("--database", default=DATABASE_NAME)
+    parser.add_argument("--collection", default=DATA_INGESTION_COLLECTION_NAME)
+    parser.add_argument("--drop", action="store_true", help="drop the collection before loading")
+    args = parser.parse_args()
+    if not args.output_dir and not args.mongo_url:
+        parser.error("give --output-dir or --mongo-url")
+
+    generator = SyntheticVehicleData(seed=args.seed)
+    sample = generator.frame(min(args.rows, 100000))
+    print(f"Response rate {sample[TARGET_COLUMN].mean():.4f}, "
+          f"Previously_Insured {sample['Previously_Insured'].mean():.3f}, Age median {sample['Age'].median():.0f}")
+    start = time.perf_counter()
+    if args.output_dir:
+        shard_paths = generator.write_shards(args.output_dir, args.rows, args.chunk_rows,
+                                             file_format=args.format, workers=args.workers)
+        size = sum(os.path.getsize(shard_path) for shard_path in shard_paths)
+        print(f"Wrote {args.rows} rows as {len(shard_paths)} {args.format} shards ({size / 1e6:.1f} MB) "
+              f"into {args.output_dir}")
+    else:
+        from src.configuration.mongo_db_connection import MongoDBClient
+
+        collection = MongoDBClient(database_name=args.database, mongo_db_url=args.mongo_url).database[args.collection]
+        if args.drop:
+            collection.drop()
+        documents = generator.load_collection(collection, args.rows, chunk_rows=min(args.chunk_rows, 100000))
+        print(f"Loaded {documents} documents into {args.database}.{args.collection}")
+    seconds = time.perf_counter() - start
+    print(f"{seconds:.1f}s, {args.rows / seconds:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
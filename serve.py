@@ -0,0 +1,32 @@
+"""
+Serving-only entry point for prediction pods.
+
+Runs the same FastAPI app as app.py with the /train routes turned off. Nothing on the
+serving path imports the training stack (imblearn, pymongo, certifi) and sklearn and boto3
+are only imported while the model loads in the background, so the server accepts
+connections quickly after a pod starts.
+
+With APP_WORKERS > 1 the model is loaded once and the workers are forked from that
+process, sharing the model memory (see src/pipline/prefork_server.py).
+
+    python serve.py
+    APP_WORKERS=4 python serve.py
+    uvicorn serve:app --host 0.0.0.0 --port 5000
+"""
+import os
+
+os.environ.setdefault("APP_TRAINING_ENABLED", "0")
+
+from uvicorn import run as app_run
+
+from app import app
+from src.constants import APP_HOST, APP_PORT, APP_WORKERS
+from src.pipline.prefork_server import PreforkServer
+
+__all__ = ["app"]
+
+if __name__ == "__main__":
+    if APP_WORKERS > 1:
+        PreforkServer(app, host=APP_HOST, port=APP_PORT, workers=APP_WORKERS).run()
+    else:
+        app_run(app, host=APP_HOST, port=APP_PORT)
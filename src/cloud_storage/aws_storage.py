@@ -44,6 +44,26 @@ class SimpleStorageService:
         except Exception as e:
             raise MyException(e, sys)
 
+    def get_object_etag(self, bucket_name: str, s3_key: str) -> Union[str, None]:
+        """
+        Returns the ETag of an object, which changes whenever the object is overwritten.
+
+        Args:
+            bucket_name (str): Name of the S3 bucket.
+            s3_key (str): Key of the object.
+
+        Returns:
+            str: The ETag, or None when the object does not exist.
+        """
+        try:
+            return self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)["ETag"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise MyException(e, sys) from e
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     @staticmethod
     def read_object(object_name: str, decode: bool = True, make_readable: bool = False) -> Union[StringIO, str]:
         """
@@ -176,6 +196,44 @@ class SimpleStorageService:
         except Exception as e:
             raise MyException(e, sys) from e
 
+    def download_file(self, bucket_filename: str, to_filename: str, bucket_name: str) -> str:
+        """
+        Downloads a file from the specified S3 bucket to a local path. The file is streamed to
+        disk instead of being read into memory, and renamed into place once it is complete.
+
+        Args:
+            bucket_filename (str): Key of the file in the bucket.
+            to_filename (str): Local destination path.
+            bucket_name (str): Name of the S3 bucket.
+
+        Returns:
+            str: The local destination path.
+        """
+        logging.info("Entered the download_file method of SimpleStorageService class")
+        try:
+            os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+            tmp_filename = f"{to_filename}.{os.getpid()}.download"
+            self.s3_resource.meta.client.download_file(bucket_name, bucket_filename, tmp_filename)
+            os.replace(tmp_filename, to_filename)
+            logging.info(f"Downloaded {bucket_filename} from {bucket_name} to {to_filename}")
+            return to_filename
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def delete_file(self, bucket_filename: str, bucket_name: str) -> None:
+        """
+        Deletes a file from the specified S3 bucket, a missing file is not an error.
+
+        Args:
+            bucket_filename (str): Key of the file in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+        """
+        try:
+            self.s3_client.delete_object(Bucket=bucket_name, Key=bucket_filename)
+            logging.info(f"Deleted {bucket_filename} from {bucket_name}")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     def upload_df_as_csv(self, data_frame: DataFrame, local_filename: str, bucket_filename: str, bucket_name: str) -> None:
         """
         Uploads a DataFrame as a CSV file to the specified S3 bucket.
@@ -1,24 +1,39 @@
 import os
 import sys
+from typing import Optional
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 from sklearn.model_selection import train_test_split
 
+from src.constants import TARGET_COLUMN
 from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.exception import MyException
 from src.logger import logging
+from src.configuration.mongo_db_connection import mongo_client_manager
+from src.data_access.feature_store import FeatureStore
 from src.data_access.proj1_data import Proj1Data
+from src.utils.main_utils import DataFrameChunkWriter, apply_schema_dtypes, read_dataframe, write_dataframe
 
 class DataIngestion:
-    def __init__(self,data_ingestion_config:DataIngestionConfig=DataIngestionConfig()):
+    def __init__(self,data_ingestion_config:DataIngestionConfig=DataIngestionConfig(),
+                 proj1_data: Optional[Proj1Data] = None):
         """
         :param data_ingestion_config: configuration for data ingestion
+        :param proj1_data: exporter to read the collection with, connects to MONGODB_URL when omitted
         """
         try:
             self.data_ingestion_config = data_ingestion_config
+            self.proj1_data = proj1_data
+            if data_ingestion_config.split_mode not in ("random", "hash"):
+                raise ValueError(f"Unknown split mode {data_ingestion_config.split_mode!r}, use 'random' or 'hash'")
         except Exception as e:
             raise MyException(e,sys)
+
+    def _get_proj1_data(self) -> Proj1Data:
+        return self.proj1_data if self.proj1_data is not None else Proj1Data()
         
 
     def export_data_into_feature_store(self)->DataFrame:
@@ -31,20 +46,121 @@ class DataIngestion:
         """
         try:
             logging.info(f"Exporting data from mongodb")
-            my_data = Proj1Data()
-            dataframe = my_data.export_collection_as_dataframe(collection_name=
-                                                                   self.data_ingestion_config.collection_name)
-            logging.info(f"Shape of dataframe: {dataframe.shape}")
-            feature_store_file_path  = self.data_ingestion_config.feature_store_file_path
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-            logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
-            dataframe.to_csv(feature_store_file_path,index=False,header=True)
+            config = self.data_ingestion_config
+            my_data = self._get_proj1_data()
+            # stream the collection into the feature store chunk by chunk, the documents are
+            # never held in memory all at once; both paths order the rows by the partition key
+            # so a parallel export gives the same data as a serial one
+            if config.incremental:
+                # only documents above the collection's watermark are fetched, the persistent
+                # store outlives the timestamped artifact directory of this run
+                feature_store = FeatureStore(os.path.join(config.persistent_feature_store_dir, config.collection_name),
+                                             max_shards=config.feature_store_max_shards)
+                logging.info(f"Ingesting new data into the persistent feature store: {feature_store.store_dir}")
+                rows = feature_store.ingest(my_data, collection_name=config.collection_name,
+                                            watermark_field=config.watermark_field,
+                                            chunk_size=config.export_chunk_size,
+                                            batch_size=config.cursor_batch_size,
+                                            pushdown=config.pushdown)
+                logging.info(f"Ingested {rows} new rows into the feature store")
+                dataframe = feature_store.read_dataframe()
+            elif config.export_workers > 1:
+                logging.info(f"Saving exported data as feature store shards in: {config.feature_store_shard_dir}")
+                shard_paths = my_data.export_collection_to_shards(
+                    collection_name=config.collection_name, shard_dir=config.feature_store_shard_dir,
+                    workers=config.export_workers, partitions=config.export_partitions or None,
+                    key=config.export_partition_key, executor_kind=config.export_executor,
+                    chunk_size=config.export_chunk_size, batch_size=config.cursor_batch_size,
+                    pushdown=config.pushdown)
+                # categories are applied once on the whole frame, so every shard shares them
+                dataframe = apply_schema_dtypes(pd.concat([read_dataframe(shard_path, column_types={})
+                                                           for shard_path in shard_paths], ignore_index=True))
+            else:
+                feature_store_file_path = config.feature_store_file_path
+                logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
+                rows = my_data.export_collection_to_file(collection_name=config.collection_name,
+                                                         file_path=feature_store_file_path,
+                                                         chunk_size=config.export_chunk_size,
+                                                         batch_size=config.cursor_batch_size,
+                                                         sort_key=config.export_partition_key,
+                                                         pushdown=config.pushdown)
+                logging.info(f"Exported {rows} rows into the feature store")
+                dataframe = read_dataframe(feature_store_file_path)
+            logging.info(f"Shape of dataframe: {dataframe.shape}, "
+                         f"{dataframe.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
             return dataframe
 
         except Exception as e:
             raise MyException(e,sys)
 
+    def hash_test_mask(self, dataframe: DataFrame) -> np.ndarray:
+        """
+        Returns which rows belong to the test set, decided by a stable hash of the split hash
+        column. The key is the Mongo _id by default, the one column every export path keeps,
+        so the streamed and the exported split put a row in the same set. Another exported
+        column with unique values may be configured, rows missing it raise ValueError.
+
+        Without stratification a row is in the test set when its hash falls below the test
+        ratio, the same set on every run and whichever chunk it arrives in. With stratification
+        the rows of every target class are ranked by their hash and the lowest
+        train_test_split_ratio share of each class goes to the test set, so every class keeps
+        the ratio exactly within the frame; streamed chunks are stratified one by one, a row
+        then keeps its set as long as its chunk holds the same rows.
+        """
+        config = self.data_ingestion_config
+        if config.split_hash_column not in dataframe.columns:
+            raise ValueError(f"Split hash column {config.split_hash_column!r} is not an exported column")
+        keys = dataframe[config.split_hash_column]
+        if keys.isna().any():
+            raise ValueError(f"{int(keys.isna().sum())} rows have no split hash column {config.split_hash_column!r}")
+        if pd.api.types.is_float_dtype(keys):
+            # int ids read back as float in files written with missing values, hash them as integers
+            keys = keys.astype(np.int64)
+        # hash_pandas_object uses a fixed key, the hashes are the same in every process
+        hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+        if not config.split_stratify:
+            return (hashes & 0xFFFFFFFF) < int(config.train_test_split_ratio * 2 ** 32)
+
+        test_mask = np.zeros(len(dataframe), dtype=bool)
+        classes = pd.factorize(dataframe[TARGET_COLUMN], use_na_sentinel=False)[0]
+        for label in np.unique(classes):
+            rows = np.flatnonzero(classes == label)
+            test_rows = int(round(config.train_test_split_ratio * len(rows)))
+            test_mask[rows[np.argsort(hashes[rows], kind="stable")[:test_rows]]] = True
+        return test_mask
+
+    def stream_split_into_train_test(self) -> int:
+        """
+        Method Name :   stream_split_into_train_test
+        Description :   This method streams the collection out of mongodb and writes every chunk
+                        straight into the train and test files, split by hash_test_mask
+
+        Output      :   number of exported rows, memory use is bounded by one chunk
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            config = self.data_ingestion_config
+            my_data = self._get_proj1_data()
+            column_types = my_data.export_column_types(config.pushdown)
+            logging.info(f"Streaming {config.collection_name} into train and test files split by the hash of "
+                         f"{config.split_hash_column}")
+            chunks = my_data.iter_collection_chunks(config.collection_name, chunk_size=config.export_chunk_size,
+                                                    batch_size=config.cursor_batch_size,
+                                                    sort_key=config.export_partition_key,
+                                                    column_types=column_types,
+                                                    pushdown=config.pushdown)
+            with DataFrameChunkWriter(config.training_file_path, column_types) as train_writer, \
+                    DataFrameChunkWriter(config.testing_file_path, column_types) as test_writer:
+                for chunk in chunks:
+                    test_mask = self.hash_test_mask(chunk)
+                    train_writer.write(chunk[~test_mask])
+                    test_writer.write(chunk[test_mask])
+                    logging.info(f"Split {train_writer.rows} train and {test_writer.rows} test rows")
+            return train_writer.rows + test_writer.rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
     def split_data_as_train_test(self,dataframe: DataFrame) ->None:
         """
         Method Name :   split_data_as_train_test
@@ -56,7 +172,14 @@ class DataIngestion:
         logging.info("Entered split_data_as_train_test method of Data_Ingestion class")
 
         try:
-            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio)
+            config = self.data_ingestion_config
+            if config.split_mode == "hash":
+                test_mask = self.hash_test_mask(dataframe)
+                train_set, test_set = dataframe[~test_mask], dataframe[test_mask]
+            else:
+                train_set, test_set = train_test_split(
+                    dataframe, test_size=config.train_test_split_ratio, random_state=config.split_random_state,
+                    stratify=dataframe[TARGET_COLUMN] if config.split_stratify else None)
             logging.info("Performed train test split on the dataframe")
             logging.info(
                 "Exited split_data_as_train_test method of Data_Ingestion class"
@@ -65,8 +188,9 @@ class DataIngestion:
             os.makedirs(dir_path,exist_ok=True)
             
             logging.info(f"Exporting train and test file path.")
-            train_set.to_csv(self.data_ingestion_config.training_file_path,index=False,header=True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path,index=False,header=True)
+            # typed, compressed artifacts, the categories of the whole dataset are kept in both sets
+            write_dataframe(self.data_ingestion_config.training_file_path, train_set)
+            write_dataframe(self.data_ingestion_config.testing_file_path, test_set)
 
             logging.info(f"Exported train and test file path.")
         except Exception as e:
@@ -83,11 +207,19 @@ class DataIngestion:
         logging.info("Entered initiate_data_ingestion method of Data_Ingestion class")
 
         try:
-            dataframe = self.export_data_into_feature_store()
+            config = self.data_ingestion_config
+            if config.split_mode == "hash" and not config.incremental and config.export_workers <= 1:
+                # out of core: the chunks go from mongodb straight into the train and test files
+                rows = self.stream_split_into_train_test()
+                logging.info(f"Streamed {rows} rows from mongodb into the train and test files")
+            else:
+                dataframe = self.export_data_into_feature_store()
 
-            logging.info("Got the data from mongodb")
+                logging.info("Got the data from mongodb")
 
-            self.split_data_as_train_test(dataframe)
+                self.split_data_as_train_test(dataframe)
+            # checkout waits close to the wait queue timeout call for a larger MONGODB_MAX_POOL_SIZE
+            logging.info(f"MongoDB connection pools: {mongo_client_manager.pool_stats()}")
 
             logging.info("Performed train test split on the dataset")
 
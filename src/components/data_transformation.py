@@ -11,7 +11,8 @@ from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import DataTransformationArtifact, DataIngestionArtifact, DataValidationArtifact
 from src.exception import MyException
 from src.logger import logging
-from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file
+from src.data_access.aggregation_pushdown import is_encoded
+from src.utils.main_utils import dataframe_columns, read_dataframe, save_object, save_numpy_array_data, read_yaml_file
 
 
 class DataTransformation:
@@ -27,12 +28,17 @@ class DataTransformation:
             raise MyException(e, sys)
 
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, columns=None) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_dataframe(file_path, columns=columns)
         except Exception as e:
             raise MyException(e, sys)
 
+    def _feature_columns(self, file_path) -> list:
+        """Columns of the file without the drop_columns of the schema, those are never read."""
+        drop_col = self._schema_config['drop_columns']
+        return [column for column in dataframe_columns(file_path) if column != drop_col]
+
     def get_data_transformer_object(self) -> Pipeline:
         """
         Creates and returns a data transformer object for the data, 
@@ -103,6 +109,16 @@ class DataTransformation:
             df = df.drop(drop_col, axis=1)
         return df
 
+    @staticmethod
+    def _float64_features(df):
+        """
+        Widens the float32 columns of the compact dtypes to float64. The scalers keep float32
+        input in float32, the features and so the resampling and the trained model would then
+        depend on DATA_COMPACT_DTYPES; the int8/int16 columns are converted to float64 by the
+        scalers exactly.
+        """
+        return df.astype({column: np.float64 for column, dtype in df.dtypes.items() if dtype == np.float32})
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         """
         Initiates the data transformation component for the pipeline.
@@ -113,37 +129,44 @@ class DataTransformation:
                 raise Exception(self.data_validation_artifact.message)
 
             # Load train and test data
-            train_df = self.read_data(file_path=self.data_ingestion_artifact.trained_file_path)
-            test_df = self.read_data(file_path=self.data_ingestion_artifact.test_file_path)
-            logging.info("Train-Test data loaded")
-
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+            train_file_path = self.data_ingestion_artifact.trained_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            train_df = self.read_data(file_path=train_file_path, columns=self._feature_columns(train_file_path))
+            test_df = self.read_data(file_path=test_file_path, columns=self._feature_columns(test_file_path))
+            logging.info(f"Train-Test data loaded, {train_df.memory_usage(deep=True).sum() / 1e6:.1f} MB and "
+                         f"{test_df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+
+            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
             target_feature_train_df = train_df[TARGET_COLUMN]
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
             target_feature_test_df = test_df[TARGET_COLUMN]
             logging.info("Input and Target cols defined for both train and test df.")
 
-            # Apply custom transformations in specified sequence
-            input_feature_train_df = self._map_gender_column(input_feature_train_df)
-            input_feature_train_df = self._drop_id_column(input_feature_train_df)
-            input_feature_train_df = self._create_dummy_columns(input_feature_train_df)
-            input_feature_train_df = self._rename_columns(input_feature_train_df)
-
-            input_feature_test_df = self._map_gender_column(input_feature_test_df)
-            input_feature_test_df = self._drop_id_column(input_feature_test_df)
-            input_feature_test_df = self._create_dummy_columns(input_feature_test_df)
-            input_feature_test_df = self._rename_columns(input_feature_test_df)
-            logging.info("Custom transformations applied to train and test data")
+            # Apply custom transformations in specified sequence, unless mongodb already applied
+            # them in the export (DATA_INGESTION_PUSHDOWN)
+            if is_encoded(input_feature_train_df.columns):
+                logging.info("Train-Test data exported encoded, skipping custom transformations")
+            else:
+                input_feature_train_df = self._map_gender_column(input_feature_train_df)
+                input_feature_train_df = self._drop_id_column(input_feature_train_df)
+                input_feature_train_df = self._create_dummy_columns(input_feature_train_df)
+                input_feature_train_df = self._rename_columns(input_feature_train_df)
+
+                input_feature_test_df = self._map_gender_column(input_feature_test_df)
+                input_feature_test_df = self._drop_id_column(input_feature_test_df)
+                input_feature_test_df = self._create_dummy_columns(input_feature_test_df)
+                input_feature_test_df = self._rename_columns(input_feature_test_df)
+                logging.info("Custom transformations applied to train and test data")
 
             logging.info("Starting data transformation")
             preprocessor = self.get_data_transformer_object()
             logging.info("Got the preprocessor object")
 
             logging.info("Initializing transformation for Training-data")
-            input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+            input_feature_train_arr = preprocessor.fit_transform(self._float64_features(input_feature_train_df))
             logging.info("Initializing transformation for Testing-data")
-            input_feature_test_arr = preprocessor.transform(input_feature_test_df)
+            input_feature_test_arr = preprocessor.transform(self._float64_features(input_feature_test_df))
             logging.info("Transformation done end to end to train-test df.")
 
             logging.info("Applying SMOTEENN for handling imbalanced dataset.")
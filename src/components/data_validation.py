@@ -8,7 +8,9 @@ from pandas import DataFrame
 
 from src.exception import MyException
 from src.logger import logging
-from src.utils.main_utils import read_yaml_file
+from src.data_access.aggregation_pushdown import is_encoded
+from src.data_access.proj1_data import Proj1Data
+from src.utils.main_utils import dataframe_columns, read_dataframe, read_yaml_file
 from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from src.entity.config_entity import DataValidationConfig
 from src.constants import SCHEMA_FILE_PATH
@@ -36,12 +38,27 @@ class DataValidation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
+            if is_encoded(dataframe.columns):
+                return self._validate_encoded_columns(dataframe)
             status = len(dataframe.columns) == len(self._schema_config["columns"])
             logging.info(f"Is required column present: [{status}]")
             return status
         except Exception as e:
             raise MyException(e, sys)
 
+    def _validate_encoded_columns(self, dataframe: DataFrame) -> bool:
+        """
+        Validates the columns of an export encoded by mongodb (DATA_INGESTION_PUSHDOWN): _id,
+        the mapped and numerical columns and the one-hot columns of the schema encodings.
+        """
+        expected_columns = Proj1Data.export_column_types(pushdown=True)
+        missing_columns = [column for column in expected_columns if column not in dataframe.columns]
+        if missing_columns:
+            logging.info(f"Missing encoded column: {missing_columns}")
+        status = not missing_columns and len(dataframe.columns) == len(expected_columns)
+        logging.info(f"Is required column present: [{status}]")
+        return status
+
     def is_column_exist(self, df: DataFrame) -> bool:
         """
         Method Name :   is_column_exist
@@ -51,6 +68,8 @@ class DataValidation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
+            if is_encoded(df.columns):
+                return self._validate_encoded_columns(df)
             dataframe_columns = df.columns
             missing_numerical_columns = []
             missing_categorical_columns = []
@@ -76,7 +95,17 @@ class DataValidation:
     @staticmethod
     def read_data(file_path) -> DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_dataframe(file_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def read_columns(file_path) -> DataFrame:
+        """
+        Returns an empty dataframe with the columns of the file, the column checks need no rows.
+        """
+        try:
+            return DataFrame(columns=dataframe_columns(file_path))
         except Exception as e:
             raise MyException(e, sys)
         
@@ -93,8 +122,8 @@ class DataValidation:
         try:
             validation_error_msg = ""
             logging.info("Starting data validation")
-            train_df, test_df = (DataValidation.read_data(file_path=self.data_ingestion_artifact.trained_file_path),
-                                 DataValidation.read_data(file_path=self.data_ingestion_artifact.test_file_path))
+            train_df, test_df = (DataValidation.read_columns(file_path=self.data_ingestion_artifact.trained_file_path),
+                                 DataValidation.read_columns(file_path=self.data_ingestion_artifact.test_file_path))
 
             # Checking col len of dataframe for train/test df
             status = self.validate_number_of_columns(dataframe=train_df)
@@ -7,7 +7,8 @@ from src.entity.s3_estimator import Proj1Estimator
 from typing import Optional
 from src.logger import logging 
 from sklearn.metrics import f1_score 
-from src.utils.main_utils import load_object 
+from src.utils.main_utils import dataframe_columns, load_object, read_dataframe
+from src.data_access.aggregation_pushdown import is_encoded
 from dataclasses import dataclass 
 from src.entity.config_entity import ModelEvaluationConfig
 from src.entity.artifact_entity import ModelTrainerArtifact, DataIngestionArtifact, ModelEvaluationArtifact
@@ -22,7 +23,7 @@ class EvaluateModelResponse:
 
 class ModelEvaluate:
     def __init__(self,model_trainer_artifact:ModelTrainerArtifact,data_ingestion_artifact:DataIngestionArtifact,
-                model_eval_config:ModelEvaluationConfig)
+                model_eval_config:ModelEvaluationConfig):
         
         try:
             self.model_eval_config = model_eval_config
@@ -91,15 +92,20 @@ class ModelEvaluate:
         """
         try:
             ## doing the prediction on test set
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            # the Mongo _id is dropped anyway, Parquet artifacts skip reading it
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            test_df = read_dataframe(test_file_path,
+                                     columns=[column for column in dataframe_columns(test_file_path) if column != "_id"])
             x , y = test_df.drop(TARGET_COLUMN,axis=1), test_df[TARGET_COLUMN]
 
             logging.info("test data loaded and now doing the prediction")
 
-            x = self._map_gender_column(x)
-            x = self._drop_id_column(x)
-            x = self._create_dummy_columns(x)
-            x = self._rename_columns(x)
+            # an export pushed down to mongodb (DATA_INGESTION_PUSHDOWN) is already encoded
+            if not is_encoded(x.columns):
+                x = self._map_gender_column(x)
+                x = self._drop_id_column(x)
+                x = self._create_dummy_columns(x)
+                x = self._rename_columns(x)
 
             trained_model = self.model_trainer_artifact.trained_model_file_path
             logging.info(f"trained model loaded / exist:{trained_model}")
@@ -115,7 +121,7 @@ class ModelEvaluate:
                 best_model_f1_score = f1_score(y,y_hat_best_model)
                 logging.info(f"F1_Score-Production Model: {best_model_f1_score}, F1_Score-New Trained Model: {trained_model_f1_score}")
 
-            tmp_best_model_score  = 0 if best_model_f1_score is None else best_model_f1_score:
+            tmp_best_model_score  = 0 if best_model_f1_score is None else best_model_f1_score
             result = EvaluateModelResponse(trained_model_f1_score = trained_model_f1_score,
                                             best_model_f1_score = best_model_f1_score,
                                             is_model_accepted = trained_model_f1_score > tmp_best_model_score,
@@ -136,7 +142,7 @@ class ModelEvaluate:
         """  
         try:
             logging.info("Model Evaluatiomn started")
-            model_eval_response = self.evaluate_model()
+            evaluate_model_response = self.evaluate_model()
             s3_model_path = self.model_eval_config.s3_model_key_path
 
             model_evaluation_artifact = ModelEvaluationArtifact(
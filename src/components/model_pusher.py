@@ -7,12 +7,14 @@ from src.exception import MyException
 from src.logger import logging
 from src.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact
 from src.entity.config_entity import ModelPusherConfig
+from src.entity.model_artifact import convert_model_to_artifact
 from src.entity.s3_estimator import Proj1Estimator
+from src.constants import MODEL_ARTIFACT_FILE_NAME
 
 
 class ModelPusher:
     def __init__(self,model_evaluation_artifact : ModelEvaluationArtifact,
-                 model_pusher_config ; ModelPusherConfig):
+                 model_pusher_config : ModelPusherConfig):
         '''
         :param model_evaluation_artifact: Output reference of data evaluation artifact stage
         :param model_pusher_config: Configuration for model pusher
@@ -25,6 +27,27 @@ class ModelPusher:
 
         
 
+    def push_model_artifact(self) -> None:
+        """
+        Converts the trained model to the memory-mappable artifact format and uploads it, so the
+        serving pods can map the model instead of unpickling it. When the model cannot be
+        converted the previous artifact is removed, serving then falls back to model.pkl
+        instead of loading an outdated artifact.
+        """
+        trained_model_path = self.model_evaluation_artifact.trained_model_path
+        artifact_file_path = os.path.join(os.path.dirname(trained_model_path), MODEL_ARTIFACT_FILE_NAME)
+        try:
+            convert_model_to_artifact(trained_model_path, artifact_file_path)
+        except Exception as e:
+            logging.warning(f"Trained model cannot be converted to a model artifact, removing the old one: {e}")
+            self.s3.delete_file(self.model_pusher_config.s3_model_artifact_key_path,
+                                bucket_name=self.model_pusher_config.bucket_name)
+            return
+        self.s3.upload_file(artifact_file_path,
+                            to_filename=self.model_pusher_config.s3_model_artifact_key_path,
+                            bucket_name=self.model_pusher_config.bucket_name,
+                            remove=False)
+
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         """
         Method Name :   initiate_model_evaluation
@@ -38,6 +61,8 @@ class ModelPusher:
             logging.info("Uploading artifacts folder to s3 bucket")
             
             logging.info("Uploading new model to S3 bucket....")
+            # the artifact goes first, serving prefers it and must never pair it with an older pickle
+            self.push_model_artifact()
             self.proj1_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
                                                         s3_model_path=self.model_pusher_config.s3_model_key_path)
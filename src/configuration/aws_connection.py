@@ -24,14 +24,14 @@ class S3Client:
                     raise Exception(f"{AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set")
                 # will  make a connection with s3 
                 S3Client.s3_resource = boto3.resource('s3',
-                                            aws_access_key_id=__access_key_id,
-                                            aws_secret_access_key=__secret_access_key,
-                                            region_name=region_name
+                                            aws_access_key_id=_access_key_id,
+                                            aws_secret_access_key=_secret_key_id,
+                                            region_name=REGION_NAME
                                             )
                 S3Client.s3_client = boto3.client('s3',
-                                        aws_access_key_id=__access_key_id,
-                                        aws_secret_access_key=__secret_access_key,
-                                        region_name=region_name
+                                        aws_access_key_id=_access_key_id,
+                                        aws_secret_access_key=_secret_key_id,
+                                        region_name=REGION_NAME
                                         )
         self.s3_resource = S3Client.s3_resource
         self.s3_client = S3Client.s3_client
@@ -1,18 +1,213 @@
 ## for setting up the connection with the mongodb database
 
-import os 
-import sys 
+import os
+import sys
+import threading
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
 import certifi
 import pymongo
-from dotenv import load_dotenv 
+from pymongo import monitoring
+from dotenv import load_dotenv
 
 from src.exception import MyException
-from src.logger import logging 
-from src.constants import DATABASE_NAME,MONGODB_URL_KEY
+from src.logger import logging
+from src.constants import (DATABASE_NAME, MONGODB_APP_NAME, MONGODB_CONNECT_TIMEOUT_MS, MONGODB_MAX_CONNECTING,
+                           MONGODB_MAX_IDLE_TIME_MS, MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE,
+                           MONGODB_READ_PREFERENCE, MONGODB_SERVER_SELECTION_TIMEOUT_MS, MONGODB_SOCKET_TIMEOUT_MS,
+                           MONGODB_URL_KEY, MONGODB_WAIT_QUEUE_TIMEOUT_MS)
+from src.metrics import registry
 
 # Load the certificate authority file to avoid timeout errors when connecting to MongoDB
 ca = certifi.where()
 
+# Checkout waits range from microseconds (idle connection in the pool) to the wait queue timeout
+MONGODB_CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+MONGODB_POOL_CHECKOUT_SECONDS = registry.histogram(
+    "mongodb_pool_checkout_duration_seconds",
+    "Time an operation waited for a pooled MongoDB connection, by server",
+    labelnames=("address",), buckets=MONGODB_CHECKOUT_BUCKETS)
+MONGODB_POOL_CHECKOUTS_TOTAL = registry.counter(
+    "mongodb_pool_checkouts_total",
+    "Connection checkouts by server and outcome (ok, timeout, connectionError, poolClosed)",
+    labelnames=("address", "outcome"))
+MONGODB_POOL_CONNECTIONS = registry.gauge(
+    "mongodb_pool_connections",
+    "Open MongoDB connections by server and state (open, in_use)",
+    labelnames=("address", "state"))
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Records the connection pool events (CMAP) of the managed clients: how long every checkout
+    waited, how many failed and how many connections are open and checked out, per server.
+    Waits close to waitQueueTimeoutMS or in_use stuck at maxPoolSize mean the pool is too small
+    for the concurrency of the export.
+    """
+
+    def __init__(self) -> None:
+        self.address_labels: Dict[tuple, str] = {}
+
+    def _address(self, address) -> str:
+        label = self.address_labels.get(address)
+        if label is None:
+            label = self.address_labels[address] = f"{address[0]}:{address[1]}" if address else "unknown"
+        return label
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        address = self._address(event.address)
+        MONGODB_POOL_CHECKOUT_SECONDS.observe(event.duration or 0.0, address)
+        MONGODB_POOL_CHECKOUTS_TOTAL.inc(address, "ok")
+        MONGODB_POOL_CONNECTIONS.inc(address, "in_use")
+
+    def connection_check_out_failed(self, event) -> None:
+        address = self._address(event.address)
+        MONGODB_POOL_CHECKOUT_SECONDS.observe(event.duration or 0.0, address)
+        MONGODB_POOL_CHECKOUTS_TOTAL.inc(address, event.reason)
+
+    def connection_checked_in(self, event) -> None:
+        MONGODB_POOL_CONNECTIONS.dec(self._address(event.address), "in_use")
+
+    def connection_created(self, event) -> None:
+        MONGODB_POOL_CONNECTIONS.inc(self._address(event.address), "open")
+
+    def connection_closed(self, event) -> None:
+        MONGODB_POOL_CONNECTIONS.dec(self._address(event.address), "open")
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+
+class MongoClientManager:
+    """
+    Keeps one pooled MongoClient per connection URL and process.
+
+    A MongoClient owns a connection pool and monitor threads and is safe to share between
+    threads, so every MongoDBClient of a process reuses it instead of paying the TLS handshake
+    and topology discovery again. Pool size, timeouts and read preference come from the
+    MONGODB_* constants. A client is not fork safe: a forked worker drops the clients it
+    inherited (without closing the parent's sockets) and connects again on first use.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, pymongo.MongoClient] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.listener = PoolMetricsListener()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # the lock may have been held by another thread of the parent at fork time
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    @staticmethod
+    def uses_tls(mongo_db_url: str) -> bool:
+        """
+        Returns whether the connection string asks for TLS: mongodb+srv:// URLs (Atlas) enable
+        it by default, plain mongodb:// URLs only with tls=true or ssl=true.
+        """
+        scheme, _, rest = mongo_db_url.partition("://")
+        if scheme.lower() == "mongodb+srv":
+            return True
+        options = parse_qs(rest.partition("?")[2].lower())
+        return any(value == "true" for key in ("tls", "ssl") for value in options.get(key, []))
+
+    @classmethod
+    def client_options(cls, mongo_db_url: str) -> dict:
+        """
+        Returns the MongoClient keyword arguments of the configured pool. The certifi CA bundle
+        is only passed for TLS connections, pymongo would otherwise turn TLS on for a local mongod.
+        """
+        options = {"tlsCAFile": ca} if cls.uses_tls(mongo_db_url) else {}
+        return {
+            **options,
+            "appname": MONGODB_APP_NAME,
+            "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": MONGODB_MIN_POOL_SIZE,
+            "maxConnecting": MONGODB_MAX_CONNECTING,
+            "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS or None,
+            "waitQueueTimeoutMS": MONGODB_WAIT_QUEUE_TIMEOUT_MS or None,
+            "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS or None,
+            "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS or None,
+            "readPreference": MONGODB_READ_PREFERENCE,
+        }
+
+    def get_client(self, mongo_db_url: Optional[str] = None) -> pymongo.MongoClient:
+        """
+        Returns the client of the URL, creating it on first use in this process.
+
+        :param mongo_db_url: Connection string, read from the MONGODB_URL environment variable when omitted
+        """
+        if mongo_db_url is None:
+            mongo_db_url = os.getenv(MONGODB_URL_KEY)
+            if mongo_db_url is None:
+                raise Exception(f"{MONGODB_URL_KEY} is not set")
+        if self._pid != os.getpid():
+            # a process started without fork handlers (or an interpreter without them)
+            self._reset_after_fork()
+        client = self._clients.get(mongo_db_url)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(mongo_db_url)
+                if client is None:
+                    client = pymongo.MongoClient(mongo_db_url, event_listeners=[self.listener],
+                                                 **self.client_options(mongo_db_url))
+                    self._clients[mongo_db_url] = client
+                    logging.info(f"Created MongoDB client with pool size {MONGODB_MAX_POOL_SIZE} "
+                                 f"in process {self._pid}")
+        return client
+
+    def close_all(self) -> None:
+        """
+        Closes the clients of this process, the next get_client connects again.
+        """
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    def pool_stats(self) -> Dict[str, dict]:
+        """
+        Returns the pool metrics of this process per server: checkouts by outcome, their mean
+        and total wait, and open and checked out connections.
+        """
+        stats: Dict[str, dict] = {}
+        for (address, outcome), cell in MONGODB_POOL_CHECKOUTS_TOTAL.collect().items():
+            stats.setdefault(address, {}).setdefault("checkouts", {})[outcome] = int(cell[0])
+        for (address,), cell in MONGODB_POOL_CHECKOUT_SECONDS.collect().items():
+            total_seconds, count = cell[-2], cell[-1]
+            stats.setdefault(address, {}).update({"checkout_wait_seconds_total": total_seconds,
+                                                  "checkout_wait_seconds_mean": total_seconds / count if count else 0.0})
+        for (address, state), cell in MONGODB_POOL_CONNECTIONS.collect().items():
+            stats.setdefault(address, {})[f"connections_{state}"] = int(cell[0])
+        return stats
+
+
+# Process-wide manager shared by every MongoDBClient
+mongo_client_manager = MongoClientManager()
+
+
 class MongoDBClient:
     """
     MongoDBClient is responsible for establishing a connection to the MongoDB database.
@@ -20,7 +215,8 @@ class MongoDBClient:
     Attributes:
     ----------
     client : MongoClient
-        A shared MongoClient instance for the class.
+        The pooled MongoClient of this process, shared by all MongoDBClient instances through
+        mongo_client_manager.
     database : Database
         The specific database instance that MongoDBClient connects to.
 
@@ -30,34 +226,18 @@ class MongoDBClient:
         Initializes the MongoDB connection using the given database name.
     """
 
-    client = None  # Shared MongoClient instance across all MongoDBClient instances
-
-    def __init__(self,database_name:str = DATABASE_NAME) -> None:
+    def __init__(self,database_name:str = DATABASE_NAME, mongo_db_url: Optional[str] = None) -> None:
         """
-        initilize the mongodb client and if not present then create a new 
+        use the shared mongodb client of the process, it is created on first use
+
+        :param database_name: Database to connect to
+        :param mongo_db_url: Connection string, the MONGODB_URL environment variable when omitted
         """
         try:
-            if MongoDBClient.client is None:
-                mongo_db_url = os.getenv(MONGODB_URL_KEY)
-                if mongo_db_url is None:
-                    raise Exception(f"{MONGODB_URL_KEY} is not set")
-                
-            # establish a new mongodb connection 
-            MongoDBClient.client = pymongo.MongoClient(mongo_db_url,tlsCAFile = ca)
-            # used the shared mongo db client 
-            self.client = MongoDBClient.client 
+            self.client = mongo_client_manager.get_client(mongo_db_url)
             self.database = self.client[database_name]
             self.database_name = database_name
             logging.info("Conection to the mongodb is done")
 
         except Exception as e:
             raise MyException(e,sys)
-        
-    
-
-
-
-
-
-
-
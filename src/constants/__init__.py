@@ -5,20 +5,40 @@ from datetime import date
 DATABASE_NAME = "Proj1"
 COLLECTION_NAME = "Proj1-Data"
 MONGODB_URL_KEY = "MONGODB_URL"
+# Connection pool of the shared MongoClient, 0 leaves a timeout unset (pymongo waits forever)
+MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", 100))
+MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", 0))
+MONGODB_MAX_CONNECTING: int = int(os.getenv("MONGODB_MAX_CONNECTING", 2))
+MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 0))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 0))
+MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 20000))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 30000))
+MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", 0))
+MONGODB_READ_PREFERENCE: str = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+MONGODB_APP_NAME: str = os.getenv("MONGODB_APP_NAME", "capstone2")
 
 PIPELINE_NAME: str = ""
 ARTIFACT_DIR: str = "artifact"
 
 MODEL_FILE_NAME = "model.pkl"
+# Memory-mappable copy of the compiled model, pushed next to model.pkl
+MODEL_ARTIFACT_FILE_NAME = "model.vmdl"
 
 TARGET_COLUMN = "Response"
 CURRENT_YEAR = date.today().year
 PREPROCSSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
-FILE_NAME: str = "data.csv"
-TRAIN_FILE_NAME: str = "train.csv"
-TEST_FILE_NAME: str = "test.csv"
+# Format of the tabular artifacts (feature store, train and test sets): "parquet" or "csv"
+DATA_ARTIFACT_FORMAT: str = os.getenv("DATA_ARTIFACT_FORMAT", "parquet")
+DATA_ARTIFACT_COMPRESSION: str = os.getenv("DATA_ARTIFACT_COMPRESSION", "zstd")
+FILE_NAME: str = f"data.{DATA_ARTIFACT_FORMAT}"
+TRAIN_FILE_NAME: str = f"train.{DATA_ARTIFACT_FORMAT}"
+TEST_FILE_NAME: str = f"test.{DATA_ARTIFACT_FORMAT}"
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
+# Load the data with the compact dtypes of schema.yaml (int8/int16/float32) instead of int64/float64
+DATA_COMPACT_DTYPES: bool = os.getenv("DATA_COMPACT_DTYPES", "1") == "1"
+# Rows converted at a time when an artifact is read with compact dtypes
+DATA_READ_CHUNK_ROWS: int = int(os.getenv("DATA_READ_CHUNK_ROWS", "250000"))
 
 
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
@@ -34,6 +54,23 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.25
+DATA_INGESTION_EXPORT_CHUNK_SIZE: int = int(os.getenv("DATA_INGESTION_EXPORT_CHUNK_SIZE", 50000))
+DATA_INGESTION_CURSOR_BATCH_SIZE: int = int(os.getenv("DATA_INGESTION_CURSOR_BATCH_SIZE", 10000))
+DATA_INGESTION_FEATURE_STORE_SHARD_DIR: str = "shards"
+DATA_INGESTION_EXPORT_WORKERS: int = int(os.getenv("DATA_INGESTION_EXPORT_WORKERS", 1))
+DATA_INGESTION_EXPORT_PARTITIONS: int = int(os.getenv("DATA_INGESTION_EXPORT_PARTITIONS", 0))
+DATA_INGESTION_EXPORT_PARTITION_KEY: str = os.getenv("DATA_INGESTION_EXPORT_PARTITION_KEY", "_id")
+DATA_INGESTION_EXPORT_EXECUTOR: str = os.getenv("DATA_INGESTION_EXPORT_EXECUTOR", "thread")
+DATA_INGESTION_INCREMENTAL: bool = os.getenv("DATA_INGESTION_INCREMENTAL", "0") == "1"
+DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR: str = os.getenv("DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR",
+                                                             os.path.join(ARTIFACT_DIR, "feature_store"))
+DATA_INGESTION_WATERMARK_FIELD: str = os.getenv("DATA_INGESTION_WATERMARK_FIELD", "_id")
+DATA_INGESTION_FEATURE_STORE_MAX_SHARDS: int = int(os.getenv("DATA_INGESTION_FEATURE_STORE_MAX_SHARDS", 20))
+DATA_INGESTION_PUSHDOWN: bool = os.getenv("DATA_INGESTION_PUSHDOWN", "0") == "1"
+DATA_INGESTION_SPLIT_MODE: str = os.getenv("DATA_INGESTION_SPLIT_MODE", "random")
+DATA_INGESTION_SPLIT_HASH_COLUMN: str = os.getenv("DATA_INGESTION_SPLIT_HASH_COLUMN", "_id")
+DATA_INGESTION_SPLIT_STRATIFY: bool = os.getenv("DATA_INGESTION_SPLIT_STRATIFY", "0") == "1"
+DATA_INGESTION_SPLIT_RANDOM_STATE: int = int(os.getenv("DATA_INGESTION_SPLIT_RANDOM_STATE", 42))
 
 """
 Data Validation realted contant start with DATA_VALIDATION VAR NAME
@@ -70,6 +107,51 @@ MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = "my-model-mlopsproj"
 MODEL_PUSHER_S3_KEY = "model-registry"
 
+"""
+Prediction serving related constants start with PREDICTION var name
+"""
+PREDICTION_BATCH_MAX_RECORDS: int = 10000
+PREDICTION_BULK_MAX_RECORDS: int = int(os.getenv("PREDICTION_BULK_MAX_RECORDS", 1000000))
+PREDICTION_BULK_MAX_BYTES: int = int(os.getenv("PREDICTION_BULK_MAX_BYTES", 256 * 1024 * 1024))
+PREDICTION_MICRO_BATCH_ENABLED: bool = os.getenv("PREDICTION_MICRO_BATCH_ENABLED", "1") == "1"
+PREDICTION_MICRO_BATCH_MAX_SIZE: int = int(os.getenv("PREDICTION_MICRO_BATCH_MAX_SIZE", 64))
+PREDICTION_MICRO_BATCH_WINDOW_MS: float = float(os.getenv("PREDICTION_MICRO_BATCH_WINDOW_MS", 2.0))
+PREDICTION_EXECUTOR_KIND: str = os.getenv("PREDICTION_EXECUTOR_KIND", "thread")
+PREDICTION_EXECUTOR_WORKERS: int = int(os.getenv("PREDICTION_EXECUTOR_WORKERS", min(4, os.cpu_count() or 1)))
+PREDICTION_EXECUTOR_MAX_QUEUE: int = int(os.getenv("PREDICTION_EXECUTOR_MAX_QUEUE", 256))
+PREDICTION_TIMEOUT_SECONDS: float = float(os.getenv("PREDICTION_TIMEOUT_SECONDS", 5.0))
+PREDICTION_USE_COMPILED_MODEL: bool = os.getenv("PREDICTION_USE_COMPILED_MODEL", "1") == "1"
+PREDICTION_CSV_CHUNK_SIZE: int = int(os.getenv("PREDICTION_CSV_CHUNK_SIZE", 10000))
+PREDICTION_USE_MODEL_ARTIFACT: bool = os.getenv("PREDICTION_USE_MODEL_ARTIFACT", "1") == "1"
+PREDICTION_MODEL_ARTIFACT_DIR: str = os.getenv("PREDICTION_MODEL_ARTIFACT_DIR", os.path.join(ARTIFACT_DIR, "serving"))
+PREDICTION_MODEL_ARTIFACT_PATH: str = os.getenv("PREDICTION_MODEL_ARTIFACT_PATH", "")
+PREDICTION_MODEL_REFRESH_SECONDS: float = float(os.getenv("PREDICTION_MODEL_REFRESH_SECONDS", 60))
+PREDICTION_CACHE_ENABLED: bool = os.getenv("PREDICTION_CACHE_ENABLED", "0") == "1"
+PREDICTION_CACHE_MAX_ENTRIES: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 100000))
+PREDICTION_CACHE_MAX_BYTES: int = int(os.getenv("PREDICTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PREDICTION_CACHE_TTL_SECONDS: float = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 3600))
+PREDICTION_SHADOW_ENABLED: bool = os.getenv("PREDICTION_SHADOW_ENABLED", "0") == "1"
+PREDICTION_SHADOW_MODEL_FILE_PATH: str = os.getenv("PREDICTION_SHADOW_MODEL_FILE_PATH", f"challenger/{MODEL_FILE_NAME}")
+PREDICTION_SHADOW_MODEL_ARTIFACT_FILE_PATH: str = os.getenv("PREDICTION_SHADOW_MODEL_ARTIFACT_FILE_PATH",
+                                                            f"challenger/{MODEL_ARTIFACT_FILE_NAME}")
+PREDICTION_SHADOW_MODEL_ARTIFACT_PATH: str = os.getenv("PREDICTION_SHADOW_MODEL_ARTIFACT_PATH", "")
+PREDICTION_SHADOW_SAMPLE_RATE: float = float(os.getenv("PREDICTION_SHADOW_SAMPLE_RATE", 1.0))
+PREDICTION_SHADOW_MAX_QUEUE: int = int(os.getenv("PREDICTION_SHADOW_MAX_QUEUE", 1000))
+PREDICTION_SHADOW_BUFFER_SIZE: int = int(os.getenv("PREDICTION_SHADOW_BUFFER_SIZE", 10000))
+
+"""
+Training job related constants start with TRAINING_JOB var name
+"""
+TRAINING_JOB_DIR_NAME: str = "training_jobs"
+TRAINING_JOB_LOCK_FILE_NAME: str = "training.lock"
+TRAINING_JOB_NICENESS: int = int(os.getenv("TRAINING_JOB_NICENESS", 10))
+
 
 APP_HOST = "0.0.0.0"
-APP_PORT = 5000
\ No newline at end of file
+APP_PORT = 5000
+# Worker processes forked by serve.py, they share the model loaded once in the parent
+APP_WORKERS: int = int(os.getenv("APP_WORKERS", 1))
+# Seconds between two metrics snapshots of a forked worker, /metrics shows the other workers that old
+APP_METRICS_SNAPSHOT_SECONDS: float = float(os.getenv("APP_METRICS_SNAPSHOT_SECONDS", 1.0))
+# Serving-only deployments (serve.py) turn the /train routes off
+APP_TRAINING_ENABLED: bool = os.getenv("APP_TRAINING_ENABLED", "1") == "1"
\ No newline at end of file
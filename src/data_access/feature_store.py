@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+from typing import Any, List, Optional
+
+import pandas as pd
+
+from src.constants import DATA_ARTIFACT_FORMAT, DATA_INGESTION_CURSOR_BATCH_SIZE, DATA_INGESTION_EXPORT_CHUNK_SIZE
+from src.data_access.proj1_data import Proj1Data
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import apply_schema_dtypes, read_dataframe, write_dataframe
+
+FEATURE_STORE_STATE_FILE_NAME: str = "watermark.json"
+
+
+class FeatureStore:
+    """
+    Persistent, incrementally updated feature store of one MongoDB collection.
+
+    The store is a directory of Parquet (or CSV, see DATA_ARTIFACT_FORMAT) shards plus a small
+    state file holding the high-water mark: the largest value of the watermark field (_id, or
+    an ingestion / update timestamp set by the writers) exported so far. Every ingest fetches
+    only documents above the mark, up to the collection's current maximum, and adds them as a
+    new shard, so its cost follows the amount of new data instead of the size of the collection.
+
+    Documents exported again because they changed (with a timestamp watermark) replace their
+    earlier version: reading the store keeps the last row of every _id. Once more than
+    max_shards shards exist they are compacted into one.
+
+    An _id watermark relies on ObjectIds growing with insertion time, which holds for a single
+    writer; with several writers, or to pick up updates, use a timestamp field.
+    """
+
+    def __init__(self, store_dir: str, max_shards: int = 20) -> None:
+        """
+        :param store_dir: Directory of the shards and the state file of this collection
+        :param max_shards: Number of shards above which the store is compacted into one
+        """
+        self.store_dir = store_dir
+        self.max_shards = max(1, max_shards)
+        self.state_file_path = os.path.join(store_dir, FEATURE_STORE_STATE_FILE_NAME)
+
+    def read_state(self) -> dict:
+        from bson import json_util
+
+        try:
+            with open(self.state_file_path) as state_file:
+                # json_util keeps ObjectId and datetime watermarks intact
+                return json_util.loads(state_file.read())
+        except FileNotFoundError:
+            return {}
+
+    def _write_state(self, state: dict) -> None:
+        from bson import json_util
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_file_path = f"{self.state_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w") as state_file:
+            state_file.write(json_util.dumps(state, indent=2))
+        os.replace(tmp_file_path, self.state_file_path)
+
+    @property
+    def watermark(self) -> Optional[Any]:
+        return self.read_state().get("watermark")
+
+    def shard_paths(self) -> List[str]:
+        return [os.path.join(self.store_dir, shard) for shard in self.read_state().get("shards", [])]
+
+    def _remove_orphans(self, state: dict) -> None:
+        """Removes shards of an ingest that failed before its state was written."""
+        if not os.path.isdir(self.store_dir):
+            return
+        for file_name in os.listdir(self.store_dir):
+            if file_name.startswith("part-") and file_name not in state.get("shards", []):
+                os.remove(os.path.join(self.store_dir, file_name))
+
+    def ingest(self, proj1_data: Proj1Data, collection_name: str, watermark_field: str = "_id",
+               database_name: Optional[str] = None, chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE,
+               batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE, pushdown: bool = False) -> int:
+        """
+        Exports the documents above the watermark into a new shard, advances the watermark and
+        returns the number of new rows.
+
+        :param proj1_data: Exporter reading the collection
+        :param collection_name: Collection to ingest
+        :param watermark_field: Indexed field whose value grows for new or changed documents
+        :param pushdown: Store the columns encoded by the server, see Proj1Data.iter_collection_chunks
+        """
+        try:
+            state = self.read_state()
+            if state and state.get("watermark_field") != watermark_field:
+                raise ValueError(f"{self.store_dir} is tracked by {state.get('watermark_field')}, not "
+                                 f"{watermark_field}; use a new feature store directory to change the field")
+            if state and state.get("pushdown", False) != pushdown:
+                raise ValueError(f"{self.store_dir} holds {'encoded' if state.get('pushdown') else 'raw'} shards, "
+                                 f"use a new feature store directory to change DATA_INGESTION_PUSHDOWN")
+            self._remove_orphans(state)
+
+            previous = state.get("watermark")
+            # documents arriving during the export are left for the next ingest
+            upper = proj1_data.max_field_value(collection_name, watermark_field, database_name=database_name)
+            if upper is None or (previous is not None and upper <= previous):
+                logging.info(f"No new documents in {collection_name} above watermark {previous}")
+                return 0
+
+            query = {watermark_field: {"$lte": upper}}
+            if previous is not None:
+                query[watermark_field]["$gt"] = previous
+            next_shard = state.get("next_shard", 0)
+            shard_name = f"part-{next_shard:06d}.{DATA_ARTIFACT_FORMAT}"
+            rows = proj1_data.export_collection_to_file(collection_name, os.path.join(self.store_dir, shard_name),
+                                                        database_name=database_name, chunk_size=chunk_size,
+                                                        batch_size=batch_size, query=query, sort_key=watermark_field,
+                                                        pushdown=pushdown)
+
+            shards = state.get("shards", [])
+            if rows:
+                shards = shards + [shard_name]
+            else:
+                os.remove(os.path.join(self.store_dir, shard_name))
+            state.update({
+                "collection_name": collection_name,
+                "watermark_field": watermark_field,
+                "watermark": upper,
+                "pushdown": pushdown,
+                "shards": shards,
+                "next_shard": next_shard + 1,
+                "rows_ingested": state.get("rows_ingested", 0) + rows,
+                "updated_at": time.time(),
+            })
+            self._write_state(state)
+            logging.info(f"Ingested {rows} new rows of {collection_name} up to watermark {upper}")
+
+            if len(shards) > self.max_shards:
+                self.compact()
+            return rows
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the stored rows with the schema dtypes, keeping only the latest version of every _id.
+        """
+        try:
+            shard_paths = self.shard_paths()
+            if not shard_paths:
+                raise ValueError(f"Feature store {self.store_dir} is empty")
+            # categories are applied once on the whole frame, so every shard shares them
+            dataframe = pd.concat([read_dataframe(shard_path, column_types={}) for shard_path in shard_paths],
+                                  ignore_index=True)
+            dataframe = dataframe.drop_duplicates(subset="_id", keep="last", ignore_index=True)
+            return apply_schema_dtypes(dataframe)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def compact(self) -> None:
+        """
+        Rewrites all shards as one deduplicated shard.
+        """
+        try:
+            state = self.read_state()
+            dataframe = self.read_dataframe()
+            next_shard = state.get("next_shard", 0)
+            shard_name = f"part-{next_shard:06d}.{DATA_ARTIFACT_FORMAT}"
+            write_dataframe(os.path.join(self.store_dir, shard_name), dataframe)
+
+            old_shards = state.get("shards", [])
+            state.update({"shards": [shard_name], "next_shard": next_shard + 1})
+            self._write_state(state)
+            for old_shard in old_shards:
+                os.remove(os.path.join(self.store_dir, old_shard))
+            logging.info(f"Compacted {len(old_shards)} shards of {self.store_dir} into {shard_name}")
+        except Exception as e:
+            raise MyException(e, sys) from e
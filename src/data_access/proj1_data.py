@@ -1,29 +1,293 @@
 # for loading the data from the mongodb and converting into the dataframe
 
+import os
 import sys
 import pandas as pd
 import numpy as np
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterator, List, Optional
 
 from src.configuration.mongo_db_connection import MongoDBClient
-from src.constants import DATABASE_NAME
+from src.data_access.aggregation_pushdown import compile_encoding_pipeline, encoded_column_types, field_aliases
+from src.constants import (DATA_ARTIFACT_FORMAT, DATA_INGESTION_CURSOR_BATCH_SIZE,
+                           DATA_INGESTION_EXPORT_CHUNK_SIZE, DATABASE_NAME)
 from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import DataFrameChunkWriter, get_schema_column_types
+
+# Schema column dropped from the export, the documents keep their Mongo _id instead
+EXPORT_DROP_COLUMNS: List[str] = ["id"]
+
+# Keys sampled per partition to place the partition boundaries
+PARTITION_SAMPLE_KEYS: int = 1000
 
 class Proj1Data:
     """
     A class to export MongoDB records as a pandas DataFrame.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, mongo_client: Optional[MongoDBClient] = None) -> None:
         """
         Initializes the MongoDB client connection.
+
+        :param mongo_client: Connected client to use instead of a new MongoDBClient, e.g. one
+            wrapping a local mongod or an in-memory stand-in
         """
         try:
-            self.mongo_client = MongoDBClient(database_name=DATABASE_NAME)
+            self.mongo_client = mongo_client if mongo_client is not None else MongoDBClient(database_name=DATABASE_NAME)
         except Exception as e:
             raise MyException(e, sys)
 
-    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
+    def _get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        # Access specified collection from the default or specified database
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    @staticmethod
+    def export_column_types(pushdown: bool = False) -> Dict[str, str]:
+        """
+        Returns the exported columns and their schema type ("int", "float" or "category")
+        in schema order: _id followed by the schema columns except EXPORT_DROP_COLUMNS.
+
+        :param pushdown: Return the columns of the encoded export instead, see encoded_column_types
+        """
+        column_types = {"_id": "object"}
+        column_types.update({column: column_type for column, column_type in get_schema_column_types().items()
+                             if column not in EXPORT_DROP_COLUMNS})
+        return encoded_column_types(column_types) if pushdown else column_types
+
+    @staticmethod
+    def _build_chunk(buffers: Dict[str, list], column_types: Dict[str, str]) -> pd.DataFrame:
+        """
+        Turns the column buffers of one chunk into a typed DataFrame. 'na' values are replaced
+        with NaN column by column in one vectorized comparison, numeric columns become int64
+        (float64 when they hold missing values) and text columns stay object.
+        """
+        columns = {}
+        for column, column_type in column_types.items():
+            values = np.array(buffers[column], dtype=object)
+            missing = values == "na"
+            if missing.any():
+                values[missing] = np.nan
+            if column == "_id":
+                columns[column] = values.astype(str)
+            elif column_type in ("int", "float"):
+                columns[column] = pd.to_numeric(values)
+            else:
+                columns[column] = values
+        return pd.DataFrame(columns)
+
+    @staticmethod
+    def _build_encoded_chunk(buffers: Dict[str, list], column_types: Dict[str, str]) -> pd.DataFrame:
+        """
+        Turns the column buffers of one chunk of the encoded export into a DataFrame. The server
+        already sent numbers and nulls, numeric columns are converted in one call each.
+        """
+        columns = {}
+        for column, column_type in column_types.items():
+            if column_type in ("int", "float"):
+                values = np.array(buffers[column], dtype=np.float64)
+                if column_type == "int" and not np.isnan(values).any():
+                    values = values.astype(np.int64)
+                columns[column] = values
+            else:
+                columns[column] = np.array(buffers[column], dtype=object)
+        return pd.DataFrame(columns)
+
+    def iter_collection_chunks(self, collection_name: str, database_name: Optional[str] = None,
+                               chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE,
+                               batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE,
+                               query: Optional[Dict[str, Any]] = None,
+                               sort_key: Optional[str] = None,
+                               column_types: Optional[Dict[str, str]] = None,
+                               pushdown: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Streams a MongoDB collection as typed DataFrame chunks of at most chunk_size rows.
+
+        The cursor fetches batch_size documents per round trip and projects them to the schema
+        columns. Every document is copied into per-column buffers and released right away, so
+        memory use is bounded by one chunk instead of the whole collection as Python dicts.
+
+        :param query: Filter selecting the exported documents, e.g. one key range of a partitioned export
+        :param sort_key: Export the documents in ascending order of this (indexed) field
+        :param column_types: Columns to export and their schema types, export_column_types when omitted
+        :param pushdown: Let the server encode the documents with the schema.yaml encodings in an
+            aggregation pipeline, see aggregation_pushdown; the chunks hold the encoded columns
+        """
+        try:
+            column_types = column_types if column_types is not None else self.export_column_types(pushdown)
+            sort = None
+            if sort_key is not None:
+                # _id breaks ties of a non-unique key, so every export returns the same order
+                sort = [(sort_key, 1)] if sort_key == "_id" else [(sort_key, 1), ("_id", 1)]
+            collection = self._get_collection(collection_name, database_name)
+            fields = {column: column for column in column_types}
+            if pushdown:
+                fields = field_aliases(column_types)
+                pipeline = compile_encoding_pipeline(column_types, query=query, sort=sort)
+                cursor = collection.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+                build_chunk = self._build_encoded_chunk
+            else:
+                projection = {column: 1 for column in column_types}
+                find_options = {"batch_size": batch_size}
+                if sort is not None:
+                    find_options["sort"] = sort
+                cursor = collection.find(query or {}, projection, **find_options)
+                build_chunk = self._build_chunk
+
+            buffers = {column: [] for column in column_types}
+            rows = 0
+            for document in cursor:
+                for column, values in buffers.items():
+                    values.append(document.get(fields[column]))
+                rows += 1
+                if rows == chunk_size:
+                    yield build_chunk(buffers, column_types)
+                    buffers = {column: [] for column in column_types}
+                    rows = 0
+            if rows:
+                yield build_chunk(buffers, column_types)
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_collection_to_file(self, collection_name: str, file_path: str, database_name: Optional[str] = None,
+                                  chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE,
+                                  batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE,
+                                  query: Optional[Dict[str, Any]] = None, sort_key: Optional[str] = None,
+                                  pushdown: bool = False) -> int:
+        """
+        Streams a MongoDB collection into a file chunk by chunk and returns the number of rows.
+        A .parquet path gets one compressed row group per chunk, any other path CSV.
+        The file is written next to its destination and renamed into place once complete.
+        query, sort_key and pushdown are passed on to iter_collection_chunks.
+        """
+        try:
+            chunks = self.iter_collection_chunks(collection_name, database_name=database_name,
+                                                 chunk_size=chunk_size, batch_size=batch_size,
+                                                 query=query, sort_key=sort_key, pushdown=pushdown)
+            with DataFrameChunkWriter(file_path, self.export_column_types(pushdown)) as writer:
+                for chunk in chunks:
+                    writer.write(chunk)
+                    logging.info(f"Exported {writer.rows} rows of {collection_name}")
+            return writer.rows
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def max_field_value(self, collection_name: str, field: str, database_name: Optional[str] = None) -> Optional[Any]:
+        """
+        Returns the largest value of an (indexed) field in the collection, None when it is empty.
+        """
+        try:
+            documents = list(self._get_collection(collection_name, database_name).find(
+                {field: {"$exists": True}}, {field: 1}, sort=[(field, -1)], limit=1))
+            return documents[0][field] if documents else None
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def partition_queries(self, collection_name: str, partitions: int, key: str = "_id",
+                          database_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Splits a collection into at most `partitions` contiguous ranges of `key` holding about the
+        same number of documents and returns one range filter per partition, in key order.
+        Every document falls into exactly one filter: documents without `key` (or with a null
+        key) get an extra {key: None} filter in front, where a sort on `key` puts them too.
+
+        Like MongoDB's splitVector the boundaries are quantiles of a $sample of
+        PARTITION_SAMPLE_KEYS keys per partition instead of index positions, one random
+        cursor instead of an index walk per boundary; the ranges hold about the same number
+        of documents. `key` should be indexed (_id always is) and hold values of one type.
+        """
+        try:
+            partitions = max(1, partitions)
+            if partitions == 1:
+                return [{}]
+            collection = self._get_collection(collection_name, database_name)
+            # $sample must be the first stage to read from a random cursor instead of sorting the collection
+            sample = collection.aggregate([{"$sample": {"size": partitions * PARTITION_SAMPLE_KEYS}},
+                                           {"$project": {key: 1}}], allowDiskUse=True)
+            keys = sorted(document[key] for document in sample if document.get(key) is not None)
+            boundaries = []
+            for index in range(1, partitions):
+                position = len(keys) * index // partitions
+                if position == 0:
+                    continue
+                if not boundaries or keys[position] != boundaries[-1]:
+                    boundaries.append(keys[position])
+
+            if not boundaries:
+                return [{}]
+            # range filters never match a missing or null key, those documents get their own filter
+            queries = []
+            if key != "_id" and collection.find_one({key: None}, {"_id": 1}) is not None:
+                queries.append({key: None})
+            queries.append({key: {"$lt": boundaries[0]}})
+            for lower, upper in zip(boundaries, boundaries[1:]):
+                queries.append({key: {"$gte": lower, "$lt": upper}})
+            queries.append({key: {"$gte": boundaries[-1]}})
+            return queries
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_collection_to_shards(self, collection_name: str, shard_dir: str, workers: int,
+                                    partitions: Optional[int] = None, key: str = "_id",
+                                    executor_kind: str = "thread", database_name: Optional[str] = None,
+                                    chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE,
+                                    batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE,
+                                    pushdown: bool = False) -> List[str]:
+        """
+        Exports a collection as shards, one per key range, with up to `workers` ranges
+        exported concurrently, each through its own cursor. Every shard is sorted by `key` and
+        the shards follow the key order, so reading them in the returned order gives the same
+        rows in the same order as a serial export sorted by `key`.
+
+        :param shard_dir: Directory receiving part-00000.parquet, part-00001.parquet, ... (or .csv)
+        :param workers: Number of concurrent exports
+        :param partitions: Number of key ranges, defaults to workers
+        :param key: Field the collection is partitioned on, "_id" or an indexed field such as "id"
+        :param executor_kind: "thread" shares this client's connection pool, "process" opens one
+            connection per worker process and also parallelizes building the chunks
+        :param pushdown: Export the encoded columns, see iter_collection_chunks
+        :return: Shard file paths in key order
+        """
+        try:
+            queries = self.partition_queries(collection_name, partitions or workers, key=key,
+                                             database_name=database_name)
+            os.makedirs(shard_dir, exist_ok=True)
+            for file_name in os.listdir(shard_dir):
+                # shards of an earlier export would be read as part of this one
+                if file_name.startswith("part-"):
+                    os.remove(os.path.join(shard_dir, file_name))
+            shard_paths = [os.path.join(shard_dir, f"part-{index:05d}.{DATA_ARTIFACT_FORMAT}")
+                           for index in range(len(queries))]
+            logging.info(f"Exporting {collection_name} as {len(queries)} shards on {workers} {executor_kind} workers")
+
+            export_options = dict(collection_name=collection_name, database_name=database_name,
+                                  chunk_size=chunk_size, batch_size=batch_size, sort_key=key, pushdown=pushdown)
+            if executor_kind == "process":
+                # pymongo clients must not cross a fork, every process connects on its own
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+                export = _export_partition
+            else:
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mongo-export")
+                export = self.export_collection_to_file
+            with executor:
+                futures = [executor.submit(export, file_path=shard_path, query=query, **export_options)
+                           for shard_path, query in zip(shard_paths, queries)]
+                rows = sum(future.result() for future in futures)
+            logging.info(f"Exported {rows} rows of {collection_name} into {shard_dir}")
+            return shard_paths
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None,
+                                       chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE,
+                                       batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE) -> pd.DataFrame:
         """
         Exports an entire MongoDB collection as a pandas DataFrame.
 
@@ -33,27 +297,32 @@ class Proj1Data:
             The name of the MongoDB collection to export.
         database_name : Optional[str]
             Name of the database (optional). Defaults to DATABASE_NAME.
+        chunk_size : int
+            Rows read into each typed chunk before the chunks are concatenated.
+        batch_size : int
+            Documents fetched per cursor round trip.
 
         Returns:
         -------
         pd.DataFrame
-            DataFrame containing the collection data, with '_id' column removed and 'na' values replaced with NaN.
+            DataFrame containing the collection data, with 'id' column removed and 'na' values replaced with NaN.
         """
         try:
-            # Access specified collection from the default or specified database
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
-
-            # Convert collection data to DataFrame and preprocess
-            print("Fetching data from mongoDB")
-            df = pd.DataFrame(list(collection.find()))
-            print(f"Data fecthed with len: {len(df)}")
-            if "id" in df.columns.to_list():
-                df = df.drop(columns=["id"], axis=1)
-            df.replace({"na":np.nan},inplace=True)
+            logging.info("Fetching data from mongoDB")
+            chunks = list(self.iter_collection_chunks(collection_name, database_name=database_name,
+                                                      chunk_size=chunk_size, batch_size=batch_size))
+            if not chunks:
+                return pd.DataFrame(columns=list(self.export_column_types()))
+            df = pd.concat(chunks, ignore_index=True)
+            logging.info(f"Data fecthed with len: {len(df)}")
             return df
 
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+
+def _export_partition(**export_options) -> int:
+    """
+    Process pool entry point, exports one key range with the process's own connection.
+    """
+    return Proj1Data().export_collection_to_file(**export_options)
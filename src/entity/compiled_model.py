@@ -0,0 +1,386 @@
+import sys
+from operator import attrgetter
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.entity.estimator import MyModel, check_finite_features
+from src.exception import MyException
+from src.logger import logging
+from src.metrics import STAGE_SECONDS
+
+# Rows scored per traversal block, bounds the (rows, trees, classes) scratch arrays
+COMPILED_PREDICT_BLOCK_ROWS: int = 4096
+
+
+class CompiledPreprocessor:
+    """
+    The fitted ColumnTransformer of the preprocessing pipeline folded into plain NumPy arrays:
+    the input column order, one gather index per output column and the StandardScaler/MinMaxScaler
+    coefficients. Scaling uses the same float64 operations in the same order as sklearn
+    ((x - mean_) / scale_ and x * scale_ + min_), so the output matches transform() bit for bit.
+    """
+
+    def __init__(self, input_columns: List[str], output_index: np.ndarray,
+                 standard_index: np.ndarray, standard_mean: np.ndarray, standard_scale: np.ndarray,
+                 minmax_index: np.ndarray, minmax_scale: np.ndarray, minmax_min: np.ndarray,
+                 minmax_clip: Optional[np.ndarray] = None) -> None:
+        """
+        :param input_columns: Input column names in the order the pipeline was fitted on
+        :param output_index: For every output column, the input column it is computed from
+        :param standard_index: Output columns scaled by the StandardScaler
+        :param minmax_index: Output columns scaled by the MinMaxScaler
+        :param minmax_clip: Optional (low, high) feature range when the MinMaxScaler clips
+        """
+        self.input_columns = list(input_columns)
+        self.output_index = np.asarray(output_index, dtype=np.intp)
+        self.standard_index = np.asarray(standard_index, dtype=np.intp)
+        self.standard_mean = standard_mean
+        self.standard_scale = standard_scale
+        self.minmax_index = np.asarray(minmax_index, dtype=np.intp)
+        self.minmax_scale = minmax_scale
+        self.minmax_min = minmax_min
+        self.minmax_clip = minmax_clip
+        # reads all input fields of a record in fitted column order with a single C-level call
+        self._record_getter = attrgetter(*self.input_columns)
+
+    @classmethod
+    def from_pipeline(cls, preprocessing_object) -> "CompiledPreprocessor":
+        """
+        Builds the folded preprocessor from the Pipeline(ColumnTransformer) saved by DataTransformation.
+        Only StandardScaler, MinMaxScaler, passthrough and drop transformers are supported.
+        """
+        # sklearn is only needed while compiling, serving a compiled model never imports it
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, StandardScaler
+
+        column_transformer = preprocessing_object
+        while isinstance(column_transformer, Pipeline):
+            column_transformer = column_transformer.steps[-1][1]
+        if not isinstance(column_transformer, ColumnTransformer):
+            raise ValueError(f"Cannot compile preprocessor of type {type(column_transformer).__name__}")
+
+        input_columns = [str(column) for column in column_transformer.feature_names_in_]
+        position = {column: index for index, column in enumerate(input_columns)}
+
+        output_index, standard_index, minmax_index = [], [], []
+        standard_mean, standard_scale, minmax_scale, minmax_min = [], [], [], []
+        minmax_clip = None
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            columns = [input_columns[column] if isinstance(column, (int, np.integer)) else str(column)
+                       for column in columns]
+            start = len(output_index)
+            output_index.extend(position[column] for column in columns)
+            output_slots = list(range(start, len(output_index)))
+
+            if isinstance(transformer, StandardScaler):
+                standard_index.extend(output_slots)
+                # x - 0.0 and x / 1.0 are exact, so disabled centering or scaling folds to neutral values
+                standard_mean.extend(transformer.mean_ if transformer.with_mean else np.zeros(len(columns)))
+                standard_scale.extend(transformer.scale_ if transformer.with_std else np.ones(len(columns)))
+            elif isinstance(transformer, MinMaxScaler):
+                minmax_index.extend(output_slots)
+                minmax_scale.extend(transformer.scale_)
+                minmax_min.extend(transformer.min_)
+                if transformer.clip:
+                    minmax_clip = np.asarray(transformer.feature_range, dtype=np.float64)
+            elif transformer == "passthrough" or (isinstance(transformer, FunctionTransformer)
+                                                  and transformer.func is None):
+                continue
+            else:
+                raise ValueError(f"Cannot compile transformer {name} of type {type(transformer).__name__}")
+
+        return cls(input_columns=input_columns,
+                   output_index=np.asarray(output_index),
+                   standard_index=np.asarray(standard_index),
+                   standard_mean=np.asarray(standard_mean, dtype=np.float64),
+                   standard_scale=np.asarray(standard_scale, dtype=np.float64),
+                   minmax_index=np.asarray(minmax_index),
+                   minmax_scale=np.asarray(minmax_scale, dtype=np.float64),
+                   minmax_min=np.asarray(minmax_min, dtype=np.float64),
+                   minmax_clip=minmax_clip)
+
+    def to_array(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """Selects the input columns of the dataframe as a float64 matrix in fitted order."""
+        return dataframe[self.input_columns].to_numpy(dtype=np.float64)
+
+    def records_to_array(self, records: Sequence[object]) -> np.ndarray:
+        """
+        Writes records exposing the input columns as attributes (VehicleRecord, pydantic models)
+        into one preallocated float64 matrix in fitted column order, without building a DataFrame.
+        """
+        input_array = np.empty((len(records), len(self.input_columns)), dtype=np.float64)
+        if len(self.input_columns) == 1:
+            for row, record in enumerate(records):
+                input_array[row, 0] = self._record_getter(record)
+        else:
+            for row, record in enumerate(records):
+                input_array[row] = self._record_getter(record)
+        return input_array
+
+    def columns_to_array(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Copies decoded column arrays (e.g. from an Arrow record batch) into one float64 matrix in
+        fitted column order, one vectorized copy per column and no per-row Python objects.
+        """
+        rows = len(columns[self.input_columns[0]])
+        input_array = np.empty((rows, len(self.input_columns)), dtype=np.float64)
+        for index, column in enumerate(self.input_columns):
+            input_array[:, index] = columns[column]
+        return input_array
+
+    def transform_array(self, input_array: np.ndarray) -> np.ndarray:
+        """
+        Applies the folded ColumnTransformer to a float64 matrix whose columns follow input_columns.
+        Raises ValueError for NaN or infinite inputs like MyModel does.
+        """
+        check_finite_features(input_array)
+        transformed = input_array[:, self.output_index]
+        if len(self.standard_index):
+            standard = transformed[:, self.standard_index]
+            standard -= self.standard_mean
+            standard /= self.standard_scale
+            transformed[:, self.standard_index] = standard
+        if len(self.minmax_index):
+            minmax = transformed[:, self.minmax_index]
+            minmax *= self.minmax_scale
+            minmax += self.minmax_min
+            if self.minmax_clip is not None:
+                np.clip(minmax, self.minmax_clip[0], self.minmax_clip[1], out=minmax)
+            transformed[:, self.minmax_index] = minmax
+        return transformed
+
+    def transform(self, dataframe: pd.DataFrame) -> np.ndarray:
+        return self.transform_array(self.to_array(dataframe))
+
+
+class CompiledForest:
+    """
+    All trees of a fitted RandomForestClassifier flattened into contiguous node arrays
+    (feature, threshold, left/right child, normalized leaf values) and traversed for all
+    rows and trees at once.
+
+    Predictions are bit-identical to sklearn: inputs are cast to float32 like sklearn's tree
+    validation, leaves hold the per-tree probabilities normalized the way
+    DecisionTreeClassifier.predict_proba does it, and the per-tree probabilities are summed
+    sequentially in estimator order before dividing by the number of trees, exactly like
+    RandomForestClassifier.predict_proba with n_jobs=None.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 missing_go_to_left: np.ndarray, leaf_value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, classes: np.ndarray) -> None:
+        """
+        :param feature: Split feature of every node (0 for leaves)
+        :param threshold: Split threshold of every node
+        :param children: Interleaved (left, right) child of every node, leaves point to themselves
+        :param missing_go_to_left: Direction of NaN values at every node
+        :param leaf_value: Normalized class probabilities of every node
+        :param roots: Index of the root node of every tree
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+
+    @classmethod
+    def from_estimator(cls, forest) -> "CompiledForest":
+        """
+        Flattens the trees of a fitted single-output RandomForestClassifier.
+        """
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        n_classes = int(forest.n_classes_)
+        features, thresholds, children, missing, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64) + offset
+            is_leaf = tree.children_left == -1
+            # leaves point to themselves so extra traversal steps are no-ops
+            children.append(np.column_stack([np.where(is_leaf, node_ids, tree.children_left + offset),
+                                             np.where(is_leaf, node_ids, tree.children_right + offset)]).ravel())
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool))
+
+            proba = tree.value[:, 0, :n_classes].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        index_dtype = np.int32 if 2 * offset < np.iinfo(np.int32).max else np.int64
+        return cls(feature=np.ascontiguousarray(np.concatenate(features), dtype=index_dtype),
+                   threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+                   children=np.ascontiguousarray(np.concatenate(children), dtype=index_dtype),
+                   missing_go_to_left=np.ascontiguousarray(np.concatenate(missing)),
+                   leaf_value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+                   roots=np.asarray(roots, dtype=index_dtype),
+                   max_depth=max_depth,
+                   classes=np.asarray(forest.classes_))
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def _apply_tree_major(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns the global leaf index reached by every (tree, row) pair as a flat tree-major array.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_rows, n_features = features.shape
+        flat_features = features.ravel()
+        index_dtype = self.children.dtype
+        row_offsets = np.tile(np.arange(n_rows, dtype=index_dtype) * n_features, len(self.roots))
+        nodes = np.repeat(self.roots, n_rows)
+        has_missing = bool(np.isnan(flat_features).any())
+        for _ in range(self.max_depth):
+            values = flat_features.take(row_offsets + self.feature.take(nodes))
+            # NaN compares False and goes right unless the split sends missing values left
+            go_right = ~(values <= self.threshold.take(nodes))
+            if has_missing:
+                go_right = np.where(np.isnan(values), ~self.missing_go_to_left.take(nodes), go_right)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def apply(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns the global leaf index reached by every row in every tree, shape (rows, trees).
+        """
+        return self._apply_tree_major(features).reshape(len(self.roots), -1).T
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        probabilities = np.empty((features.shape[0], self.leaf_value.shape[1]), dtype=np.float64)
+        for start in range(0, features.shape[0], COMPILED_PREDICT_BLOCK_ROWS):
+            block = slice(start, start + COMPILED_PREDICT_BLOCK_ROWS)
+            leaves = self._apply_tree_major(features[block])
+            per_tree = self.leaf_value.take(leaves, axis=0).reshape(len(self.roots), -1, self.leaf_value.shape[1])
+            # trees are added one after the other in estimator order, like sklearn's accumulation,
+            # small blocks use cumsum (sequential too) to avoid a python loop per tree
+            if per_tree.shape[1] < 64:
+                probabilities[block] = np.cumsum(per_tree, axis=0)[-1]
+            else:
+                total = np.zeros(per_tree.shape[1:], dtype=np.float64)
+                for tree_probabilities in per_tree:
+                    total += tree_probabilities
+                probabilities[block] = total
+        probabilities /= self.n_estimators
+        return probabilities
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(features), axis=1), axis=0)
+
+
+class CompiledModel:
+    """
+    Drop-in replacement for MyModel that predicts with the CompiledPreprocessor and CompiledForest
+    instead of sklearn's ColumnTransformer and RandomForestClassifier.
+    """
+
+    def __init__(self, preprocessor: CompiledPreprocessor, forest: CompiledForest,
+                 metadata: Optional[Dict] = None) -> None:
+        self.preprocessor = preprocessor
+        self.forest = forest
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_model(cls, model: MyModel) -> "CompiledModel":
+        try:
+            return cls(preprocessor=CompiledPreprocessor.from_pipeline(model.preprocessing_object),
+                       forest=CompiledForest.from_estimator(model.trained_model_object),
+                       metadata={"source": repr(model)})
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.forest.classes_
+
+    def _features(self, dataframe: pd.DataFrame) -> np.ndarray:
+        with STAGE_SECONDS.time("preprocess"):
+            return self.preprocessor.transform(dataframe)
+
+    def _features_from_records(self, records: Sequence[object]) -> np.ndarray:
+        with STAGE_SECONDS.time("record_build"):
+            features = self.preprocessor.records_to_array(records)
+        with STAGE_SECONDS.time("preprocess"):
+            return self.preprocessor.transform_array(features)
+
+    def _features_from_columns(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        with STAGE_SECONDS.time("record_build"):
+            features = self.preprocessor.columns_to_array(columns)
+        with STAGE_SECONDS.time("preprocess"):
+            return self.preprocessor.transform_array(features)
+
+    def _forest_predict(self, features: np.ndarray) -> np.ndarray:
+        with STAGE_SECONDS.time("forest_predict"):
+            return self.forest.predict(features)
+
+    def _forest_predict_proba(self, features: np.ndarray) -> np.ndarray:
+        with STAGE_SECONDS.time("forest_predict"):
+            return self.forest.predict_proba(features)
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        try:
+            return self._forest_predict(self._features(dataframe))
+        except Exception as e:
+            logging.error("error occcured in predict method of CompiledModel", exc_info=True)
+            raise MyException(e, sys) from e
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        try:
+            return self._forest_predict_proba(self._features(dataframe))
+        except Exception as e:
+            logging.error("error occcured in predict_proba method of CompiledModel", exc_info=True)
+            raise MyException(e, sys) from e
+
+    def predict_records(self, records: Sequence[object]) -> np.ndarray:
+        """
+        Pandas-free fast path, predicts directly from record objects.
+        """
+        try:
+            return self._forest_predict(self._features_from_records(records))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_proba_records(self, records: Sequence[object]) -> np.ndarray:
+        try:
+            return self._forest_predict_proba(self._features_from_records(records))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_columns(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Predicts from a mapping of column name to a NumPy array of values, as decoded from a
+        columnar request body.
+        """
+        try:
+            return self._forest_predict(self._features_from_columns(columns))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_proba_columns(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        try:
+            return self._forest_predict_proba(self._features_from_columns(columns))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def __repr__(self):
+        return f"CompiledModel({self.forest.n_estimators} trees)"
+
+    def __str__(self):
+        return self.__repr__()
@@ -1,6 +1,6 @@
 import os
 from src.constants import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -12,39 +12,90 @@ class TrainingPipelineConfig:
     timestamp: str = TIMESTAMP
 
 
+    @classmethod
+    def for_run(cls, run_id: str) -> "TrainingPipelineConfig":
+        """
+        Config with its own artifact directory, used for every training job so that two
+        jobs started within the same second (or the same process) never share artifacts.
+        """
+        timestamp = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
+        return cls(artifact_dir=os.path.join(ARTIFACT_DIR, f"{timestamp}_{run_id}"), timestamp=timestamp)
+
+
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
+# Every stage config takes the artifact_dir of its pipeline run and derives its paths from it,
+# so concurrent or repeated runs in one process never share an artifact directory.
+
 @dataclass
 class DataIngestionConfig:
-    data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
-    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    artifact_dir: str = training_pipeline_config.artifact_dir
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
     collection_name:str = DATA_INGESTION_COLLECTION_NAME
+    export_chunk_size: int = DATA_INGESTION_EXPORT_CHUNK_SIZE
+    cursor_batch_size: int = DATA_INGESTION_CURSOR_BATCH_SIZE
+    export_workers: int = DATA_INGESTION_EXPORT_WORKERS
+    export_partitions: int = DATA_INGESTION_EXPORT_PARTITIONS
+    export_partition_key: str = DATA_INGESTION_EXPORT_PARTITION_KEY
+    export_executor: str = DATA_INGESTION_EXPORT_EXECUTOR
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    persistent_feature_store_dir: str = DATA_INGESTION_PERSISTENT_FEATURE_STORE_DIR
+    watermark_field: str = DATA_INGESTION_WATERMARK_FIELD
+    feature_store_max_shards: int = DATA_INGESTION_FEATURE_STORE_MAX_SHARDS
+    pushdown: bool = DATA_INGESTION_PUSHDOWN
+    split_mode: str = DATA_INGESTION_SPLIT_MODE
+    split_hash_column: str = DATA_INGESTION_SPLIT_HASH_COLUMN
+    split_stratify: bool = DATA_INGESTION_SPLIT_STRATIFY
+    split_random_state: int = DATA_INGESTION_SPLIT_RANDOM_STATE
+    data_ingestion_dir: str = field(init=False)
+    feature_store_file_path: str = field(init=False)
+    feature_store_shard_dir: str = field(init=False)
+    training_file_path: str = field(init=False)
+    testing_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_ingestion_dir = os.path.join(self.artifact_dir, DATA_INGESTION_DIR_NAME)
+        self.feature_store_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
+        self.feature_store_shard_dir = os.path.join(self.data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR,
+                                                    DATA_INGESTION_FEATURE_STORE_SHARD_DIR)
+        self.training_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
+        self.testing_file_path = os.path.join(self.data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
 
 @dataclass
 class DataValidationConfig:
-    data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
-    validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    artifact_dir: str = training_pipeline_config.artifact_dir
+    data_validation_dir: str = field(init=False)
+    validation_report_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_validation_dir = os.path.join(self.artifact_dir, DATA_VALIDATION_DIR_NAME)
+        self.validation_report_file_path = os.path.join(self.data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
 
 @dataclass
 class DataTransformationConfig:
-    data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-    transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                    TRAIN_FILE_NAME.replace("csv", "npy"))
-    transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                   TEST_FILE_NAME.replace("csv", "npy"))
-    transformed_object_file_path: str = os.path.join(data_transformation_dir,
-                                                     DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
-                                                     PREPROCSSING_OBJECT_FILE_NAME)
+    artifact_dir: str = training_pipeline_config.artifact_dir
+    data_transformation_dir: str = field(init=False)
+    transformed_train_file_path: str = field(init=False)
+    transformed_test_file_path: str = field(init=False)
+    transformed_object_file_path: str = field(init=False)
+
+    def __post_init__(self):
+        self.data_transformation_dir = os.path.join(self.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
+        self.transformed_train_file_path = os.path.join(self.data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                        os.path.splitext(TRAIN_FILE_NAME)[0] + ".npy")
+        self.transformed_test_file_path = os.path.join(self.data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                       os.path.splitext(TEST_FILE_NAME)[0] + ".npy")
+        self.transformed_object_file_path = os.path.join(self.data_transformation_dir,
+                                                         DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+                                                         PREPROCSSING_OBJECT_FILE_NAME)
     
 @dataclass
 class ModelTrainerConfig:
-    model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
-    trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+    artifact_dir: str = training_pipeline_config.artifact_dir
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    model_trainer_dir: str = field(init=False)
+    trained_model_file_path: str = field(init=False)
     _n_estimators = MODEL_TRAINER_N_ESTIMATORS
     _min_samples_split = MODEL_TRAINER_MIN_SAMPLES_SPLIT
     _min_samples_leaf = MODEL_TRAINER_MIN_SAMPLES_LEAF
@@ -52,6 +103,10 @@ class ModelTrainerConfig:
     _criterion = MIN_SAMPLES_SPLIT_CRITERION
     _random_state = MIN_SAMPLES_SPLIT_RANDOM_STATE
 
+    def __post_init__(self):
+        self.model_trainer_dir = os.path.join(self.artifact_dir, MODEL_TRAINER_DIR_NAME)
+        self.trained_model_file_path = os.path.join(self.model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
+
 @dataclass
 class ModelEvaluationConfig:
     changed_threshold_score: float = MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE
@@ -62,8 +117,40 @@ class ModelEvaluationConfig:
 class ModelPusherConfig:
     bucket_name: str = MODEL_BUCKET_NAME
     s3_model_key_path: str = MODEL_FILE_NAME
+    s3_model_artifact_key_path: str = MODEL_ARTIFACT_FILE_NAME
 
 @dataclass
 class VehiclePredictorConfig:
     model_file_path: str = MODEL_FILE_NAME
-    model_bucket_name: str = MODEL_BUCKET_NAME
\ No newline at end of file
+    model_bucket_name: str = MODEL_BUCKET_NAME
+    model_artifact_file_path: str = MODEL_ARTIFACT_FILE_NAME
+    use_model_artifact: bool = PREDICTION_USE_MODEL_ARTIFACT
+    model_artifact_local_dir: str = PREDICTION_MODEL_ARTIFACT_DIR
+    model_artifact_local_path: str = PREDICTION_MODEL_ARTIFACT_PATH
+    model_refresh_seconds: float = PREDICTION_MODEL_REFRESH_SECONDS
+    micro_batch_enabled: bool = PREDICTION_MICRO_BATCH_ENABLED
+    micro_batch_max_size: int = PREDICTION_MICRO_BATCH_MAX_SIZE
+    micro_batch_window_ms: float = PREDICTION_MICRO_BATCH_WINDOW_MS
+    executor_kind: str = PREDICTION_EXECUTOR_KIND
+    executor_workers: int = PREDICTION_EXECUTOR_WORKERS
+    executor_max_queue: int = PREDICTION_EXECUTOR_MAX_QUEUE
+    timeout_seconds: float = PREDICTION_TIMEOUT_SECONDS
+    csv_chunk_size: int = PREDICTION_CSV_CHUNK_SIZE
+    use_compiled_model: bool = PREDICTION_USE_COMPILED_MODEL
+    cache_enabled: bool = PREDICTION_CACHE_ENABLED
+    cache_max_entries: int = PREDICTION_CACHE_MAX_ENTRIES
+    cache_max_bytes: int = PREDICTION_CACHE_MAX_BYTES
+    cache_ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS
+    shadow_enabled: bool = PREDICTION_SHADOW_ENABLED
+    shadow_model_file_path: str = PREDICTION_SHADOW_MODEL_FILE_PATH
+    shadow_model_artifact_file_path: str = PREDICTION_SHADOW_MODEL_ARTIFACT_FILE_PATH
+    shadow_model_artifact_local_path: str = PREDICTION_SHADOW_MODEL_ARTIFACT_PATH
+    shadow_sample_rate: float = PREDICTION_SHADOW_SAMPLE_RATE
+    shadow_max_queue: int = PREDICTION_SHADOW_MAX_QUEUE
+    shadow_buffer_size: int = PREDICTION_SHADOW_BUFFER_SIZE
+
+@dataclass
+class TrainingJobConfig:
+    jobs_dir: str = os.path.join(ARTIFACT_DIR, TRAINING_JOB_DIR_NAME)
+    lock_file_path: str = os.path.join(ARTIFACT_DIR, TRAINING_JOB_LOCK_FILE_NAME)
+    niceness: int = TRAINING_JOB_NICENESS
@@ -1,4 +1,5 @@
 import sys 
+from typing import TYPE_CHECKING
 
 import pandas as pd 
 import numpy as np 
@@ -6,7 +7,20 @@ import numpy as np
 from pandas import DataFrame
 from src.exception import MyException
 from src.logger import logging 
-from sklearn.pipeline import Pipeline
+from src.metrics import STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+def check_finite_features(features) -> None:
+    """
+    Raises ValueError when the features contain NaN or infinity. The forest was fitted on finite
+    values only: sklearn's scalers reject infinity, but the random forest would route NaN down its
+    missing value branches and score the row anyway, so both models check the same way.
+    """
+    if not np.isfinite(np.asarray(features, dtype=np.float64)).all():
+        raise ValueError("Input X contains NaN or infinity, only finite feature values can be scored")
+
 class TargetValueMapping:
     def __init__(self):
         self.yes : int = 0 
@@ -21,7 +35,7 @@ class TargetValueMapping:
     
 
 class MyModel:
-    def __init__(self,preprocessing_object : Pipeline,trained_model_object : object):
+    def __init__(self,preprocessing_object : "Pipeline",trained_model_object : object):
         
         """
         :param preprocessing_object: Input Object of preprocesser
@@ -39,19 +53,40 @@ class MyModel:
             logging.info("starting the prediction pipeline")
 
             ## apply scaling transformation using the pre-trained preprocessing object 
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            with STAGE_SECONDS.time("preprocess"):
+                transformed_feature = self.preprocessing_object.transform(dataframe)
+                check_finite_features(transformed_feature)
 
             ## perform pipeline using the trained model 
             logging.info("using the trained pipeline to get the prediction")
-            predictions = self.trained_model_object.predict(transformed_feature)
+            with STAGE_SECONDS.time("forest_predict"):
+                predictions = self.trained_model_object.predict(transformed_feature)
 
             return predictions
         
         except Exception as e:
             logging.error("error occcured in predict method",exc_info=True)
             raise MyException(e,sys) from e 
-        
 
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.trained_model_object.classes_
+
+    def predict_proba(self,dataframe:pd.DataFrame)->np.ndarray:
+        """
+        Same as predict but returns the class probabilities of the trained model,
+        one column per entry of trained_model_object.classes_.
+        """
+        try:
+            with STAGE_SECONDS.time("preprocess"):
+                transformed_feature = self.preprocessing_object.transform(dataframe)
+                check_finite_features(transformed_feature)
+            with STAGE_SECONDS.time("forest_predict"):
+                return self.trained_model_object.predict_proba(transformed_feature)
+
+        except Exception as e:
+            logging.error("error occcured in predict_proba method",exc_info=True)
+            raise MyException(e,sys) from e
 
     def __repr__(self):
         return f"{type(self.trained_model_object).__name__}()"
@@ -0,0 +1,185 @@
+"""
+Memory-mappable model artifact.
+
+Layout of the file:
+    8 bytes   magic, MODEL_ARTIFACT_MAGIC
+    8 bytes   little endian uint64, length of the JSON header
+    n bytes   JSON header: format version, model version, column order, scalar parameters
+              and dtype, shape and file offset of every array
+    padding   up to the next multiple of ARRAY_ALIGNMENT
+    arrays    raw little endian NumPy buffers of the preprocessor and the forest nodes,
+              each starting at a multiple of ARRAY_ALIGNMENT
+
+Loading maps the file read-only and creates the arrays as views on the mapping, nothing
+is copied or unpickled. The pages come from the OS page cache, so every process (and every
+pre-forked worker) that opens the same file shares one copy of the model in memory.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.entity.compiled_model import CompiledForest, CompiledModel, CompiledPreprocessor
+from src.exception import MyException
+from src.logger import logging
+
+MODEL_ARTIFACT_MAGIC: bytes = b"VEHMDL01"
+MODEL_ARTIFACT_FORMAT_VERSION: int = 1
+ARRAY_ALIGNMENT: int = 64
+
+_PREPROCESSOR_ARRAYS = ("output_index", "standard_index", "standard_mean", "standard_scale",
+                        "minmax_index", "minmax_scale", "minmax_min")
+_FOREST_ARRAYS = ("feature", "threshold", "children", "missing_go_to_left", "leaf_value", "roots")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+def _model_arrays(model: CompiledModel) -> Dict[str, np.ndarray]:
+    arrays = {}
+    for name in _PREPROCESSOR_ARRAYS:
+        array = getattr(model.preprocessor, name)
+        # index arrays are intp in memory, stored with a fixed width so files are portable
+        arrays[f"preprocessor.{name}"] = array.astype(np.int64) if array.dtype.kind in "iu" else array
+    for name in _FOREST_ARRAYS:
+        arrays[f"forest.{name}"] = getattr(model.forest, name)
+    return {name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")) for name, array in arrays.items()}
+
+
+def save_model_artifact(model: CompiledModel, file_path: str, model_version: Optional[str] = None) -> dict:
+    """
+    Writes a CompiledModel as a memory-mappable artifact and returns its header.
+    The file is written next to its destination and renamed into place, so a process that
+    maps the previous version keeps a consistent view.
+
+    :param model: Compiled model to store
+    :param file_path: Destination of the artifact
+    :param model_version: Version recorded in the header, a new unique version when omitted
+    """
+    try:
+        arrays = _model_arrays(model)
+        classes = np.asarray(model.classes_)
+        header = {
+            "format_version": MODEL_ARTIFACT_FORMAT_VERSION,
+            "model_version": model_version or f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}",
+            "created_at": time.time(),
+            "metadata": model.metadata,
+            "preprocessor": {
+                "input_columns": model.preprocessor.input_columns,
+                "minmax_clip": None if model.preprocessor.minmax_clip is None
+                else [float(value) for value in model.preprocessor.minmax_clip],
+            },
+            "forest": {
+                "max_depth": model.forest.max_depth,
+                "classes": classes.tolist(),
+                "classes_dtype": classes.dtype.str,
+            },
+            "arrays": {},
+        }
+
+        # offsets depend on the header length, which depends on the offsets; lay the arrays
+        # out relative to the data section and fix the data section start afterwards
+        relative_offset = 0
+        for name, array in arrays.items():
+            relative_offset = _aligned(relative_offset)
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape),
+                                      "offset": relative_offset}
+            relative_offset += array.nbytes
+        header["data_offset"] = 0
+        header_bytes = json.dumps(header).encode()
+        data_offset = _aligned(16 + len(header_bytes) + 32)
+        header["data_offset"] = data_offset
+        header_bytes = json.dumps(header).encode()
+        if 16 + len(header_bytes) > data_offset:
+            raise ValueError("Model artifact header does not fit before the data section")
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "wb") as artifact_file:
+            artifact_file.write(MODEL_ARTIFACT_MAGIC)
+            artifact_file.write(struct.pack("<Q", len(header_bytes)))
+            artifact_file.write(header_bytes)
+            for name, array in arrays.items():
+                artifact_file.seek(data_offset + header["arrays"][name]["offset"])
+                artifact_file.write(array.tobytes())
+            artifact_file.truncate(data_offset + relative_offset)
+        os.replace(tmp_file_path, file_path)
+        logging.info(f"Saved model artifact {header['model_version']} to {file_path}")
+        return header
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def read_model_artifact_header(file_path: str) -> dict:
+    with open(file_path, "rb") as artifact_file:
+        magic = artifact_file.read(len(MODEL_ARTIFACT_MAGIC))
+        if magic != MODEL_ARTIFACT_MAGIC:
+            raise ValueError(f"{file_path} is not a model artifact")
+        (header_length,) = struct.unpack("<Q", artifact_file.read(8))
+        header = json.loads(artifact_file.read(header_length))
+    if header["format_version"] != MODEL_ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format version {header['format_version']}")
+    return header
+
+
+def load_model_artifact(file_path: str) -> CompiledModel:
+    """
+    Opens a model artifact as a CompiledModel whose arrays are read-only views on a shared
+    memory mapping of the file.
+    """
+    try:
+        header = read_model_artifact_header(file_path)
+        with open(file_path, "rb") as artifact_file:
+            # the mapping stays valid after the file is closed, the arrays keep it alive
+            buffer = mmap.mmap(artifact_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data_offset = header["data_offset"]
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                         offset=data_offset + spec["offset"]).reshape(spec["shape"])
+
+        preprocessor_header = header["preprocessor"]
+        minmax_clip = preprocessor_header["minmax_clip"]
+        preprocessor = CompiledPreprocessor(
+            input_columns=preprocessor_header["input_columns"],
+            minmax_clip=None if minmax_clip is None else np.asarray(minmax_clip, dtype=np.float64),
+            **{name: arrays[f"preprocessor.{name}"] for name in _PREPROCESSOR_ARRAYS})
+        forest_header = header["forest"]
+        forest = CompiledForest(
+            max_depth=forest_header["max_depth"],
+            classes=np.asarray(forest_header["classes"], dtype=np.dtype(forest_header["classes_dtype"])),
+            **{name: arrays[f"forest.{name}"] for name in _FOREST_ARRAYS})
+
+        metadata = dict(header["metadata"], model_version=header["model_version"], artifact_path=file_path)
+        return CompiledModel(preprocessor=preprocessor, forest=forest, metadata=metadata)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def convert_model_to_artifact(model_file_path: str, artifact_file_path: str,
+                              model_version: Optional[str] = None) -> dict:
+    """
+    Converts a saved MyModel pickle (model.pkl) into a memory-mappable model artifact.
+    """
+    from src.utils.main_utils import load_object
+
+    model = CompiledModel.from_model(load_object(model_file_path))
+    return save_model_artifact(model, artifact_file_path, model_version=model_version)
+
+
+if __name__ == "__main__":
+    # python -m src.entity.model_artifact artifact/<ts>/model_trainer/trained_model/model.pkl model.vmdl
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m src.entity.model_artifact <model.pkl> <model.vmdl>")
+    converted_header = convert_model_to_artifact(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[2]} (model version {converted_header['model_version']})")
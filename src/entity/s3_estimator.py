@@ -1,6 +1,7 @@
 from src.cloud_storage.aws_storage import SimpleStorageService
 from src.exception import MyException
 from src.entity.estimator import MyModel
+import os
 import sys
 from pandas import DataFrame
 
@@ -9,7 +10,7 @@ class Proj1Estimator:
     """
     this clas is used to load , save and predict the model
     """
-    def __init__(self):
+    def __init__(self,bucket_name,model_path):
         """
         :param bucket_name: Name of your model bucket
         :param model_path: Location of your model in bucket
@@ -17,21 +18,44 @@ class Proj1Estimator:
         self.bucket_name = bucket_name
         self.s3 = SimpleStorageService()
         self.model_path = model_path
-        self.load_model : MyModel = None
+        self.loaded_model : MyModel = None
 
     def is_model_present(self,model_path):
         try:
-            return self.s3_key_path_available(bucket_name=self.bucket_name,s3_key=self.model_path)
+            return self.s3.s3_key_path_available(bucket_name=self.bucket_name,s3_key=self.model_path)
+        except Exception as e:
+            raise MyException(e,sys) from e
+
+
+    def model_etag(self):
+        """
+        ETag of the model in the bucket, None when there is no model, changes with every push
+        """
+        try:
+            return self.s3.get_object_etag(bucket_name=self.bucket_name,s3_key=self.model_path)
         except Exception as e:
             raise MyException(e,sys) from e
 
-    
     def load_model(self)->MyModel:
         """
         load the model from the model path 
         """
         try:
-            return self.s3.load_model(self.bucket_name,self.model_path)
+            return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
+        except Exception as e:
+            raise MyException(e,sys) from e
+
+    def load_model_artifact(self,local_dir:str):
+        """
+        download the memory-mappable model artifact at the model path and open it
+        :param local_dir: local folder the artifact is downloaded to, the file is mapped from there
+        """
+        from src.entity.model_artifact import load_model_artifact
+
+        try:
+            local_file_path = os.path.join(local_dir, os.path.basename(self.model_path))
+            self.s3.download_file(self.model_path, to_filename=local_file_path, bucket_name=self.bucket_name)
+            return load_model_artifact(local_file_path)
         except Exception as e:
             raise MyException(e,sys) from e
 
@@ -45,7 +69,7 @@ class Proj1Estimator:
             self.s3.upload_file(
                 from_file,
                 bucket_name = self.bucket_name,
-                to_filename = self.model_path
+                to_filename = self.model_path,
                 remove = remove
             )
             
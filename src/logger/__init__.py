@@ -18,9 +18,21 @@ def get_project_root():
 # Construct log file path
 #log_dir_path = os.path.join(from_root(), LOG_DIR)
 log_dir_path = os.path.join(get_project_root(), LOG_DIR)
-os.makedirs(log_dir_path, exist_ok=True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
+
+class DelayedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that creates the log directory and opens the log file only when
+    the first record is written, so importing the logger has no filesystem side effects.
+    """
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def configure_logger():
     """
     Configures logging with a rotating file handler and a console handler.
@@ -33,7 +45,7 @@ def configure_logger():
     formatter = logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s")
 
     # File handler with rotation
-    file_handler = RotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
+    file_handler = DelayedRotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
     file_handler.setFormatter(formatter)
     file_handler.setLevel(logging.DEBUG)
     
@@ -0,0 +1,370 @@
+"""
+Lightweight Prometheus metrics for the serving path.
+
+Every metric keeps one shard of plain Python numbers per thread. A thread only ever writes
+its own shard, so recording a value takes no lock and costs about a microsecond; the lock is
+only taken once per thread (to register its shard) and when /metrics renders the totals.
+
+The registry only sees its own process. Forked workers (src/pipline/prefork_server.py) share
+one listening socket, so a scrape reaches whichever worker accepts it. Each worker therefore
+calls registry.export_worker_snapshots(): it writes its totals to a file in a directory shared
+by all workers every few seconds, and /metrics renders the snapshots of all workers, each
+series with a "worker" label. Every scrape then returns every worker, at most one snapshot
+interval old except for the answering one, and a restarted worker continues the series of
+the worker index it replaces (its counters restart at zero, which Prometheus treats as a
+counter reset). Sum over the worker label for per-server totals.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from 50 microseconds (cached predictions) up to 10 seconds (model load)
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _worker_sort_key(worker: str) -> Tuple[int, str]:
+    # worker indices in numeric order, "10" after "9"
+    return (int(worker), "") if worker.isdigit() else (-1, worker)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """
+        :param name: Prometheus metric name
+        :param documentation: HELP text
+        :param labelnames: Names of the labels, values are passed positionally when recording
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], list]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], list]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _new_cell(self) -> list:
+        return [0.0]
+
+    def _merged(self) -> Dict[Tuple[str, ...], list]:
+        merged: Dict[Tuple[str, ...], list] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labelvalues, cell in list(shard.items()):
+                total = merged.get(labelvalues)
+                if total is None:
+                    merged[labelvalues] = list(cell)
+                else:
+                    for index, value in enumerate(cell):
+                        total[index] += value
+        return merged
+
+    def collect(self) -> Dict[Tuple[str, ...], list]:
+        """
+        Returns the totals over all threads by label values, for reports outside /metrics.
+        """
+        return self._merged()
+
+    def render(self, worker_cells: Optional[Dict[str, Dict[Tuple[str, ...], list]]] = None) -> List[str]:
+        """
+        :param worker_cells: Totals of every worker by worker label, rendered with an extra
+            "worker" label instead of this process's totals
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        if worker_cells is None:
+            for labelvalues, cell in sorted(self._merged().items()):
+                lines.extend(self._render_cell(self.labelnames, labelvalues, cell))
+            return lines
+        labelnames = self.labelnames + ("worker",)
+        for worker, cells in sorted(worker_cells.items(), key=lambda item: _worker_sort_key(item[0])):
+            for labelvalues, cell in sorted(cells.items()):
+                lines.extend(self._render_cell(labelnames, labelvalues + (worker,), cell))
+        return lines
+
+    def _render_cell(self, labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], cell: list) -> List[str]:
+        return [f"{self.name}{_format_labels(labelnames, labelvalues)} {_format_value(cell[0])}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        cell = shard.get(labelvalues)
+        if cell is None:
+            cell = shard[labelvalues] = self._new_cell()
+        cell[0] += amount
+
+
+class Gauge(_Metric):
+    """
+    Gauge that is only moved up and down, e.g. requests in flight. Each thread keeps its own
+    delta and the rendered value is their sum, so inc and dec may happen on different threads.
+    """
+    metric_type = "gauge"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        cell = shard.get(labelvalues)
+        if cell is None:
+            cell = shard[labelvalues] = self._new_cell()
+        cell[0] += amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """
+    Gauge whose value is read from a callable when the metrics are rendered, for values
+    another component already tracks (queue depths, pending jobs).
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def _merged(self) -> Dict[Tuple[str, ...], list]:
+        return {(): [self.callback()]}
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: "Histogram", labelvalues: Tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        """
+        :param buckets: Upper bounds of the buckets in increasing order, +Inf is added implicitly
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_cell(self) -> list:
+        # one count per bucket, one for +Inf, then sum and count
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        cell = shard.get(labelvalues)
+        if cell is None:
+            cell = shard[labelvalues] = self._new_cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def time(self, *labelvalues: str) -> _Timer:
+        """
+        Context manager observing the duration of its block.
+        """
+        return _Timer(self, labelvalues)
+
+    def _render_cell(self, labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], cell: list) -> List[str]:
+        lines = []
+        cumulative = 0
+        for upper_bound, count in zip(self.buckets + (float("inf"),), cell):
+            cumulative += count
+            le = _format_labels(labelnames, labelvalues, f'le="{_format_value(upper_bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(cell[-2])}")
+        lines.append(f"{self.name}_count{labels} {cell[-1]}")
+        return lines
+
+
+class _WorkerSnapshots:
+    """
+    Totals of the registry of every worker, kept as one JSON file per worker in a shared directory.
+    """
+
+    def __init__(self, registry: "MetricsRegistry", directory: str, worker: str, interval: float) -> None:
+        self.registry = registry
+        self.directory = directory
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_path(self, worker: str) -> str:
+        return os.path.join(self.directory, f"worker-{worker}.json")
+
+    def write(self) -> None:
+        """Replaces this worker's snapshot atomically, readers never see a half written file."""
+        snapshot = {name: [[list(labelvalues), cell] for labelvalues, cell in metric.collect().items()]
+                    for name, metric in self.registry.metrics().items()}
+        file_path = self._file_path(self.worker)
+        tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w") as snapshot_file:
+            json.dump({"worker": self.worker, "pid": os.getpid(), "metrics": snapshot}, snapshot_file)
+        os.replace(tmp_file_path, file_path)
+
+    def read(self) -> Dict[str, Dict[str, Dict[Tuple[str, ...], list]]]:
+        """Returns metric name -> worker -> label values -> cell over all snapshot files."""
+        metrics: Dict[str, Dict[str, Dict[Tuple[str, ...], list]]] = {}
+        for file_name in os.listdir(self.directory):
+            if not (file_name.startswith("worker-") and file_name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name)) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except FileNotFoundError:
+                continue
+            for name, cells in snapshot["metrics"].items():
+                metrics.setdefault(name, {})[snapshot["worker"]] = {tuple(labelvalues): cell
+                                                                     for labelvalues, cell in cells}
+        return metrics
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                # the next interval retries, /metrics of the other workers shows the last snapshot meanwhile
+                pass
+
+    def start(self) -> None:
+        self.write()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._worker_snapshots: Optional[_WorkerSnapshots] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def callback_gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self) -> Dict[str, _Metric]:
+        with self._lock:
+            return dict(self._metrics)
+
+    def export_worker_snapshots(self, directory: str, worker: str, interval: float = 1.0) -> None:
+        """
+        Makes this process one worker of a multi-process server: its totals are written to
+        directory every interval seconds and render() returns the totals of every worker that
+        writes to the same directory, labelled with their worker name. Call it in the worker,
+        after the fork, the snapshot thread does not survive a fork.
+
+        :param directory: Directory shared by all workers of the server
+        :param worker: Value of the worker label, e.g. the worker index
+        :param interval: Seconds between two snapshots of this worker
+        """
+        if self._worker_snapshots is not None:
+            self._worker_snapshots.stop()
+        os.makedirs(directory, exist_ok=True)
+        self._worker_snapshots = _WorkerSnapshots(self, directory, worker, interval)
+        self._worker_snapshots.start()
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format (version 0.0.4), those of
+        all workers when export_worker_snapshots() was called.
+        """
+        metrics = self.metrics()
+        worker_metrics = None
+        if self._worker_snapshots is not None:
+            # the answering worker's own series are always current
+            self._worker_snapshots.write()
+            worker_metrics = self._worker_snapshots.read()
+        lines = []
+        for name, metric in metrics.items():
+            lines.extend(metric.render(None if worker_metrics is None else worker_metrics.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process-wide registry and the metrics of the serving path
+registry: MetricsRegistry = MetricsRegistry()
+
+STAGE_SECONDS: Histogram = registry.histogram(
+    "serving_stage_duration_seconds",
+    "Time spent in each stage of the prediction path",
+    labelnames=("stage",))
+HTTP_REQUESTS_TOTAL: Counter = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route, method and status code",
+    labelnames=("route", "method", "status"))
+HTTP_REQUEST_SECONDS: Histogram = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    labelnames=("route",))
+HTTP_REQUESTS_IN_FLIGHT: Gauge = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled")
+PREDICTION_ERRORS_TOTAL: Counter = registry.counter(
+    "prediction_errors_total",
+    "Failed prediction requests by route and error type",
+    labelnames=("route", "error"))
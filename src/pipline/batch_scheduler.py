@@ -0,0 +1,190 @@
+import asyncio
+import sys
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.exception import MyException
+from src.logger import logging
+from src.pipline.inference_executor import InferenceExecutor, InferenceOverloadedError
+from src.pipline.prediction_pipeline import VehicleRecord
+
+
+class MicroBatchScheduler:
+    """
+    Collects concurrent single-record predictions into one vectorized model call.
+
+    The first queued request is scored right away when nothing else is waiting, so an idle
+    server adds no latency. When more requests are already queued the scheduler keeps
+    collecting for up to micro_batch_window_ms or until micro_batch_max_size records,
+    runs one predict for the whole batch and hands every caller its own result.
+
+    Batches are scored on the inference executor, at most one per executor worker at a time.
+    While all workers are busy new requests keep queueing and form the next, larger batch.
+    """
+
+    def __init__(self, predict_fn: Callable[[Sequence[VehicleRecord]], Any], executor: InferenceExecutor,
+                 prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()) -> None:
+        """
+        :param predict_fn: Function scoring a list of VehicleRecord and returning one prediction per record
+        :param executor: Bounded pool the batches are scored on
+        :param prediction_pipeline_config: Configuration holding the batch window and size
+        """
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max(1, prediction_pipeline_config.micro_batch_max_size)
+        self.window_seconds = max(0.0, prediction_pipeline_config.micro_batch_window_ms) / 1000.0
+        self.timeout_seconds = prediction_pipeline_config.timeout_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        # counters are only touched from the event loop thread, no locking needed
+        self.requests_total: int = 0
+        self.batches_total: int = 0
+        self.batch_failures_total: int = 0
+        self.max_batch_size_seen: int = 0
+        self.batch_size_counts: Dict[int, int] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.executor.max_queue)
+        self._slots = asyncio.Semaphore(self.executor.max_workers)
+        self._worker = asyncio.create_task(self._run())
+        logging.info(f"Micro-batch scheduler started (max size {self.max_batch_size}, "
+                     f"window {self.window_seconds * 1000:.1f}ms)")
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        # fail whatever is still queued instead of leaving callers waiting forever
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction scheduler stopped"))
+        logging.info("Micro-batch scheduler stopped")
+
+    async def submit(self, record: VehicleRecord) -> Any:
+        """
+        Queues one vehicle record and waits for its prediction. Raises InferenceOverloadedError
+        when the queue is full and TimeoutError when no result arrives within timeout_seconds.
+        """
+        if not self.is_running:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((record, future))
+        except asyncio.QueueFull:
+            raise InferenceOverloadedError(f"Prediction queue is full ({self._queue.maxsize} requests)")
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Prediction did not finish within {self.timeout_seconds}s")
+
+    async def _collect_batch(self) -> List[Tuple[VehicleRecord, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        # only wait for stragglers when there is concurrent traffic to batch with
+        if len(batch) > 1 and self.window_seconds > 0:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        return batch
+
+    async def _predict(self, records: List[VehicleRecord]) -> Any:
+        return await self.executor.run(self.predict_fn, records)
+
+    async def _score(self, batch: List[Tuple[VehicleRecord, asyncio.Future]]) -> None:
+        self.requests_total += len(batch)
+        self.batches_total += 1
+        self.max_batch_size_seen = max(self.max_batch_size_seen, len(batch))
+        self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+
+        try:
+            predictions = await self._predict([record for record, _ in batch])
+        except Exception as e:
+            self.batch_failures_total += 1
+            if len(batch) == 1 or isinstance(e, (InferenceOverloadedError, TimeoutError)):
+                # overload and timeouts are not caused by a bad record, retrying row by row would only add load
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            # one bad record must not fail its neighbours, score them one by one
+            logging.warning(f"Batch of {len(batch)} failed ({e}), scoring records individually")
+            for item in batch:
+                await self._score_single(item)
+            return
+
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    async def _score_single(self, item: Tuple[VehicleRecord, asyncio.Future]) -> None:
+        record, future = item
+        try:
+            prediction = (await self._predict([record]))[0]
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(prediction)
+
+    async def _score_and_release(self, batch: List[Tuple[VehicleRecord, asyncio.Future]]) -> None:
+        try:
+            await self._score(batch)
+        except Exception as e:
+            logging.error(f"Micro-batch scheduler failed to score a batch: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(MyException(e, sys))
+        finally:
+            self._slots.release()
+
+    async def _run(self) -> None:
+        while True:
+            # wait for a free worker first, requests arriving meanwhile join the next batch
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._score_and_release(batch))
+            # keep a reference until done, the event loop only holds weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.is_running,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_seconds * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "batch_failures_total": self.batch_failures_total,
+            "mean_batch_size": self.requests_total / self.batches_total if self.batches_total else 0.0,
+            "max_batch_size_seen": self.max_batch_size_seen,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+        }
@@ -0,0 +1,266 @@
+"""
+Binary columnar request and response formats of POST /predict/bulk.
+
+Arrow IPC (application/vnd.apache.arrow.stream, or the random access file format as
+application/vnd.apache.arrow.file)
+    Request: record batches with one numeric column per vehicle input column.
+    Response: one record batch, in the same IPC format, with a "prediction" column and, when
+    asked for, one "probability_<class>" column per class.
+
+msgpack (application/msgpack)
+    Request: {"columns": {name: values}} where values is either a msgpack array of numbers or
+    a bin of little endian float64 values. An optional {"dtypes": {name: dtype}} map gives the
+    NumPy dtype of bin columns stored in another type, e.g. "<i4".
+    Response: {"num_rows": n, "columns": {name: bin}, "dtypes": {name: dtype}} with the same
+    columns as the Arrow response, stored as bins.
+
+Every value must be a finite number, a NaN or infinite value fails the request with
+UnprocessableColumnsError (HTTP 422), like a JSON record failing validation. Bodies larger than
+PREDICTION_BULK_MAX_BYTES are refused before they are read completely (HTTP 413).
+
+Bin and Arrow columns are decoded with np.frombuffer/to_numpy, the values go from the request
+body into the model's feature matrix without a Python object per row. pyarrow and msgpack are
+optional and imported on first use.
+"""
+from functools import partial
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.constants import PREDICTION_BULK_MAX_RECORDS
+from src.metrics import STAGE_SECONDS
+from src.pipline.prediction_pipeline import VEHICLE_DATA_COLUMNS, VehicleDataClassifier
+
+ARROW_STREAM_MEDIA_TYPE: str = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE: str = "application/vnd.apache.arrow.file"
+MSGPACK_MEDIA_TYPE: str = "application/msgpack"
+JSON_MEDIA_TYPE: str = "application/json"
+
+# Alternative names clients send for the same formats
+_MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+
+class UnsupportedMediaTypeError(ValueError):
+    """Raised for a request body in a format the bulk endpoint cannot decode (HTTP 415)."""
+
+
+class NotAcceptableError(ValueError):
+    """Raised when none of the formats in the Accept header can be produced (HTTP 406)."""
+
+
+class UnprocessableColumnsError(ValueError):
+    """Raised for a decoded request holding values the model cannot score (HTTP 422)."""
+
+
+class RequestTooLargeError(ValueError):
+    """Raised for a request body larger than PREDICTION_BULK_MAX_BYTES (HTTP 413)."""
+
+
+def _media_type(header_value: Optional[str]) -> str:
+    media_type = (header_value or "").split(";")[0].strip().lower()
+    return _MEDIA_TYPE_ALIASES.get(media_type, media_type)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise UnsupportedMediaTypeError(f"{ARROW_STREAM_MEDIA_TYPE} needs pyarrow, which is not installed") from e
+    return pyarrow
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise UnsupportedMediaTypeError(f"{MSGPACK_MEDIA_TYPE} needs msgpack, which is not installed") from e
+    return msgpack
+
+
+def request_media_type(content_type: Optional[str]) -> str:
+    """
+    Returns the codec of a request body from its Content-Type header.
+    """
+    media_type = _media_type(content_type)
+    if media_type not in DECODERS:
+        raise UnsupportedMediaTypeError(
+            f"Unsupported Content-Type {content_type!r}, send {ARROW_STREAM_MEDIA_TYPE}, {ARROW_FILE_MEDIA_TYPE} "
+            f"or {MSGPACK_MEDIA_TYPE} (JSON records go to /predict/batch)")
+    return media_type
+
+
+def negotiate_response_media_type(accept: Optional[str], request_type: str) -> str:
+    """
+    Picks the response codec from the Accept header, preferring the request's own format
+    when the client accepts it (or sends no Accept header or */*).
+    """
+    supported = (request_type, *ENCODERS)
+    candidates: List[Tuple[float, int, str]] = []
+    for position, item in enumerate((accept or "*/*").split(",")):
+        media_type, _, parameters = item.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = _media_type(media_type)
+        if quality <= 0:
+            continue
+        if media_type in ("*/*", "application/*"):
+            candidates.append((quality, -position, request_type))
+        elif media_type in supported:
+            candidates.append((quality, -position, media_type))
+    if not candidates:
+        raise NotAcceptableError(f"Cannot answer with {accept!r}, accepted are {', '.join(ENCODERS)}")
+    # highest quality first, ties go to the type the client listed first
+    return max(candidates)[2]
+
+
+def _check_columns(columns: Mapping[str, np.ndarray]) -> int:
+    missing = [column for column in VEHICLE_DATA_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing vehicle columns {missing}")
+    lengths = {len(columns[column]) for column in VEHICLE_DATA_COLUMNS}
+    if len(lengths) != 1:
+        raise ValueError(f"Vehicle columns have different lengths {sorted(lengths)}")
+    rows = lengths.pop()
+    if rows == 0:
+        raise ValueError("Request holds no records")
+    if rows > PREDICTION_BULK_MAX_RECORDS:
+        raise ValueError(f"Request holds {rows} records, at most {PREDICTION_BULK_MAX_RECORDS} are allowed")
+    for column in VEHICLE_DATA_COLUMNS:
+        if columns[column].dtype.kind not in "biuf":
+            raise ValueError(f"Column {column} is not numeric ({columns[column].dtype})")
+        if columns[column].dtype.kind == "f":
+            non_finite = np.count_nonzero(~np.isfinite(columns[column]))
+            if non_finite:
+                raise UnprocessableColumnsError(f"Column {column} holds {non_finite} NaN or infinite values")
+    return rows
+
+
+def decode_arrow(body: bytes, file_format: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Reads an Arrow IPC stream (or IPC file with file_format) into one NumPy array per vehicle
+    column. Single-chunk columns without nulls are zero-copy views on the request body.
+    """
+    pyarrow = _import_pyarrow()
+    if file_format:
+        table = pyarrow.ipc.open_file(pyarrow.py_buffer(body)).read_all()
+    else:
+        table = pyarrow.ipc.open_stream(pyarrow.py_buffer(body)).read_all()
+    columns = {}
+    for column in VEHICLE_DATA_COLUMNS:
+        if column not in table.column_names:
+            continue
+        chunked = table.column(column)
+        if chunked.null_count:
+            raise ValueError(f"Column {column} holds {chunked.null_count} null values")
+        columns[column] = chunked.to_numpy()
+    return columns
+
+
+def decode_msgpack(body: bytes) -> Dict[str, np.ndarray]:
+    """
+    Reads a msgpack columns map into one NumPy array per vehicle column. Bin columns are
+    zero-copy views on the request body, array columns are converted in one call each.
+    """
+    msgpack = _import_msgpack()
+    payload = msgpack.unpackb(body, raw=False)
+    if not isinstance(payload, dict) or not isinstance(payload.get("columns"), dict):
+        raise ValueError('msgpack body must be a map with a "columns" map')
+    dtypes = payload.get("dtypes") or {}
+    columns = {}
+    for column in VEHICLE_DATA_COLUMNS:
+        values = payload["columns"].get(column)
+        if values is None:
+            continue
+        if isinstance(values, (bytes, bytearray)):
+            columns[column] = np.frombuffer(values, dtype=np.dtype(dtypes.get(column, "<f8")))
+        else:
+            columns[column] = np.asarray(values, dtype=np.float64)
+    return columns
+
+
+def _result_columns(labels: np.ndarray, probabilities: Optional[np.ndarray],
+                    classes: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+    result = {"prediction": np.asarray(labels).astype(np.int64)}
+    if probabilities is not None:
+        for index, label in enumerate(classes):
+            result[f"probability_{label.item() if hasattr(label, 'item') else label}"] = \
+                np.ascontiguousarray(probabilities[:, index], dtype=np.float64)
+    return result
+
+
+def encode_arrow(result: Mapping[str, np.ndarray], file_format: bool = False) -> bytes:
+    pyarrow = _import_pyarrow()
+    batch = pyarrow.record_batch(list(result.values()), names=list(result))
+    sink = pyarrow.BufferOutputStream()
+    new_writer = pyarrow.ipc.new_file if file_format else pyarrow.ipc.new_stream
+    with new_writer(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(result: Mapping[str, np.ndarray]) -> bytes:
+    msgpack = _import_msgpack()
+    rows = len(result["prediction"])
+    columns = {name: np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+               for name, values in result.items()}
+    return msgpack.packb({"num_rows": rows, "columns": {name: values.tobytes() for name, values in columns.items()},
+                          "dtypes": {name: values.dtype.str for name, values in columns.items()}})
+
+
+def encode_json(result: Mapping[str, np.ndarray]) -> bytes:
+    import json
+
+    predictions = result["prediction"].tolist()
+    response = {"predictions": predictions,
+                "labels": ["Response-Yes" if value == 1 else "Response-No" for value in predictions]}
+    probability_columns = [name for name in result if name.startswith("probability_")]
+    if probability_columns:
+        response["probabilities"] = np.column_stack([result[name] for name in probability_columns]).tolist()
+    return json.dumps(response).encode()
+
+
+DECODERS = {ARROW_STREAM_MEDIA_TYPE: decode_arrow,
+            ARROW_FILE_MEDIA_TYPE: partial(decode_arrow, file_format=True),
+            MSGPACK_MEDIA_TYPE: decode_msgpack}
+ENCODERS = {ARROW_STREAM_MEDIA_TYPE: encode_arrow,
+            ARROW_FILE_MEDIA_TYPE: partial(encode_arrow, file_format=True),
+            MSGPACK_MEDIA_TYPE: encode_msgpack, JSON_MEDIA_TYPE: encode_json}
+
+
+def decode_columns(body: bytes, request_type: str) -> Dict[str, np.ndarray]:
+    """
+    Decodes a request body into validated vehicle column arrays.
+    """
+    with STAGE_SECONDS.time("request_decode"):
+        columns = DECODERS[request_type](body)
+    _check_columns(columns)
+    return columns
+
+
+def score_columnar_request(body: bytes, request_type: str, response_type: str,
+                           return_probabilities: bool = False) -> bytes:
+    """
+    Decodes, scores and encodes one bulk request. Module level so the inference executor can
+    run it, decoding and encoding included, off the event loop or on a process pool.
+
+    :param body: Request body
+    :param request_type: Codec of the body, see request_media_type
+    :param response_type: Codec of the response, see negotiate_response_media_type
+    :param return_probabilities: Add one probability column per class
+    """
+    columns = decode_columns(body, request_type)
+    classifier = VehicleDataClassifier()
+    labels, probabilities = classifier.predict_columns(columns, return_probabilities=return_probabilities)
+    classes = classifier.model_cache.get_model().classes_ if probabilities is not None else None
+    with STAGE_SECONDS.time("response_encode"):
+        return ENCODERS[response_type](_result_columns(labels, probabilities, classes))
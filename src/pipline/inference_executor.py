@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.logger import logging
+
+
+class InferenceOverloadedError(RuntimeError):
+    """Raised when the inference queue is full and a request is rejected instead of queued."""
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound inference off the asyncio event loop on a bounded pool.
+
+    executor_workers bounds the pool size, executor_max_queue bounds the number of jobs that
+    are running or waiting for a worker (new jobs beyond it are rejected right away), and
+    timeout_seconds bounds how long a caller waits for its result. A job that timed out keeps
+    its queue slot until the worker has really finished it, so the bound stays honest.
+
+    With executor_kind "process" the function and its arguments must be picklable, i.e.
+    module level functions such as prediction_pipeline.predict_records.
+    """
+
+    def __init__(self, prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()) -> None:
+        """
+        :param prediction_pipeline_config: Configuration holding pool kind, size, queue depth and timeout
+        """
+        self.kind = prediction_pipeline_config.executor_kind
+        self.max_workers = max(1, prediction_pipeline_config.executor_workers)
+        self.max_queue = max(1, prediction_pipeline_config.executor_max_queue)
+        self.timeout_seconds = prediction_pipeline_config.timeout_seconds
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending: int = 0
+        self.rejected_total: int = 0
+        self.timeouts_total: int = 0
+        self.completed_total: int = 0
+
+    def _get_executor(self) -> Executor:
+        # created lazily so forked serving workers each build their own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix="inference")
+                    logging.info(f"Inference executor started ({self.kind}, {self.max_workers} workers, "
+                                 f"queue {self.max_queue})")
+        return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed_total += 1
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Runs fn(*args) on the pool and waits for the result without blocking the event loop.
+        Raises InferenceOverloadedError when the queue is full and TimeoutError after timeout_seconds.
+        """
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.rejected_total += 1
+                raise InferenceOverloadedError(f"Inference queue is full ({self.max_queue} jobs)")
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts_total += 1
+            raise TimeoutError(f"Inference did not finish within {self.timeout_seconds}s")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout_seconds,
+            "pending": self._pending,
+            "completed_total": self.completed_total,
+            "rejected_total": self.rejected_total,
+            "timeouts_total": self.timeouts_total,
+        }
+
+
+# Shared executor used by the serving app
+inference_executor: InferenceExecutor = InferenceExecutor()
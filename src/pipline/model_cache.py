@@ -0,0 +1,230 @@
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from src.entity.compiled_model import CompiledModel
+from src.entity.config_entity import VehiclePredictorConfig
+from src.entity.estimator import MyModel
+from src.entity.model_artifact import load_model_artifact
+from src.exception import MyException
+from src.logger import logging
+from src.metrics import STAGE_SECONDS
+
+
+class ModelCache:
+    """
+    Process-wide cache for the production MyModel.
+
+    The model is downloaded and unpickled at most once per process. Callers that find the
+    cache cold while a load is already running wait for that load instead of starting
+    their own S3 download (single-flight loading).
+
+    Models stored as a memory-mapped artifact load without unpickling and share their pages
+    with every other process that maps the same file.
+
+    With use_compiled_model a loaded MyModel is replaced by its CompiledModel, which gives
+    the same predictions with far less per-call overhead. Models that cannot be compiled
+    are served by sklearn as before.
+
+    The model pusher runs in the training process, so a push cannot reload the serving
+    processes directly. Instead start_refresher() checks the source version of the model (the
+    S3 ETag, or the modification time of a local artifact) every model_refresh_seconds and
+    reloads when it changed; every reload increases version, which invalidates the prediction cache.
+    """
+
+    def __init__(self, prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),
+                 loader: Optional[Callable[[], MyModel]] = None,
+                 source_version: Optional[Callable[[], Optional[str]]] = None) -> None:
+        """
+        :param prediction_pipeline_config: Configuration holding the model bucket and key
+        :param loader: Optional callable returning a MyModel, defaults to the production model
+        :param source_version: Optional callable identifying the model the loader would load, defaults
+            to the production model's version when loader is not given, no refreshes otherwise
+        """
+        self.prediction_pipeline_config = prediction_pipeline_config
+        self.loader = loader if loader is not None else self._load_production_model
+        if source_version is None and loader is None:
+            source_version = self._production_model_version
+        self.source_version = source_version
+        self._model: Optional[MyModel] = None
+        self._version: int = 0
+        self._source_version: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._load_seconds: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop_refresher = threading.Event()
+
+    def _load_production_model(self) -> MyModel:
+        """
+        Opens the memory-mapped model artifact when one is available, a local
+        model_artifact_local_path first, then the artifact in the model bucket, and falls back
+        to downloading and unpickling model.pkl.
+        """
+        config = self.prediction_pipeline_config
+        if config.use_model_artifact and config.model_artifact_local_path:
+            return load_model_artifact(config.model_artifact_local_path)
+
+        # boto3 is imported on first load, not when the app starts
+        from src.entity.s3_estimator import Proj1Estimator
+
+        if config.use_model_artifact:
+            artifact_estimator = Proj1Estimator(bucket_name=config.model_bucket_name,
+                                                model_path=config.model_artifact_file_path)
+            if artifact_estimator.is_model_present(model_path=config.model_artifact_file_path):
+                return artifact_estimator.load_model_artifact(local_dir=config.model_artifact_local_dir)
+            logging.info(f"No {config.model_artifact_file_path} in the model bucket, loading {config.model_file_path}")
+
+        estimator = Proj1Estimator(bucket_name=config.model_bucket_name, model_path=config.model_file_path)
+        return estimator.load_model()
+
+    def _production_model_version(self) -> Optional[str]:
+        """
+        Identifies the model _load_production_model would load: the size and modification time
+        of a local artifact, otherwise the ETag of the artifact or of model.pkl in the model bucket.
+        """
+        config = self.prediction_pipeline_config
+        if config.use_model_artifact and config.model_artifact_local_path:
+            stat = os.stat(config.model_artifact_local_path)
+            return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        from src.entity.s3_estimator import Proj1Estimator
+
+        if config.use_model_artifact:
+            etag = Proj1Estimator(bucket_name=config.model_bucket_name,
+                                  model_path=config.model_artifact_file_path).model_etag()
+            if etag is not None:
+                return f"{config.model_artifact_file_path}:{etag}"
+        etag = Proj1Estimator(bucket_name=config.model_bucket_name, model_path=config.model_file_path).model_etag()
+        return f"{config.model_file_path}:{etag}"
+
+    def _current_source_version(self) -> Optional[str]:
+        if self.source_version is None:
+            return None
+        try:
+            return self.source_version()
+        except Exception as e:
+            logging.warning(f"Could not check the version of the production model: {e}")
+            return None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    @property
+    def version(self) -> int:
+        """Increases every time a new model is loaded into the cache."""
+        return self._version
+
+    def _compile(self, model: MyModel):
+        if not self.prediction_pipeline_config.use_compiled_model or not isinstance(model, MyModel):
+            return model
+        try:
+            return CompiledModel.from_model(model)
+        except Exception as e:
+            logging.warning(f"Could not compile {model}, serving it with sklearn: {e}")
+            return model
+
+    def _load(self) -> None:
+        """Loads the model into the cache, caller must hold the lock."""
+        logging.info("Loading production model into the model cache")
+        start = time.perf_counter()
+        # checked before loading, a push during the load is then picked up by the next refresh
+        source_version = self._current_source_version()
+        try:
+            model = self._compile(self.loader())
+        except Exception as e:
+            self._last_error = str(e)
+            raise MyException(e, sys) from e
+        self._model = model
+        self._version += 1
+        self._source_version = source_version
+        self._loaded_at = time.time()
+        self._load_seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(self._load_seconds, "model_load")
+        self._last_error = None
+        logging.info(f"Model cache warm with {model} (version {self._version}) in {self._load_seconds:.3f}s")
+
+    def get_model(self) -> MyModel:
+        """
+        Returns the cached model, loading it on first use.
+        """
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            # another caller may have finished the load while we were waiting for the lock
+            if self._model is None:
+                self._load()
+            return self._model
+
+    def reload(self) -> MyModel:
+        """
+        Forces a fresh load of the model, e.g. after a new model was pushed to the registry.
+        Requests keep using the previous model until the new one is in place.
+        """
+        with self._lock:
+            self._load()
+            return self._model
+
+    def refresh(self) -> bool:
+        """
+        Reloads the model when its source version changed since it was loaded, e.g. because the
+        model pusher promoted a new model. A cold cache is left to the next get_model().
+        Returns True when the model was reloaded.
+        """
+        if self._model is None:
+            return False
+        source_version = self._current_source_version()
+        if source_version is None or source_version == self._source_version:
+            return False
+        logging.info(f"Production model changed from {self._source_version} to {source_version}, reloading")
+        self.reload()
+        return True
+
+    def _run_refresher(self, interval: float) -> None:
+        while not self._stop_refresher.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # the previous model keeps serving, the next check retries the load
+                logging.error(f"Model refresh failed: {e}")
+
+    def start_refresher(self) -> None:
+        """
+        Starts the daemon thread checking for a new production model every model_refresh_seconds,
+        a no-op when refreshes are disabled (0) or the cache has no source version.
+        """
+        interval = self.prediction_pipeline_config.model_refresh_seconds
+        if interval <= 0 or self.source_version is None or self._refresher is not None:
+            return
+        self._stop_refresher.clear()
+        self._refresher = threading.Thread(target=self._run_refresher, args=(interval,), name="model-refresher",
+                                           daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        if self._refresher is None:
+            return
+        self._stop_refresher.set()
+        self._refresher.join()
+        self._refresher = None
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready,
+            "model": str(self._model) if self._model is not None else None,
+            "model_version": getattr(self._model, "metadata", {}).get("model_version"),
+            "version": self._version,
+            "source_version": self._source_version,
+            "loaded_at": self._loaded_at,
+            "load_seconds": self._load_seconds,
+            "last_error": self._last_error,
+        }
+
+
+# Shared cache used by the serving app and VehicleDataClassifier
+model_cache: ModelCache = ModelCache()
@@ -0,0 +1,137 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.logger import logging
+
+# Rough per-entry bookkeeping of the OrderedDict (hash slot, linked list node, value tuple)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions keyed on the normalized feature tuple
+    (see prediction_pipeline.record_cache_key).
+
+    Entries belong to the model version they were computed with. The first lookup with a
+    newer version drops every entry, so a reloaded model never serves stale predictions.
+    The size is bounded by cache_max_entries and, when set, by cache_max_bytes (estimated
+    from the size of the first entry). Entries older than cache_ttl_seconds count as misses.
+    """
+
+    def __init__(self, prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()) -> None:
+        """
+        :param prediction_pipeline_config: Configuration holding whether the cache is on, its bounds and TTL
+        """
+        self.enabled = prediction_pipeline_config.cache_enabled
+        self.max_entries = max(1, prediction_pipeline_config.cache_max_entries)
+        self.max_bytes = prediction_pipeline_config.cache_max_bytes
+        self.ttl_seconds = prediction_pipeline_config.cache_ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._model_version: Optional[int] = None
+        self._entry_bytes: Optional[int] = None
+        self._capacity = self.max_entries
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self.invalidations: int = 0
+
+    def _check_version(self, model_version: int) -> bool:
+        """
+        Drops all entries when the model changed, caller must hold the lock.
+        Returns False for a caller still using an older model than the cache.
+        """
+        if self._model_version is not None and model_version < self._model_version:
+            return False
+        if model_version != self._model_version:
+            if self._entries:
+                self.invalidations += 1
+                logging.info(f"Prediction cache cleared for model version {model_version} "
+                             f"({len(self._entries)} entries dropped)")
+                self._entries.clear()
+            self._model_version = model_version
+        return True
+
+    def get_many(self, model_version: int, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        """
+        Looks up many keys at once, returns the cached value or None for every key.
+        """
+        now = time.monotonic()
+        values: List[Optional[Any]] = []
+        with self._lock:
+            if not self._check_version(model_version):
+                self.misses += len(keys)
+                return [None] * len(keys)
+            entries = self._entries
+            for key in keys:
+                entry = entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                elif entry[1] < now:
+                    del entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    values.append(entry[0])
+        return values
+
+    def put_many(self, model_version: int, keys: Sequence[Hashable], values: Sequence[Any]) -> None:
+        """
+        Stores the predictions of one model version, evicting the least recently used entries.
+        """
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+        with self._lock:
+            if not self._check_version(model_version):
+                return
+            if self._entry_bytes is None and keys:
+                self._entry_bytes = self._estimate_entry_bytes(keys[0], values[0])
+                if self.max_bytes > 0:
+                    self._capacity = max(1, min(self.max_entries, self.max_bytes // self._entry_bytes))
+            entries = self._entries
+            for key, value in zip(keys, values):
+                entries[key] = (value, expires_at)
+                entries.move_to_end(key)
+            while len(entries) > self._capacity:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    @staticmethod
+    def _estimate_entry_bytes(key: Hashable, value: Any) -> int:
+        size = sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD_BYTES
+        if isinstance(key, tuple):
+            size += sum(sys.getsizeof(item) for item in key)
+        return size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "capacity": self._capacity,
+            "estimated_bytes": len(self._entries) * (self._entry_bytes or 0),
+            "ttl_seconds": self.ttl_seconds,
+            "model_version": self._model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Shared cache used by VehicleDataClassifier
+prediction_cache: PredictionCache = PredictionCache()
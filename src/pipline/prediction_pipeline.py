@@ -1,14 +1,154 @@
+import math
 import sys 
+from operator import attrgetter
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 from src.exception import MyException 
 from src.logger import logging 
-from src.entity.config_entity import ModelPusherConfig
-from src.entity.artifact_entity import ModelPusherArtifact
-from src.components.model_pusher import ModelPusher
-from src.entity.s3_estimator import Proj1Estimator
+from src.metrics import STAGE_SECONDS
 from src.entity.config_entity import VehiclePredictorConfig
-from pandas import DataFrame
+from src.pipline.model_cache import ModelCache, model_cache
+from src.pipline.prediction_cache import PredictionCache, prediction_cache
+from pandas import DataFrame, Series, to_numeric
+from pandas.api.types import is_numeric_dtype
+
+# Input columns expected by the model, in the order used during training
+VEHICLE_DATA_COLUMNS: List[str] = [
+    "Gender",
+    "Age",
+    "Driving_License",
+    "Region_Code",
+    "Previously_Insured",
+    "Annual_Premium",
+    "Policy_Sales_Channel",
+    "Vintage",
+    "Vehicle_Age_lt_1_Year",
+    "Vehicle_Age_gt_2_Years",
+    "Vehicle_Damage_Yes",
+]
+
+_get_vehicle_values = attrgetter(*VEHICLE_DATA_COLUMNS)
+
+# Values of the raw categorical columns, anything else is an invalid value
+VEHICLE_AGE_VALUES = ("< 1 Year", "1-2 Year", "> 2 Years")
+VEHICLE_DAMAGE_VALUES = ("Yes", "No")
+
+# Raw column an encoded input column can also be computed from
+_RAW_VEHICLE_COLUMNS = {
+    "Vehicle_Age_lt_1_Year": "Vehicle_Age",
+    "Vehicle_Age_gt_2_Years": "Vehicle_Age",
+    "Vehicle_Damage_Yes": "Vehicle_Damage",
+}
+
+
+def record_cache_key(record: object) -> Tuple[float, ...]:
+    """
+    Normalized prediction cache key of one record: its feature values as floats in model
+    input order, so 1, "1" and 1.0 map to the same cache entry.
+    """
+    return tuple(map(float, _get_vehicle_values(record)))
+
+
+class VehicleRecord:
+    """
+    Compact, validated vehicle input for the serving hot path. Uses __slots__ so a record is a
+    small fixed-size object, all values are converted to float on construction so bad input
+    fails here with a clear message instead of deep inside the model.
+    """
+    __slots__ = tuple(VEHICLE_DATA_COLUMNS)
+
+    def __init__(self, Gender, Age, Driving_License, Region_Code, Previously_Insured, Annual_Premium,
+                 Policy_Sales_Channel, Vintage, Vehicle_Age_lt_1_Year, Vehicle_Age_gt_2_Years, Vehicle_Damage_Yes):
+        values = (Gender, Age, Driving_License, Region_Code, Previously_Insured, Annual_Premium,
+                  Policy_Sales_Channel, Vintage, Vehicle_Age_lt_1_Year, Vehicle_Age_gt_2_Years, Vehicle_Damage_Yes)
+        for column, value in zip(VEHICLE_DATA_COLUMNS, values):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                number = math.nan
+            # float() also parses "nan" and "inf", the model would score those silently
+            if not math.isfinite(number):
+                raise ValueError(f"Invalid value for {column}: {value!r}")
+            object.__setattr__(self, column, number)
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping) -> "VehicleRecord":
+        try:
+            return cls(**{column: mapping[column] for column in VEHICLE_DATA_COLUMNS})
+        except KeyError as e:
+            raise ValueError(f"Missing vehicle column {e}") from None
+
+    def __repr__(self):
+        return f"VehicleRecord({', '.join(f'{column}={getattr(self, column)}' for column in VEHICLE_DATA_COLUMNS)})"
+
+
+def get_vehicle_batch_data_frame(records: Iterable[object]) -> DataFrame:
+    """
+    Builds one columnar DataFrame from many vehicle records (any objects exposing the input
+    columns as attributes) so the whole batch goes through the preprocessor and the forest
+    in a single call.
+    """
+    try:
+        records = list(records)
+        return DataFrame({column: [getattr(record, column) for record in records] for column in VEHICLE_DATA_COLUMNS})
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def get_vehicle_input_frame_from_raw(dataframe: DataFrame) -> DataFrame:
+    """
+    Converts raw vehicle records (Gender as Male/Female, Vehicle_Age and Vehicle_Damage as text,
+    like the rows stored in MongoDB) into the model input columns. Columns that are already
+    encoded are passed through, so both raw and encoded files can be scored.
 
-class VechileData:
+    Unlike pd.get_dummies in DataTransformation the encoding does not depend on which categories
+    happen to be present, so every chunk of a file is encoded the same way. Missing ("na",
+    empty) or non-numeric values and unknown categories become NaN, see vehicle_input_errors.
+    Raises ValueError when a column is missing in both its encoded and its raw form.
+    """
+    missing = [column for column in VEHICLE_DATA_COLUMNS
+               if column not in dataframe.columns and _RAW_VEHICLE_COLUMNS.get(column) not in dataframe.columns]
+    if missing:
+        raise ValueError(f"Missing vehicle columns {missing}")
+    try:
+        input_df = DataFrame(index=dataframe.index)
+        for column in VEHICLE_DATA_COLUMNS:
+            if column in dataframe.columns:
+                input_df[column] = to_numeric(dataframe[column], errors="coerce")
+
+        if not is_numeric_dtype(dataframe["Gender"]):
+            # Male/Female text first, the rest as numbers, a mostly encoded column with one "na"
+            # or a mix of both forms only invalidates the rows that are neither
+            input_df["Gender"] = dataframe["Gender"].map({"Female": 0, "Male": 1}).astype(np.float64) \
+                .fillna(input_df["Gender"])
+        if "Vehicle_Age" in dataframe.columns:
+            known = dataframe["Vehicle_Age"].isin(VEHICLE_AGE_VALUES)
+            input_df["Vehicle_Age_lt_1_Year"] = (dataframe["Vehicle_Age"] == "< 1 Year").astype(int).where(known)
+            input_df["Vehicle_Age_gt_2_Years"] = (dataframe["Vehicle_Age"] == "> 2 Years").astype(int).where(known)
+        if "Vehicle_Damage" in dataframe.columns:
+            known = dataframe["Vehicle_Damage"].isin(VEHICLE_DAMAGE_VALUES)
+            input_df["Vehicle_Damage_Yes"] = (dataframe["Vehicle_Damage"] == "Yes").astype(int).where(known)
+
+        return input_df[VEHICLE_DATA_COLUMNS]
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def vehicle_input_errors(input_df: DataFrame) -> np.ndarray:
+    """
+    Returns one error message per row of model input columns, "" for the rows that can be
+    scored; a row with a missing or non-finite value fails on its own.
+    """
+    invalid = ~np.isfinite(input_df[VEHICLE_DATA_COLUMNS].to_numpy(dtype=np.float64))
+    errors = np.full(len(input_df), "", dtype=object)
+    columns = np.array(VEHICLE_DATA_COLUMNS)
+    for row in np.flatnonzero(invalid.any(axis=1)):
+        errors[row] = f"Missing or invalid value for {', '.join(columns[invalid[row]])}"
+    return errors
+
+
+class VehicleData:
     def __init__(self,
                 Gender,
                 Age,
@@ -24,14 +164,14 @@ class VechileData:
         try:
             self.Gender = Gender 
             self.Age = Age
-            self.Driving_License=Driving_License,
-            self.Region_Code=Region_Code,
-            self.Previously_Insured   =Previously_Insured,
-            self.Annual_Premium   =Annual_Premium,
-            self.Policy_Sales_Channel =Policy_Sales_Channel,
-            self.Vintage=Vintage,
-            self.Vehicle_Age_lt_1_Year =Vehicle_Age_lt_1_Year,
-            self.Vehicle_Age_gt_2_Years   =Vehicle_Age_gt_2_Years,
+            self.Driving_License=Driving_License
+            self.Region_Code=Region_Code
+            self.Previously_Insured   =Previously_Insured
+            self.Annual_Premium   =Annual_Premium
+            self.Policy_Sales_Channel =Policy_Sales_Channel
+            self.Vintage=Vintage
+            self.Vehicle_Age_lt_1_Year =Vehicle_Age_lt_1_Year
+            self.Vehicle_Age_gt_2_Years   =Vehicle_Age_gt_2_Years
             self.Vehicle_Damage_Yes =Vehicle_Damage_Yes
         except Exception as e:
             raise MyException(e,sys)
@@ -41,9 +181,11 @@ class VechileData:
         """
         the function returns the data frame from the USVisaData class input
         """
-        try;
+        try:
             vechile_input_data = self.get_vechicle_data_as_dict()
             return DataFrame(vechile_input_data)
+        except Exception as e:
+            raise MyException(e, sys) from e
 
     def get_vechicle_data_as_dict(self):
         """
@@ -73,13 +215,25 @@ class VechileData:
         except Exception as e:
             raise MyException(e, sys) from e
 
+    def get_vehicle_record(self) -> VehicleRecord:
+        """
+        Returns the input as a validated VehicleRecord, the form used on the serving hot path
+        """
+        return VehicleRecord(**{column: getattr(self, column) for column in VEHICLE_DATA_COLUMNS})
+
 class VehicleDataClassifier:
-    def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),) -> None:
+    def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),
+                 model_cache: ModelCache = model_cache,
+                 prediction_cache: PredictionCache = prediction_cache) -> None:
         """
         :param prediction_pipeline_config: Configuration for prediction the value
+        :param model_cache: Process-wide cache holding the loaded production model
+        :param prediction_cache: Process-wide cache of earlier predictions, used when enabled
         """
         try:
             self.prediction_pipeline_config = prediction_pipeline_config
+            self.model_cache = model_cache
+            self.prediction_cache = prediction_cache
         except Exception as e:
             raise MyException(e, sys)
 
@@ -90,15 +244,151 @@ class VehicleDataClassifier:
         """
         try:
             logging.info("Entered predict method of VehicleDataClassifier class")
-            model = Proj1Estimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
+            # the cache downloads the model once per process and then hands out the warm copy
+            model = self.model_cache.get_model()
             result =  model.predict(dataframe)
             
             return result
         
         except Exception as e:
             raise MyException(e, sys)
-            
 
+    def predict_with_probabilities(self, dataframe) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the predicted labels together with the class probabilities,
+        the labels are derived from the probabilities the same way the forest does it
+        so the dataframe is only transformed and scored once.
+        """
+        try:
+            logging.info("Entered predict_with_probabilities method of VehicleDataClassifier class")
+            model = self.model_cache.get_model()
+            probabilities = model.predict_proba(dataframe)
+            labels = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+            return labels, probabilities
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict_records(self, records: Sequence[object]) -> np.ndarray:
+        """
+        Predicts straight from record objects. The compiled model writes them into a float64
+        matrix without pandas, the sklearn model falls back to building a DataFrame.
+        With the prediction cache enabled only the records not seen before are scored.
+        """
+        try:
+            if self.prediction_cache.enabled:
+                return self._predict_records_cached(records)
+            return self._predict_records(self.model_cache.get_model(), records)
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def _predict_records(model, records: Sequence[object]) -> np.ndarray:
+        if hasattr(model, "predict_records"):
+            return model.predict_records(records)
+        with STAGE_SECONDS.time("record_build"):
+            dataframe = get_vehicle_batch_data_frame(records)
+        return model.predict(dataframe)
+
+    def _predict_records_cached(self, records: Sequence[object]) -> np.ndarray:
+        model = self.model_cache.get_model()
+        model_version = self.model_cache.version
+        if self.model_cache.get_model() is not model:
+            # a reload swapped the model meanwhile, the version may not belong to it
+            return self._predict_records(model, records)
+        keys = [record_cache_key(record) for record in records]
+        cached = self.prediction_cache.get_many(model_version, keys)
+        missing = [index for index, value in enumerate(cached) if value is None]
+        if not missing:
+            # every record is a hit, preprocessing and the forest are skipped entirely
+            return np.array(cached)
+
+        predictions = self._predict_records(model, [records[index] for index in missing])
+        self.prediction_cache.put_many(model_version, [keys[index] for index in missing], predictions.tolist())
+        if len(missing) == len(records):
+            return predictions
+        result = np.empty(len(records), dtype=predictions.dtype)
+        for index, value in zip(missing, predictions):
+            cached[index] = value
+        result[:] = cached
+        return result
+
+    def predict_records_with_probabilities(self, records: Sequence[object]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as predict_with_probabilities, for record objects.
+        """
+        try:
+            model = self.model_cache.get_model()
+            if hasattr(model, "predict_proba_records"):
+                probabilities = model.predict_proba_records(records)
+            else:
+                with STAGE_SECONDS.time("record_build"):
+                    dataframe = get_vehicle_batch_data_frame(records)
+                probabilities = model.predict_proba(dataframe)
+            labels = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+            return labels, probabilities
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+    def predict_columns(self, columns: Mapping[str, np.ndarray],
+                        return_probabilities: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Predicts from decoded column arrays (one array per input column) and returns the labels
+        and, when asked for, the class probabilities. The compiled model copies the arrays
+        straight into its feature matrix, the sklearn model gets a DataFrame built from them.
+        Bulk requests bypass the prediction cache, building a key per row would cost more
+        than it saves.
+        """
+        try:
+            model = self.model_cache.get_model()
+            if hasattr(model, "predict_columns"):
+                if not return_probabilities:
+                    return model.predict_columns(columns), None
+                probabilities = model.predict_proba_columns(columns)
+            else:
+                with STAGE_SECONDS.time("record_build"):
+                    dataframe = DataFrame({column: columns[column] for column in VEHICLE_DATA_COLUMNS})
+                if not return_probabilities:
+                    return model.predict(dataframe), None
+                probabilities = model.predict_proba(dataframe)
+            labels = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+            return labels, probabilities
+
+        except Exception as e:
+            raise MyException(e, sys)
+
+
+def predict_records(records: Sequence[object]) -> np.ndarray:
+    """
+    Module level entry point for the inference executor, picklable for process pools.
+    """
+    return VehicleDataClassifier().predict_records(records)
+
+
+def predict_records_with_probabilities(records: Sequence[object]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Module level entry point for the inference executor, picklable for process pools.
+    """
+    return VehicleDataClassifier().predict_records_with_probabilities(records)
+
+
+def score_vehicle_csv_chunk(chunk: DataFrame, include_header: bool) -> str:
+    """
+    Scores one chunk of an uploaded CSV file and returns it as CSV text with a prediction and an
+    error column added. Rows with missing or invalid values get no prediction but the reason in
+    their error column, the other rows are scored. Module level so the inference executor can
+    also run it on a process pool. A chunk missing vehicle columns raises ValueError.
+    """
+    input_df = get_vehicle_input_frame_from_raw(chunk)
+    try:
+        errors = vehicle_input_errors(input_df)
+        valid = errors == ""
+        predictions = Series(None, index=chunk.index, dtype="Int64")
+        if valid.any():
+            predictions[valid] = VehicleDataClassifier().predict(dataframe=input_df[valid])
+        return chunk.assign(prediction=predictions, error=errors).to_csv(index=False, header=include_header)
+    except Exception as e:
+        raise MyException(e, sys) from e
@@ -0,0 +1,168 @@
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from src.constants import APP_METRICS_SNAPSHOT_SECONDS
+from src.exception import MyException
+from src.logger import logging
+from src.metrics import registry
+from src.pipline.model_cache import ModelCache, model_cache
+
+# A worker that dies sooner than this after its start is restarted with a delay,
+# so a worker that crashes on startup does not turn into a fork loop
+MIN_WORKER_LIFETIME_SECONDS: float = 1.0
+
+
+class PreforkServer:
+    """
+    Serves the app from several forked uvicorn workers that share one copy of the model.
+
+    The parent binds the listening socket and loads (and compiles) the production model
+    before it forks, then only supervises: it restarts workers that die and forwards
+    SIGTERM/SIGINT for a graceful shutdown. The workers inherit the warm model cache, so
+    they never download or unpickle the model themselves. The forest's node arrays are
+    plain NumPy buffers that no worker writes to, they stay shared copy-on-write between
+    all workers instead of being duplicated per process.
+
+    Objects that exist before the fork are moved out of the garbage collector's reach with
+    gc.freeze(), otherwise the first collection in every worker would touch (and copy) all
+    pages holding Python objects of the model.
+
+    Every worker exports its metrics as snapshots into one directory, so /metrics answers with
+    the series of all workers, labelled worker="<index>", whichever worker takes the scrape.
+    A restarted worker keeps the index, and so the series, of the worker it replaces.
+    """
+
+    def __init__(self, app, host: str, port: int, workers: int,
+                 model_cache: ModelCache = model_cache, log_level: str = "info",
+                 metrics_dir: Optional[str] = None,
+                 metrics_snapshot_seconds: float = APP_METRICS_SNAPSHOT_SECONDS) -> None:
+        """
+        :param app: ASGI app, or an import string such as "app:app"
+        :param host: Address to bind
+        :param port: Port to bind
+        :param workers: Number of worker processes to fork
+        :param model_cache: Cache that is warmed in the parent before forking
+        :param log_level: uvicorn log level of the workers
+        :param metrics_dir: Directory of the workers' metrics snapshots, a temporary one when omitted
+        :param metrics_snapshot_seconds: Seconds between two metrics snapshots of a worker
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.model_cache = model_cache
+        self.log_level = log_level
+        self.metrics_dir = metrics_dir
+        self.metrics_snapshot_seconds = metrics_snapshot_seconds
+        self._socket: Optional[socket.socket] = None
+        self._children: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._should_exit = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _warm_model(self) -> None:
+        try:
+            self.model_cache.get_model()
+        except Exception as e:
+            # workers load the model on their own then, each with its own copy
+            logging.error(f"Model could not be loaded before forking, workers will load it themselves: {e}")
+
+    def _spawn(self, worker_index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(worker_index)
+        self._children[pid] = worker_index
+        self._started_at[pid] = time.monotonic()
+        logging.info(f"Started worker {worker_index} (pid {pid})")
+
+    def _run_worker(self, worker_index: int) -> None:
+        """Runs one uvicorn server on the inherited socket, never returns."""
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+            gc.enable()
+            registry.export_worker_snapshots(self.metrics_dir, str(worker_index),
+                                             interval=self.metrics_snapshot_seconds)
+            config = uvicorn.Config(self.app, log_level=self.log_level)
+            uvicorn.Server(config).run(sockets=[self._socket])
+        except BaseException as e:
+            logging.error(f"Worker {worker_index} failed: {e}")
+            exit_code = 1
+        finally:
+            # skip the parent's atexit handlers and buffered state inherited through fork
+            os._exit(exit_code)
+
+    def _handle_exit(self, signum, frame) -> None:
+        self._should_exit = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        created_metrics_dir = self.metrics_dir is None
+        try:
+            if created_metrics_dir:
+                self.metrics_dir = tempfile.mkdtemp(prefix="prefork-metrics-")
+            elif os.path.isdir(self.metrics_dir):
+                # snapshots of an earlier run may name workers this run does not have
+                for file_name in os.listdir(self.metrics_dir):
+                    if file_name.startswith("worker-"):
+                        os.remove(os.path.join(self.metrics_dir, file_name))
+            self._socket = self._bind()
+            logging.info(f"Listening on {self.host}:{self.port}, loading the model before forking "
+                         f"{self.workers} workers")
+            self._warm_model()
+
+            # no collections between freeze and fork, and none of the frozen objects are ever collected
+            gc.disable()
+            gc.collect()
+            gc.freeze()
+
+            signal.signal(signal.SIGTERM, self._handle_exit)
+            signal.signal(signal.SIGINT, self._handle_exit)
+            for worker_index in range(self.workers):
+                self._spawn(worker_index)
+            gc.enable()
+
+            while self._children:
+                pid, status = os.wait()
+                worker_index = self._children.pop(pid, None)
+                if worker_index is None:
+                    continue
+                lifetime = time.monotonic() - self._started_at.pop(pid)
+                if self._should_exit:
+                    continue
+                logging.warning(f"Worker {worker_index} (pid {pid}) exited with status "
+                                f"{os.waitstatus_to_exitcode(status)}, restarting it")
+                if lifetime < MIN_WORKER_LIFETIME_SECONDS:
+                    time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+                if not self._should_exit:
+                    self._spawn(worker_index)
+            logging.info("All workers stopped")
+        except Exception as e:
+            raise MyException(e, sys) from e
+        finally:
+            if self._socket is not None:
+                self._socket.close()
+            if created_metrics_dir and self.metrics_dir is not None:
+                shutil.rmtree(self.metrics_dir, ignore_errors=True)
+                self.metrics_dir = None
@@ -0,0 +1,192 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import replace
+from typing import List, Optional, Sequence
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.logger import logging
+from src.metrics import registry
+from src.pipline.model_cache import ModelCache
+from src.pipline.prediction_cache import PredictionCache
+from src.pipline.prediction_pipeline import VehicleDataClassifier, record_cache_key
+
+SHADOW_REQUESTS_TOTAL = registry.counter(
+    "shadow_requests_total",
+    "Requests handed to the challenger model by outcome (scored, dropped, failed)",
+    labelnames=("outcome",))
+
+
+def challenger_predictor_config(
+        prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()) -> VehiclePredictorConfig:
+    """
+    Configuration that loads the challenger model from the shadow paths of the model
+    registry instead of the production model, downloaded into its own local directory.
+    """
+    return replace(
+        prediction_pipeline_config,
+        model_file_path=prediction_pipeline_config.shadow_model_file_path,
+        model_artifact_file_path=prediction_pipeline_config.shadow_model_artifact_file_path,
+        model_artifact_local_dir=os.path.join(prediction_pipeline_config.model_artifact_local_dir, "challenger"),
+        model_artifact_local_path=prediction_pipeline_config.shadow_model_artifact_local_path,
+        cache_enabled=False,
+    )
+
+
+class ShadowScorer:
+    """
+    Scores the inputs of served requests with a challenger model in the background and keeps
+    the champion and challenger predictions side by side for offline comparison.
+
+    Requests are handed over with submit() after the champion's response has been sent. The
+    hand-over never blocks: when the bounded queue is full the request is dropped from shadow
+    scoring instead of waiting, so a slow or failing challenger cannot add latency to the
+    champion. A single daemon thread loads the challenger (through its own ModelCache, on
+    first use) and scores the queued requests. The results go to a ring buffer of
+    shadow_buffer_size records, the oldest ones are overwritten.
+    """
+
+    def __init__(self, prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),
+                 model_cache: Optional[ModelCache] = None) -> None:
+        """
+        :param prediction_pipeline_config: Configuration holding whether shadow scoring is on, its paths and bounds
+        :param model_cache: Cache of the challenger model, defaults to one loading from the shadow paths
+        """
+        self.enabled = prediction_pipeline_config.shadow_enabled
+        self.sample_rate = min(1.0, max(0.0, prediction_pipeline_config.shadow_sample_rate))
+        self.max_queue = max(1, prediction_pipeline_config.shadow_max_queue)
+        challenger_config = challenger_predictor_config(prediction_pipeline_config)
+        self.model_cache = model_cache if model_cache is not None else ModelCache(challenger_config)
+        # the challenger never reads or fills the champion's prediction cache
+        self.classifier = VehicleDataClassifier(challenger_config, model_cache=self.model_cache,
+                                                prediction_cache=PredictionCache(challenger_config))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._results: deque = deque(maxlen=max(1, prediction_pipeline_config.shadow_buffer_size))
+        self._results_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.submitted: int = 0
+        self.dropped: int = 0
+        self.sampled_out: int = 0
+        self.scored: int = 0
+        self.failed: int = 0
+        self.records_scored: int = 0
+        self.records_agreed: int = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.is_running:
+                return
+            self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._worker.start()
+        logging.info(f"Shadow scorer started (queue {self.max_queue}, sample rate {self.sample_rate})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        worker = self._worker
+        if worker is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        worker.join(timeout)
+        self._worker = None
+
+    def submit(self, route: str, records: Sequence[object], champion_predictions: Sequence) -> bool:
+        """
+        Queues the records of one served request for the challenger.
+        Returns False when the request was not queued (disabled, sampled out or queue full).
+
+        :param route: Route that served the request, kept with the results
+        :param records: Input records of the request
+        :param champion_predictions: Predictions the champion returned for the records
+        """
+        if not self.enabled:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        if not self.is_running:
+            # threads do not survive a fork, every worker starts its own
+            self.start()
+        try:
+            self._queue.put_nowait((time.time(), route, list(records), list(champion_predictions)))
+        except queue.Full:
+            self.dropped += 1
+            SHADOW_REQUESTS_TOTAL.inc("dropped")
+            return False
+        self.submitted += 1
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            submitted_at, route, records, champion_predictions = item
+            try:
+                challenger_predictions = self.classifier.predict_records(records)
+            except Exception as e:
+                self.failed += 1
+                SHADOW_REQUESTS_TOTAL.inc("failed")
+                logging.warning(f"Shadow scoring of a {route} request failed: {e}")
+                continue
+            self._record(submitted_at, route, records, champion_predictions, challenger_predictions)
+
+    def _record(self, submitted_at: float, route: str, records: List[object], champion_predictions: List,
+                challenger_predictions) -> None:
+        challenger_model = self.model_cache.status()["model_version"] or self.model_cache.version
+        rows = []
+        agreed = 0
+        for record, champion, challenger in zip(records, champion_predictions, challenger_predictions.tolist()):
+            champion = champion.item() if hasattr(champion, "item") else champion
+            agreed += champion == challenger
+            rows.append({"submitted_at": submitted_at, "route": route, "challenger_model": challenger_model,
+                         "features": list(record_cache_key(record)), "champion": champion,
+                         "challenger": challenger})
+        with self._results_lock:
+            self._results.extend(rows)
+        self.scored += 1
+        self.records_scored += len(rows)
+        self.records_agreed += agreed
+        SHADOW_REQUESTS_TOTAL.inc("scored")
+
+    def results(self, limit: Optional[int] = None, drain: bool = False) -> List[dict]:
+        """
+        Returns the buffered comparisons, oldest first.
+
+        :param limit: Return at most this many of the oldest records
+        :param drain: Remove the returned records from the buffer, for collecting them offline
+        """
+        with self._results_lock:
+            count = len(self._results) if limit is None else min(limit, len(self._results))
+            if drain:
+                return [self._results.popleft() for _ in range(count)]
+            return [self._results[index] for index in range(count)]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.is_running,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "scored": self.scored,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+            "buffered": len(self._results),
+            "records_scored": self.records_scored,
+            "agreement": self.records_agreed / self.records_scored if self.records_scored else None,
+            "challenger": self.model_cache.status(),
+        }
+
+
+# Shared shadow scorer used by the serving app
+shadow_scorer: ShadowScorer = ShadowScorer()
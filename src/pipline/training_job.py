@@ -0,0 +1,216 @@
+import fcntl
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.entity.config_entity import TrainingJobConfig, TrainingPipelineConfig
+from src.exception import MyException
+from src.logger import logging
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_JOB_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class TrainingJobConflictError(RuntimeError):
+    """Raised when a training job is submitted while another one is still training."""
+
+
+def write_job_status(status_file_path: str, status: dict) -> None:
+    """
+    Writes the job status atomically so readers never see a half written file.
+    """
+    tmp_file_path = f"{status_file_path}.{os.getpid()}.tmp"
+    with open(tmp_file_path, "w") as status_file:
+        json.dump(status, status_file, indent=2)
+    os.replace(tmp_file_path, status_file_path)
+
+
+def read_job_status(status_file_path: str) -> Optional[dict]:
+    try:
+        with open(status_file_path) as status_file:
+            return json.load(status_file)
+    except FileNotFoundError:
+        return None
+
+
+def run_training_job(status_file_path: str, lock_file_path: str, niceness: int) -> None:
+    """
+    Entry point of the training worker process. Waits for the training lock, runs the full
+    training pipeline in the job's own artifact directory and records every stage with its
+    timings in the job status file.
+
+    :param status_file_path: JSON status file of the job, created by the submitting process
+    :param lock_file_path: File lock that lets only one job train at a time across all processes
+    :param niceness: Scheduling priority increment, so training yields the CPU to inference
+    """
+    status = read_job_status(status_file_path)
+    try:
+        os.nice(niceness)
+    except OSError as e:
+        logging.warning(f"Could not lower the priority of training job {status['job_id']}: {e}")
+
+    with open(lock_file_path, "w") as lock_file:
+        # a job submitted by another serving process at the same moment queues here
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            status.update(status=JOB_RUNNING, started_at=time.time(), pid=os.getpid())
+            write_job_status(status_file_path, status)
+            logging.info(f"Training job {status['job_id']} started in {status['artifact_dir']}")
+
+            def on_stage(stage: str, event: str) -> None:
+                now = time.time()
+                if event == "started":
+                    status["current_stage"] = stage
+                    status["stages"].append({"name": stage, "status": JOB_RUNNING, "started_at": now,
+                                             "finished_at": None, "seconds": None})
+                else:
+                    stage_status = status["stages"][-1]
+                    stage_status.update(status=JOB_SUCCEEDED if event == "completed" else JOB_FAILED,
+                                        finished_at=now, seconds=round(now - stage_status["started_at"], 3))
+                write_job_status(status_file_path, status)
+
+            # imported here so the serving process never loads the training stack
+            from src.pipline.training_pipeline import TrainingPipeline
+
+            training_pipeline_config = TrainingPipelineConfig(artifact_dir=status["artifact_dir"])
+            pipeline = TrainingPipeline(training_pipeline_config=training_pipeline_config, stage_callback=on_stage)
+            model_pusher_artifact = pipeline.run_pipeline()
+            status.update(status=JOB_SUCCEEDED, model_pushed=model_pusher_artifact is not None,
+                          s3_model_path=getattr(model_pusher_artifact, "s3_model_path", None))
+        except Exception as e:
+            logging.error(f"Training job {status['job_id']} failed: {e}")
+            status.update(status=JOB_FAILED, error=str(e))
+        finally:
+            status.update(current_stage=None, finished_at=time.time())
+            status["seconds"] = round(status["finished_at"] - (status["started_at"] or status["finished_at"]), 3)
+            write_job_status(status_file_path, status)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class TrainingJobRunner:
+    """
+    Runs the training pipeline as background jobs in separate worker processes.
+
+    The serving process only spawns the worker and reads its status file, so Mongo export,
+    resampling and forest fitting never hold the event loop or the GIL of the server.
+    Every job trains in its own artifact directory and a file lock lets only one job train
+    at a time, also across several serving processes. Job status lives in one JSON file per
+    job under jobs_dir, so any serving process can answer status requests for any job.
+    """
+
+    def __init__(self, training_job_config: TrainingJobConfig = TrainingJobConfig()) -> None:
+        """
+        :param training_job_config: Configuration holding the jobs directory, lock file and niceness
+        """
+        self.training_job_config = training_job_config
+        # spawn instead of fork, the serving process runs threads that must not be forked
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[str, multiprocessing.process.BaseProcess] = {}
+        self._lock = threading.Lock()
+
+    def _status_file_path(self, job_id: str) -> str:
+        return os.path.join(self.training_job_config.jobs_dir, f"{job_id}.json")
+
+    def _is_training_elsewhere(self) -> bool:
+        """Returns True when some process currently holds the training lock."""
+        with open(self.training_job_config.lock_file_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return False
+
+    def active_job_ids(self) -> List[str]:
+        """Ids of the jobs started by this process that are still running or waiting for the lock."""
+        multiprocessing.active_children()  # reaps finished workers
+        return [job_id for job_id, process in self._processes.items() if process.is_alive()]
+
+    def submit(self) -> dict:
+        """
+        Starts a new training job and returns its initial status.
+        Raises TrainingJobConflictError when a job is already training.
+        """
+        try:
+            os.makedirs(self.training_job_config.jobs_dir, exist_ok=True)
+            with self._lock:
+                if self.active_job_ids() or self._is_training_elsewhere():
+                    raise TrainingJobConflictError("A training job is already running")
+
+                job_id = uuid.uuid4().hex[:12]
+                training_pipeline_config = TrainingPipelineConfig.for_run(job_id)
+                status = {
+                    "job_id": job_id,
+                    "status": JOB_QUEUED,
+                    "artifact_dir": training_pipeline_config.artifact_dir,
+                    "submitted_at": time.time(),
+                    "started_at": None,
+                    "finished_at": None,
+                    "seconds": None,
+                    "current_stage": None,
+                    "stages": [],
+                    "pid": None,
+                    "error": None,
+                }
+                status_file_path = self._status_file_path(job_id)
+                write_job_status(status_file_path, status)
+
+                process = self._context.Process(target=run_training_job, name=f"training-{job_id}",
+                                                args=(status_file_path, self.training_job_config.lock_file_path,
+                                                      self.training_job_config.niceness))
+                process.start()
+                self._processes[job_id] = process
+            logging.info(f"Submitted training job {job_id} (pid {process.pid})")
+            return status
+        except TrainingJobConflictError:
+            raise
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns the status of a job, or None for an unknown job id.
+        """
+        if not job_id.isalnum():
+            return None
+        status_file_path = self._status_file_path(job_id)
+        status = read_job_status(status_file_path)
+        if status is None or status["status"] in FINISHED_JOB_STATES:
+            return status
+
+        # a worker that died without writing its final status, e.g. killed by the OOM killer
+        process = self._processes.get(job_id)
+        if process is not None and not process.is_alive():
+            process.join()
+            status.update(status=JOB_FAILED, current_stage=None, finished_at=time.time(),
+                          error=f"Training process exited unexpectedly with code {process.exitcode}")
+            write_job_status(status_file_path, status)
+        return status
+
+    def shutdown(self) -> None:
+        """
+        Stops the jobs started by this process, used when the server shuts down.
+        """
+        for job_id in self.active_job_ids():
+            process = self._processes[job_id]
+            logging.warning(f"Stopping training job {job_id} because the server is shutting down")
+            process.terminate()
+            process.join()
+            status_file_path = self._status_file_path(job_id)
+            status = read_job_status(status_file_path)
+            if status is not None and status["status"] not in FINISHED_JOB_STATES:
+                status.update(status=JOB_FAILED, current_stage=None, finished_at=time.time(),
+                              error="Training job was stopped because the server shut down")
+                write_job_status(status_file_path, status)
+
+
+# Shared runner used by the serving app
+training_job_runner: TrainingJobRunner = TrainingJobRunner()
@@ -1,24 +1,50 @@
 import os 
 import sys 
+import time
+from typing import Callable, Optional
 
 from src.exception import MyException
 from src.logger import logging 
-from src.entity.config_entity import TrainingPipelineConfig,DataIngestionConfig,DataTransformationConfig,ModelTrainerConfig
+from src.entity.config_entity import (TrainingPipelineConfig,DataIngestionConfig,DataValidationConfig,
+                                      DataTransformationConfig,ModelTrainerConfig,ModelEvaluationConfig,
+                                      ModelPusherConfig,training_pipeline_config)
 from src.components.data_ingestion import DataIngestion
 from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
 from src.components.model_evaluation import ModelEvaluate
+from src.components.model_pusher import ModelPusher
+from src.data_access.proj1_data import Proj1Data
 from src.entity.artifact_entity import (
     DataIngestionArtifact,
     DataValidationArtifact,
     DataTransformationArtifact,
     ModelTrainerArtifact,
-    ModelEvaluationArtifact)
+    ModelEvaluationArtifact,
+    ModelPusherArtifact)
+
+# Called with (stage name, event) where event is "started", "completed" or "failed"
+StageCallback = Callable[[str, str], None]
 
 class TrainingPipeline:
-    def __init__(self):
-       self.data_ingestion_config = DataIngestionConfig()
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = training_pipeline_config,
+                 stage_callback: Optional[StageCallback] = None, proj1_data: Optional[Proj1Data] = None):
+        """
+        :param training_pipeline_config: Configuration holding the artifact directory of this run
+        :param stage_callback: Optional callable notified when a stage starts, completes or fails
+        :param proj1_data: Exporter the data ingestion reads the collection with, e.g. one on a local
+            mongod or an in-memory stand-in; connects to MONGODB_URL when omitted
+        """
+        self.training_pipeline_config = training_pipeline_config
+        self.stage_callback = stage_callback
+        self.proj1_data = proj1_data
+        artifact_dir = training_pipeline_config.artifact_dir
+        self.data_ingestion_config = DataIngestionConfig(artifact_dir=artifact_dir)
+        self.data_validation_config = DataValidationConfig(artifact_dir=artifact_dir)
+        self.data_transformation_config = DataTransformationConfig(artifact_dir=artifact_dir)
+        self.model_trainer_config = ModelTrainerConfig(artifact_dir=artifact_dir)
+        self.model_evaluation_config = ModelEvaluationConfig()
+        self.model_pusher_config = ModelPusherConfig()
 
 
     def start_data_ingestion(self) -> DataIngestionArtifact:
@@ -28,7 +54,8 @@ class TrainingPipeline:
         try:
             logging.info("Starting the data ingestion")
             logging.info("Get the data from mongodb")
-            data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
+            data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config,
+                                           proj1_data=self.proj1_data)
             data_ingestion_artifacts = data_ingestion.initiate_data_ingestion()
             logging.info("got the train_ste and test_set form mongodb ")
             logging.info("Excited the data ingestion from the training pipeline")
@@ -62,7 +89,7 @@ class TrainingPipeline:
                                                      data_transformation_config=self.data_transformation_config,
                                                      data_validation_artifact=data_validation_artifact)
             data_transformation_artifact = data_transformation.initiate_data_transformation()
-            return data_ingestion_artifact
+            return data_transformation_artifact
         except Exception as e:
             raise MyException(e,sys) from e 
         
@@ -89,7 +116,7 @@ class TrainingPipeline:
         """
         logging.info("started the model evaluation pipeline")
         try:
-            model_evaluation = ModelEvaluate(model_evaluation_config = self.model_evaluation_config,
+            model_evaluation = ModelEvaluate(model_eval_config = self.model_evaluation_config,
                                                data_ingestion_artifact = data_ingestion_artifact,
                                                model_trainer_artifact = model_trainer_artifact,
                                                )
@@ -101,13 +128,64 @@ class TrainingPipeline:
             raise MyException(e,sys) from e 
 
 
-    def run_pipeline(self,) -> None:
+    def start_model_pusher(self,model_evaluation_artifact:ModelEvaluationArtifact) -> ModelPusherArtifact:
+        """
+        responsible for pushing the accepted model to the s3 model registry
+        """
+        logging.info("started the model pusher pipeline")
+        try:
+            model_pusher = ModelPusher(model_evaluation_artifact=model_evaluation_artifact,
+                                       model_pusher_config=self.model_pusher_config)
+            model_pusher_artifact = model_pusher.initiate_model_pusher()
+            return model_pusher_artifact
+        except Exception as e:
+            raise MyException(e,sys) from e
+
+
+    def _run_stage(self, stage: str, stage_fn: Callable, *args):
+        """
+        Runs one pipeline stage, logs its duration and notifies the stage callback.
+        """
+        self._notify(stage, "started")
+        start = time.perf_counter()
+        try:
+            artifact = stage_fn(*args)
+        except Exception:
+            self._notify(stage, "failed")
+            raise
+        logging.info(f"Stage {stage} finished in {time.perf_counter() - start:.2f}s")
+        self._notify(stage, "completed")
+        return artifact
+
+    def _notify(self, stage: str, event: str) -> None:
+        if self.stage_callback is None:
+            return
+        try:
+            self.stage_callback(stage, event)
+        except Exception as e:
+            # progress reporting must never fail the training run itself
+            logging.warning(f"Stage callback failed for {stage} {event}: {e}")
+
+
+    def run_pipeline(self,) -> Optional[ModelPusherArtifact]:
         '''
-        this is responsible for running the pipeline
+        this is responsible for running the pipeline, returns the pusher artifact when the
+        new model was accepted and pushed and None when the production model was kept
         '''
         try:
-            data_ingestion_artifacts = self.start_data_ingestion()
+            data_ingestion_artifact = self._run_stage("data_ingestion", self.start_data_ingestion)
+            data_validation_artifact = self._run_stage("data_validation", self.start_data_validation,
+                                                       data_ingestion_artifact)
+            data_transformation_artifact = self._run_stage("data_transformation", self.start_data_transformation,
+                                                           data_ingestion_artifact, data_validation_artifact)
+            model_trainer_artifact = self._run_stage("model_trainer", self.start_model_trainer,
+                                                     data_transformation_artifact)
+            model_evaluation_artifact = self._run_stage("model_evaluation", self.start_model_evaluation,
+                                                        data_ingestion_artifact, model_trainer_artifact)
+            if not model_evaluation_artifact.is_model_accepted:
+                logging.info("Trained model is not better than the production model, not pushing it")
+                return None
+            return self._run_stage("model_pusher", self.start_model_pusher, model_evaluation_artifact)
 
         except Exception as e:
             raise MyException(e,sys) from e
-        
\ No newline at end of file
@@ -1,11 +1,15 @@
 import os
 import sys
 
+from typing import Dict, Iterator, List, Optional
+
 import numpy as np
 import dill
+import pandas as pd
 import yaml
 from pandas import DataFrame
 
+from src.constants import DATA_ARTIFACT_COMPRESSION, DATA_COMPACT_DTYPES, DATA_READ_CHUNK_ROWS, SCHEMA_FILE_PATH
 from src.exception import MyException
 from src.logger import logging
 
@@ -86,6 +90,235 @@ def save_object(file_path: str, obj: object) -> None:
         raise MyException(e, sys) from e
 
 
+def get_schema_column_types(schema_file_path: str = SCHEMA_FILE_PATH) -> Dict[str, str]:
+    """
+    Returns the schema.yaml column types ("int", "float" or "category") by column name.
+    """
+    column_types = {}
+    for column in read_yaml_file(file_path=schema_file_path)["columns"]:
+        column_types.update(column)
+    return column_types
+
+
+def get_schema_dtypes(schema_file_path: str = SCHEMA_FILE_PATH) -> Dict[str, str]:
+    """
+    Returns the compact numpy dtypes of the schema.yaml dtypes section by column name.
+    """
+    return read_yaml_file(file_path=schema_file_path).get("dtypes", {})
+
+
+def _compact_column(column: pd.Series, dtype: str) -> pd.Series:
+    """Returns the numeric column cast to dtype when every value survives the cast, unchanged otherwise."""
+    dtype = np.dtype(dtype)
+    if column.dtype == dtype or not pd.api.types.is_numeric_dtype(column.dtype):
+        return column
+    if dtype.kind in "iu" and column.hasnans:
+        # float32 holds every integer of up to 24 bits exactly, and the missing values
+        dtype = np.dtype(np.float32)
+    try:
+        compact = column.astype(dtype)
+    except (ValueError, OverflowError):
+        return column
+    # out of range ints wrap around and fractions are truncated, compare against the original values
+    if not ((compact == column) | column.isna()).all():
+        return column
+    return compact
+
+
+def apply_schema_dtypes(dataframe: DataFrame, column_types: Optional[Dict[str, str]] = None,
+                        compact_dtypes: Optional[Dict[str, str]] = None) -> DataFrame:
+    """
+    Casts the columns present in the dataframe to their schema dtypes: category columns to
+    pandas categoricals (unless the export already encoded them as numbers), int columns to int64 (float64 while they hold missing values) and
+    float columns to float64. Columns outside the schema are left unchanged.
+
+    Categories are always sorted, whatever order a reader produced them in (Parquet
+    dictionaries keep the order of first appearance), so pd.get_dummies(drop_first=True) in
+    DataTransformation drops the same level for every file.
+
+    :param column_types: Schema column types, read from schema.yaml when omitted
+    :param compact_dtypes: Smaller dtypes the numeric columns are then cast to where their values
+        allow it, the schema.yaml dtypes section when omitted and DATA_COMPACT_DTYPES is set
+    """
+    column_types = column_types if column_types is not None else get_schema_column_types()
+    if compact_dtypes is None:
+        compact_dtypes = get_schema_dtypes() if DATA_COMPACT_DTYPES else {}
+    for column, column_type in column_types.items():
+        if column not in dataframe.columns or \
+                (column in compact_dtypes and dataframe[column].dtype == np.dtype(compact_dtypes[column])):
+            continue
+        if column_type == "category":
+            dtype = dataframe[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories = sorted(dtype.categories)
+                if list(dtype.categories) != categories:
+                    dataframe[column] = dataframe[column].cat.reorder_categories(categories)
+            elif not pd.api.types.is_numeric_dtype(dtype):
+                dataframe[column] = dataframe[column].astype("category")
+        elif column_type == "int":
+            if not dataframe[column].hasnans:
+                dataframe[column] = dataframe[column].astype(np.int64)
+        elif column_type == "float":
+            dataframe[column] = dataframe[column].astype(np.float64)
+    for column, dtype in compact_dtypes.items():
+        if column in dataframe.columns:
+            dataframe[column] = _compact_column(dataframe[column], dtype)
+    return dataframe
+
+
+def dataframe_columns(file_path: str) -> List[str]:
+    """
+    Returns the column names of a Parquet or CSV artifact without reading its rows.
+    """
+    try:
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet
+
+            return pyarrow.parquet.read_schema(file_path).names
+        return pd.read_csv(file_path, nrows=0).columns.to_list()
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def write_dataframe(file_path: str, dataframe: DataFrame, compression: str = DATA_ARTIFACT_COMPRESSION) -> None:
+    """
+    Writes a tabular artifact, as compressed Parquet (keeping the dtypes, categories included)
+    when the path ends in .parquet and as CSV otherwise.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        if file_path.endswith(".parquet"):
+            dataframe.to_parquet(tmp_file_path, index=False, compression=compression)
+        else:
+            dataframe.to_csv(tmp_file_path, index=False, header=True)
+        os.replace(tmp_file_path, file_path)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+class DataFrameChunkWriter:
+    """
+    Writes a tabular artifact one DataFrame chunk at a time, so a stream of chunks never has
+    to be held in memory: a .parquet path gets one compressed row group per chunk, any other
+    path CSV. The file is written next to its destination and renamed into place when the
+    writer is closed without an error, a failed write leaves no partial artifact.
+
+    :param file_path: Destination of the artifact
+    :param column_types: Type ("int", "float" or "category", anything else is text) of every
+        column in output order, fixes the Parquet schema so all row groups share it even when a
+        chunk holds only missing values in some column
+    :param compression: Parquet compression codec
+    """
+
+    def __init__(self, file_path: str, column_types: Dict[str, str],
+                 compression: str = DATA_ARTIFACT_COMPRESSION) -> None:
+        self.file_path = file_path
+        self.column_types = column_types
+        self.compression = compression
+        self.rows = 0
+        self._tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        self._writer = None
+
+    def __enter__(self) -> "DataFrameChunkWriter":
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        if self.file_path.endswith(".parquet"):
+            import pyarrow
+            import pyarrow.parquet
+
+            arrow_types = {"int": pyarrow.int64(), "float": pyarrow.float64()}
+            self._schema = pyarrow.schema([(column, arrow_types.get(column_type, pyarrow.string()))
+                                           for column, column_type in self.column_types.items()])
+            self._writer = pyarrow.parquet.ParquetWriter(self._tmp_file_path, self._schema,
+                                                         compression=self.compression)
+        else:
+            self._writer = open(self._tmp_file_path, "w", newline="")
+        return self
+
+    def write(self, chunk: DataFrame) -> None:
+        chunk = chunk[list(self.column_types)]
+        if self.file_path.endswith(".parquet"):
+            import pyarrow
+
+            self._writer.write_table(pyarrow.Table.from_pandas(chunk, schema=self._schema, preserve_index=False))
+        else:
+            chunk.to_csv(self._writer, index=False, header=self.rows == 0)
+        self.rows += len(chunk)
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if not self.file_path.endswith(".parquet") and self.rows == 0 and exc_type is None:
+            # keep the header so an empty stream still gives a readable file
+            pd.DataFrame(columns=list(self.column_types)).to_csv(self._writer, index=False)
+        self._writer.close()
+        if exc_type is None:
+            os.replace(self._tmp_file_path, self.file_path)
+        elif os.path.exists(self._tmp_file_path):
+            os.remove(self._tmp_file_path)
+
+
+def _iter_dataframe_chunks(file_path: str, columns: Optional[List[str]], chunk_rows: int,
+                           dictionary_columns: List[str]) -> Iterator[DataFrame]:
+    if file_path.endswith(".parquet"):
+        import pyarrow.parquet
+
+        # category columns are decoded as dictionaries, straight into pandas categoricals
+        parquet_file = pyarrow.parquet.ParquetFile(file_path, read_dictionary=dictionary_columns)
+        if parquet_file.metadata.num_rows == 0:
+            yield parquet_file.schema_arrow.empty_table().select(columns or parquet_file.schema_arrow.names).to_pandas()
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_rows)
+
+
+def _concat_chunks(chunks: List[DataFrame]) -> DataFrame:
+    """Concatenates typed chunks, categoricals get the sorted union of the chunk categories first
+    so they stay categoricals (pandas falls back to object when the categories differ)."""
+    for column in chunks[0].columns:
+        if all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks):
+            categories = sorted(set().union(*(chunk[column].cat.categories for chunk in chunks)))
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_dataframe(file_path: str, columns: Optional[List[str]] = None,
+                   column_types: Optional[Dict[str, str]] = None,
+                   compact_dtypes: Optional[Dict[str, str]] = None,
+                   chunk_rows: int = DATA_READ_CHUNK_ROWS) -> DataFrame:
+    """
+    Reads a Parquet or CSV artifact with the schema dtypes.
+
+    :param file_path: Artifact written by write_dataframe
+    :param columns: Read only these columns, Parquet skips the others on disk
+    :param column_types: Schema column types, read from schema.yaml when omitted
+    :param compact_dtypes: Compact dtypes, see apply_schema_dtypes. With compact dtypes the file
+        is converted chunk_rows rows at a time and every chunk typed before the next is read, the
+        int64/float64 and string columns of the whole file are never in memory at once
+    """
+    try:
+        column_types = column_types if column_types is not None else get_schema_column_types()
+        if compact_dtypes is None:
+            compact_dtypes = get_schema_dtypes() if DATA_COMPACT_DTYPES else {}
+        if not compact_dtypes:
+            if file_path.endswith(".parquet"):
+                dataframe = pd.read_parquet(file_path, columns=columns)
+            else:
+                dataframe = pd.read_csv(file_path, usecols=columns)
+            return apply_schema_dtypes(dataframe, column_types, compact_dtypes)
+        file_columns = columns or dataframe_columns(file_path)
+        dictionary_columns = [column for column, column_type in column_types.items()
+                              if column_type == "category" and column in file_columns]
+        chunks = [apply_schema_dtypes(chunk, column_types, compact_dtypes)
+                  for chunk in _iter_dataframe_chunks(file_path, columns, chunk_rows, dictionary_columns)]
+        dataframe = chunks[0] if len(chunks) == 1 else _concat_chunks(chunks)
+        del chunks
+        # columns whose dtype differed between the chunks are typed again on the whole frame
+        return apply_schema_dtypes(dataframe, column_types, compact_dtypes)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
 # def drop_columns(df: DataFrame, cols: list)-> DataFrame:
 
 #     """
@@ -0,0 +1,11 @@
+import os
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    """config/schema.yaml and the other config files are read relative to the project root."""
+    monkeypatch.chdir(PROJECT_ROOT)
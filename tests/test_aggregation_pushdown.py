@@ -0,0 +1,74 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_transformation import DataTransformation
+from src.constants import DATABASE_NAME, TARGET_COLUMN
+from src.data_access.aggregation_pushdown import register_mongomock_operators
+from src.data_access.proj1_data import Proj1Data
+from src.utils.main_utils import apply_schema_dtypes
+
+mongomock = pytest.importorskip("mongomock")
+
+COLLECTION_NAME = "vehicles"
+
+
+def raw_documents(n_rows: int, seed: int = 0) -> list:
+    """Documents as uploaded from the vehicle insurance CSV, with a few "na" values."""
+    rng = np.random.default_rng(seed)
+    documents = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 86, n_rows),
+        "Driving_License": rng.integers(0, 2, n_rows),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(np.float64),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], n_rows),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": np.round(2630 + rng.lognormal(10.2, 0.6, n_rows)),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(np.float64),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": rng.integers(0, 2, n_rows),
+    }).astype(object).to_dict("records")
+    for index in rng.choice(n_rows, 5, replace=False):
+        documents[index]["Annual_Premium"] = "na"
+    return documents
+
+
+def client_side_encoded(frame: pd.DataFrame) -> pd.DataFrame:
+    """The raw export after the encodings DataTransformation applies in pandas."""
+    transformation = DataTransformation.__new__(DataTransformation)
+    transformation._schema_config = {"drop_columns": "_id"}
+    features = frame.drop(columns=[TARGET_COLUMN])
+    features = transformation._map_gender_column(features)
+    features = transformation._drop_id_column(features)
+    features = transformation._create_dummy_columns(features)
+    return transformation._rename_columns(features)
+
+
+@pytest.fixture
+def proj1_data():
+    register_mongomock_operators()
+    client = mongomock.MongoClient()
+    client[DATABASE_NAME][COLLECTION_NAME].insert_many(raw_documents(500))
+    return Proj1Data(mongo_client=types.SimpleNamespace(client=client, database=client[DATABASE_NAME]))
+
+
+def export(proj1_data: Proj1Data, pushdown: bool) -> pd.DataFrame:
+    chunks = proj1_data.iter_collection_chunks(COLLECTION_NAME, chunk_size=128, sort_key="_id", pushdown=pushdown)
+    return apply_schema_dtypes(pd.concat(chunks, ignore_index=True))
+
+
+def test_pushdown_export_matches_client_side_encodings(proj1_data):
+    raw = export(proj1_data, pushdown=False)
+    encoded = export(proj1_data, pushdown=True)
+
+    expected = client_side_encoded(raw)
+    actual = encoded.drop(columns=["_id", TARGET_COLUMN])
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual.astype(np.float64), expected.astype(np.float64))
+    assert encoded[TARGET_COLUMN].tolist() == raw[TARGET_COLUMN].tolist()
+    assert encoded["_id"].tolist() == raw["_id"].astype(str).tolist()
+    assert encoded["Annual_Premium"].isna().sum() == 5
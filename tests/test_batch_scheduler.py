@@ -0,0 +1,119 @@
+import asyncio
+import dataclasses
+import threading
+import time
+
+import pytest
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.pipline.batch_scheduler import MicroBatchScheduler
+from src.pipline.inference_executor import InferenceExecutor, InferenceOverloadedError
+from src.pipline.prediction_pipeline import VehicleRecord
+
+
+def vehicle_record(age: int) -> VehicleRecord:
+    return VehicleRecord(Gender=1, Age=age, Driving_License=1, Region_Code=28.0, Previously_Insured=0,
+                         Annual_Premium=40454.0, Policy_Sales_Channel=26.0, Vintage=217,
+                         Vehicle_Age_lt_1_Year=0, Vehicle_Age_gt_2_Years=1, Vehicle_Damage_Yes=1)
+
+
+class RecordingModel:
+    """Predicts the age of every record and remembers the size of every batch it scored."""
+
+    def __init__(self) -> None:
+        self.batch_sizes = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict(self, records):
+        self.release.wait()
+        self.batch_sizes.append(len(records))
+        return [record.Age for record in records]
+
+
+def run_scheduler(model: RecordingModel, scenario, **overrides):
+    config = dataclasses.replace(VehiclePredictorConfig(), **{"executor_kind": "thread", "executor_workers": 1,
+                                                              "executor_max_queue": 64, "timeout_seconds": 5.0,
+                                                              **overrides})
+    executor = InferenceExecutor(config)
+    scheduler = MicroBatchScheduler(predict_fn=model.predict, executor=executor, prediction_pipeline_config=config)
+
+    async def main():
+        try:
+            return await scenario(scheduler)
+        finally:
+            model.release.set()
+            await scheduler.stop()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+
+def test_full_batches_flush_without_waiting_for_the_window():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        started = time.monotonic()
+        predictions = await asyncio.gather(*(scheduler.submit(vehicle_record(age)) for age in range(20, 28)))
+        return predictions, time.monotonic() - started
+
+    predictions, elapsed = run_scheduler(model, scenario, micro_batch_max_size=4, micro_batch_window_ms=10_000)
+
+    assert predictions == list(range(20, 28))
+    assert model.batch_sizes == [4, 4]
+    assert elapsed < 5
+
+
+def test_partial_batch_flushes_when_the_window_closes():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        return await asyncio.gather(*(scheduler.submit(vehicle_record(age)) for age in range(20, 23)))
+
+    assert run_scheduler(model, scenario, micro_batch_max_size=100, micro_batch_window_ms=50) == [20, 21, 22]
+    assert model.batch_sizes == [3]
+
+
+def test_lone_request_is_scored_without_waiting_for_the_window():
+    model = RecordingModel()
+
+    async def scenario(scheduler):
+        started = time.monotonic()
+        prediction = await scheduler.submit(vehicle_record(44))
+        return prediction, time.monotonic() - started
+
+    prediction, elapsed = run_scheduler(model, scenario, micro_batch_max_size=100, micro_batch_window_ms=10_000)
+
+    assert prediction == 44
+    assert elapsed < 5
+
+
+def test_submit_times_out_when_the_model_hangs():
+    model = RecordingModel()
+    model.release.clear()
+
+    async def scenario(scheduler):
+        with pytest.raises(TimeoutError, match="did not finish within 0.05s"):
+            await scheduler.submit(vehicle_record(44))
+
+    run_scheduler(model, scenario, timeout_seconds=0.05)
+
+
+def test_submit_is_rejected_when_the_queue_is_full():
+    model = RecordingModel()
+    model.release.clear()
+
+    async def scenario(scheduler):
+        # the first request occupies the only worker, the second fills the queue of one
+        pending = []
+        for age in (20, 21):
+            pending.append(asyncio.ensure_future(scheduler.submit(vehicle_record(age))))
+            await asyncio.sleep(0.05)
+        with pytest.raises(InferenceOverloadedError):
+            await scheduler.submit(vehicle_record(22))
+        model.release.set()
+        return await asyncio.gather(*pending)
+
+    assert run_scheduler(model, scenario, executor_max_queue=1) == [20, 21]
@@ -0,0 +1,136 @@
+import json
+import types
+from unittest import mock
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from src.pipline.columnar_codec import (ARROW_FILE_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, JSON_MEDIA_TYPE,
+                                        MSGPACK_MEDIA_TYPE, UnprocessableColumnsError, decode_columns,
+                                        negotiate_response_media_type)
+from src.pipline.model_cache import ModelCache
+from src.pipline.prediction_pipeline import VEHICLE_DATA_COLUMNS, VehicleDataClassifier
+
+CODECS = [ARROW_STREAM_MEDIA_TYPE, ARROW_FILE_MEDIA_TYPE, MSGPACK_MEDIA_TYPE]
+
+VEHICLE_COLUMNS = {
+    "Gender": [1, 0, 1], "Age": [44, 21, 67], "Driving_License": [1, 1, 1], "Region_Code": [28.0, 3.0, 8.0],
+    "Previously_Insured": [0, 1, 0], "Annual_Premium": [40454.0, 2630.0, 33536.0],
+    "Policy_Sales_Channel": [26.0, 152.0, 26.0], "Vintage": [217, 27, 80], "Vehicle_Age_lt_1_Year": [0, 1, 0],
+    "Vehicle_Age_gt_2_Years": [1, 0, 1], "Vehicle_Damage_Yes": [1, 0, 1],
+}
+
+
+def encode_request(media_type: str, columns: dict) -> bytes:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        msgpack = pytest.importorskip("msgpack")
+        # float columns as little endian bins, integer ones as plain arrays
+        return msgpack.packb({"columns": {
+            name: np.asarray(values, dtype="<f8").tobytes() if isinstance(values[0], float) else values
+            for name, values in columns.items()}})
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    batch = pyarrow.record_batch([pyarrow.array(values) for values in columns.values()], names=list(columns))
+    sink = pyarrow.BufferOutputStream()
+    new_writer = pyarrow.ipc.new_file if media_type == ARROW_FILE_MEDIA_TYPE else pyarrow.ipc.new_stream
+    with new_writer(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_response(media_type: str, body: bytes) -> dict:
+    if media_type == JSON_MEDIA_TYPE:
+        return json.loads(body)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        import msgpack
+
+        payload = msgpack.unpackb(body)
+        return {name: np.frombuffer(values, dtype=payload["dtypes"][name]).tolist()
+                for name, values in payload["columns"].items()}
+    import pyarrow
+    import pyarrow.ipc
+
+    if media_type == ARROW_FILE_MEDIA_TYPE:
+        table = pyarrow.ipc.open_file(pyarrow.py_buffer(body)).read_all()
+    else:
+        table = pyarrow.ipc.open_stream(pyarrow.py_buffer(body)).read_all()
+    return table.to_pydict()
+
+
+def predict_columns(self, columns, return_probabilities=False):
+    # scores straight from the decoded Age column, so the values must survive the codec
+    labels = (columns["Age"] > 40).astype(np.int64)
+    probabilities = np.column_stack([1.0 - labels * 0.75, labels * 0.75]) if return_probabilities else None
+    return labels, probabilities
+
+
+@pytest.fixture
+def client():
+    with mock.patch.object(VehicleDataClassifier, "predict_columns", predict_columns), \
+            mock.patch.object(ModelCache, "get_model", return_value=types.SimpleNamespace(classes_=np.array([0, 1]))):
+        yield TestClient(app_module.app)
+
+
+@pytest.mark.parametrize("media_type", CODECS)
+def test_decoded_columns_match_the_request(media_type):
+    columns = decode_columns(encode_request(media_type, VEHICLE_COLUMNS), media_type)
+
+    assert list(columns) == VEHICLE_DATA_COLUMNS
+    for name, values in VEHICLE_COLUMNS.items():
+        np.testing.assert_array_equal(columns[name], values)
+
+
+@pytest.mark.parametrize("media_type", CODECS)
+def test_bulk_round_trip_answers_in_the_request_format(client, media_type):
+    response = client.post("/predict/bulk", params={"return_probabilities": True},
+                           content=encode_request(media_type, VEHICLE_COLUMNS), headers={"Content-Type": media_type})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert decode_response(media_type, response.content) == {
+        "prediction": [1, 0, 1], "probability_0": [0.25, 1.0, 0.25], "probability_1": [0.75, 0.0, 0.75]}
+
+
+@pytest.mark.parametrize("media_type", CODECS)
+def test_bulk_answers_json_when_asked_to(client, media_type):
+    response = client.post("/predict/bulk", content=encode_request(media_type, VEHICLE_COLUMNS),
+                           headers={"Content-Type": media_type, "Accept": "text/html;q=0.9, application/json"})
+
+    assert decode_response(JSON_MEDIA_TYPE, response.content) == {
+        "predictions": [1, 0, 1], "labels": ["Response-Yes", "Response-No", "Response-Yes"]}
+
+
+@pytest.mark.parametrize("media_type", CODECS)
+def test_non_finite_values_are_unprocessable(client, media_type):
+    body = encode_request(media_type, {**VEHICLE_COLUMNS, "Annual_Premium": [40454.0, float("inf"), float("nan")]})
+
+    with pytest.raises(UnprocessableColumnsError, match="Column Annual_Premium holds 2 NaN or infinite values"):
+        decode_columns(body, media_type)
+    response = client.post("/predict/bulk", content=body, headers={"Content-Type": media_type})
+    assert response.status_code == 422
+    assert response.json()["error"] == "Column Annual_Premium holds 2 NaN or infinite values"
+
+
+def test_msgpack_bin_columns_follow_their_dtypes():
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.packb({"columns": {name: np.asarray(values, dtype="<i4").tobytes()
+                                      for name, values in VEHICLE_COLUMNS.items()},
+                          "dtypes": {name: "<i4" for name in VEHICLE_COLUMNS}})
+
+    columns = decode_columns(body, MSGPACK_MEDIA_TYPE)
+
+    assert columns["Annual_Premium"].dtype == np.dtype("<i4")
+    assert columns["Annual_Premium"].tolist() == [40454, 2630, 33536]
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, MSGPACK_MEDIA_TYPE),
+    ("*/*", MSGPACK_MEDIA_TYPE),
+    ("application/json;q=0.5, application/vnd.apache.arrow.stream", ARROW_STREAM_MEDIA_TYPE),
+    ("application/x-msgpack;q=0, application/json", JSON_MEDIA_TYPE),
+])
+def test_response_type_follows_the_accept_header(accept, expected):
+    assert negotiate_response_media_type(accept, MSGPACK_MEDIA_TYPE) == expected
@@ -0,0 +1,58 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from src.entity.compiled_model import CompiledModel
+from src.entity.estimator import MyModel
+from src.exception import MyException
+
+
+@pytest.fixture(scope="module")
+def models():
+    rng = np.random.default_rng(7)
+    frame = pd.DataFrame({
+        "Age": rng.integers(20, 80, 500).astype(float),
+        "Annual_Premium": rng.uniform(2000, 60000, 500),
+        "Previously_Insured": rng.integers(0, 2, 500).astype(float),
+    })
+    target = ((frame["Age"] > 40) & (frame["Previously_Insured"] == 0)).astype(int)
+    preprocessor = Pipeline(steps=[("Preprocessor", ColumnTransformer(
+        transformers=[("StandardScaler", StandardScaler(), ["Age"]),
+                      ("MinMaxScaler", MinMaxScaler(), ["Annual_Premium"])],
+        remainder="passthrough"))])
+    forest = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0)
+    forest.fit(preprocessor.fit_transform(frame), target)
+    model = MyModel(preprocessing_object=preprocessor, trained_model_object=forest)
+    return model, CompiledModel.from_model(model), frame
+
+
+def test_compiled_model_matches_sklearn_on_valid_input(models):
+    model, compiled, frame = models
+    records = [types.SimpleNamespace(**row) for row in frame.to_dict("records")]
+    columns = {column: frame[column].to_numpy() for column in frame.columns}
+
+    np.testing.assert_array_equal(compiled.predict(frame), model.predict(frame))
+    np.testing.assert_array_equal(compiled.predict_proba(frame), model.predict_proba(frame))
+    np.testing.assert_array_equal(compiled.predict_records(records), model.predict(frame))
+    np.testing.assert_array_equal(compiled.predict_proba_columns(columns), model.predict_proba(frame))
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+@pytest.mark.parametrize("column", ["Age", "Annual_Premium", "Previously_Insured"])
+def test_compiled_model_and_sklearn_reject_non_finite_input(models, column, value):
+    model, compiled, frame = models
+    invalid = frame.head(5).copy()
+    invalid.loc[2, column] = value
+
+    # sklearn's scalers reject infinity with their own message, the rest fails the finite check
+    for predict in (model.predict, model.predict_proba, compiled.predict, compiled.predict_proba):
+        with pytest.raises(MyException, match="Input X contains"):
+            predict(invalid)
+    with pytest.raises(MyException, match="NaN or infinity"):
+        compiled.predict_columns({name: invalid[name].to_numpy() for name in invalid.columns})
@@ -0,0 +1,65 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_ingestion import DataIngestion
+from src.constants import DATABASE_NAME, TARGET_COLUMN
+from src.data_access.proj1_data import Proj1Data
+from src.entity.config_entity import DataIngestionConfig
+from src.utils.main_utils import read_dataframe
+
+COLLECTION_NAME = "vehicles"
+
+
+def ingestion_config(artifact_dir, **overrides) -> DataIngestionConfig:
+    return DataIngestionConfig(artifact_dir=str(artifact_dir), collection_name=COLLECTION_NAME, split_mode="hash",
+                               incremental=False, export_workers=1, export_chunk_size=128, pushdown=False,
+                               **overrides)
+
+
+def test_stratified_hash_split_keeps_the_ratio_of_every_class(tmp_path):
+    rng = np.random.default_rng(3)
+    dataframe = pd.DataFrame({"_id": [f"{index:024x}" for index in range(1000)],
+                              TARGET_COLUMN: (rng.random(1000) < 0.12).astype(int)})
+    ingestion = DataIngestion(ingestion_config(tmp_path, split_stratify=True, train_test_split_ratio=0.25))
+
+    test_mask = ingestion.hash_test_mask(dataframe)
+
+    for _, target in dataframe.groupby(TARGET_COLUMN)[TARGET_COLUMN]:
+        assert test_mask[target.index].sum() == round(0.25 * len(target))
+    # the same frame is split the same way every time, whatever its row order
+    shuffled = dataframe.sample(frac=1, random_state=0)
+    np.testing.assert_array_equal(ingestion.hash_test_mask(shuffled), test_mask[shuffled.index])
+
+
+def test_hash_split_rejects_a_column_missing_from_the_export(tmp_path):
+    dataframe = pd.DataFrame({"_id": ["a", "b"], TARGET_COLUMN: [0, 1]})
+
+    with pytest.raises(ValueError, match="'id' is not an exported column"):
+        DataIngestion(ingestion_config(tmp_path, split_hash_column="id")).hash_test_mask(dataframe)
+
+
+def test_streamed_and_exported_hash_splits_agree(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    rng = np.random.default_rng(5)
+    client = mongomock.MongoClient()
+    client[DATABASE_NAME][COLLECTION_NAME].insert_many(pd.DataFrame({
+        "id": np.arange(1, 401), "Gender": rng.choice(["Male", "Female"], 400), "Age": rng.integers(20, 86, 400),
+        "Driving_License": 1, "Region_Code": 28.0, "Previously_Insured": rng.integers(0, 2, 400),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], 400),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], 400), "Annual_Premium": 30000.0,
+        "Policy_Sales_Channel": 26.0, "Vintage": rng.integers(10, 300, 400), "Response": rng.integers(0, 2, 400),
+    }).astype(object).to_dict("records"))
+    proj1_data = Proj1Data(mongo_client=types.SimpleNamespace(client=client, database=client[DATABASE_NAME]))
+
+    streamed = DataIngestion(ingestion_config(tmp_path / "streamed"), proj1_data=proj1_data)
+    streamed.stream_split_into_train_test()
+    exported = DataIngestion(ingestion_config(tmp_path / "exported"), proj1_data=proj1_data)
+    exported.split_data_as_train_test(exported.export_data_into_feature_store())
+
+    for file_path in ("training_file_path", "testing_file_path"):
+        streamed_ids = read_dataframe(getattr(streamed.data_ingestion_config, file_path))["_id"]
+        exported_ids = read_dataframe(getattr(exported.data_ingestion_config, file_path))["_id"]
+        assert sorted(streamed_ids) == sorted(exported_ids)
@@ -0,0 +1,69 @@
+import asyncio
+import dataclasses
+import threading
+
+import pytest
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.pipline.inference_executor import InferenceExecutor, InferenceOverloadedError
+
+
+def thread_executor(**overrides) -> InferenceExecutor:
+    return InferenceExecutor(dataclasses.replace(VehiclePredictorConfig(), **{
+        "executor_kind": "thread", "executor_workers": 1, "executor_max_queue": 2, "timeout_seconds": 5.0,
+        **overrides}))
+
+
+def test_run_returns_the_result_off_the_event_loop():
+    executor = thread_executor()
+    try:
+        assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+    finally:
+        executor.shutdown()
+
+    assert executor.stats()["completed_total"] == 1
+
+
+def test_run_rejects_jobs_beyond_the_queue_bound():
+    executor = thread_executor()
+    release = threading.Event()
+
+    async def scenario():
+        # one job runs and one waits for the only worker, the queue of two is full
+        pending = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenceOverloadedError, match="queue is full"):
+            await executor.run(release.wait)
+        release.set()
+        return await asyncio.gather(*pending)
+
+    try:
+        assert asyncio.run(scenario()) == [True, True]
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert executor.stats()["rejected_total"] == 1
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes():
+    executor = thread_executor(executor_max_queue=1, timeout_seconds=0.05)
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(TimeoutError, match="did not finish within 0.05s"):
+            await executor.run(release.wait)
+        # the worker is still busy with the abandoned job, so the bound still holds
+        with pytest.raises(InferenceOverloadedError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.sleep(0.05)
+        return await executor.run(sum, [1, 2])
+
+    try:
+        assert asyncio.run(scenario()) == 3
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert executor.stats()["timeouts_total"] == 1
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import DataTransformation
+from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from src.entity.config_entity import DataTransformationConfig
+from src.utils import main_utils
+from src.utils.main_utils import load_numpy_array_data, read_dataframe, write_dataframe
+
+
+def test_single_chunk_parquet_categories_are_sorted(tmp_path):
+    # "Yes" and "> 2 Years" come first, a dictionary read keeps that order unless the categories are sorted
+    frame = pd.DataFrame({
+        "Gender": ["Male", "Female", "Male"],
+        "Age": [30, 40, 50],
+        "Vehicle_Age": ["> 2 Years", "< 1 Year", "1-2 Year"],
+        "Vehicle_Damage": ["Yes", "No", "Yes"],
+        "Response": [1, 0, 0],
+    })
+    file_path = str(tmp_path / "train.parquet")
+    write_dataframe(file_path, frame.astype({"Vehicle_Age": object, "Vehicle_Damage": object}))
+
+    dataframe = read_dataframe(file_path, compact_dtypes={"Age": "int16"}, chunk_rows=1000)
+
+    assert list(dataframe["Vehicle_Damage"].cat.categories) == ["No", "Yes"]
+    dummies = DataTransformation.__new__(DataTransformation)._create_dummy_columns(dataframe.drop(columns=["Gender"]))
+    assert [column for column in dummies.columns if column.startswith("Vehicle_")] == \
+        ["Vehicle_Age_< 1 Year", "Vehicle_Age_> 2 Years", "Vehicle_Damage_Yes"]
+
+
+def test_compact_dtypes_do_not_change_the_transformed_training_data(tmp_path, monkeypatch):
+    rng = np.random.default_rng(11)
+    n_rows = 600
+    frame = pd.DataFrame({
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 86, n_rows),
+        "Driving_License": rng.integers(0, 2, n_rows),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(np.float64),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], n_rows),
+        "Vehicle_Damage": rng.choice(["Yes", "No"], n_rows),
+        "Annual_Premium": np.round(2630 + rng.lognormal(10.2, 0.6, n_rows)),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(np.float64),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": (rng.random(n_rows) < 0.15).astype(int),
+    })
+    train_file_path, test_file_path = str(tmp_path / "train.parquet"), str(tmp_path / "test.parquet")
+    write_dataframe(train_file_path, frame.iloc[:450])
+    write_dataframe(test_file_path, frame.iloc[450:])
+
+    transformed = {}
+    for compact in (False, True):
+        monkeypatch.setattr(main_utils, "DATA_COMPACT_DTYPES", compact)
+        # SMOTEENN draws from the global numpy random state
+        np.random.seed(0)
+        artifact = DataTransformation(
+            data_ingestion_artifact=DataIngestionArtifact(trained_file_path=train_file_path,
+                                                          test_file_path=test_file_path),
+            data_transformation_config=DataTransformationConfig(artifact_dir=str(tmp_path / f"compact_{compact}")),
+            data_validation_artifact=DataValidationArtifact(validation_status=True, message="",
+                                                            validation_report_file_path=""),
+        ).initiate_data_transformation()
+        transformed[compact] = load_numpy_array_data(artifact.transformed_train_file_path)
+
+    assert transformed[True].dtype == np.float64
+    np.testing.assert_array_equal(transformed[True], transformed[False])
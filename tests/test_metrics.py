@@ -0,0 +1,36 @@
+from src.metrics import MetricsRegistry
+
+
+def worker_registry(snapshot_dir, worker: str) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests by route", labelnames=("route",))
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.export_worker_snapshots(str(snapshot_dir), worker, interval=3600)
+    return registry
+
+
+def test_render_without_snapshots_has_no_worker_label():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests by route", labelnames=("route",)).inc("/")
+
+    assert 'requests_total{route="/"} 1.0' in registry.render().splitlines()
+
+
+def test_every_worker_renders_the_series_of_all_workers(tmp_path):
+    first, second = worker_registry(tmp_path, "0"), worker_registry(tmp_path, "1")
+    first.metrics()["requests_total"].inc("/", amount=3)
+    first.metrics()["latency_seconds"].observe(0.5)
+    second.metrics()["requests_total"].inc("/")
+
+    # a worker sees the others as of their last snapshot, here written by their own render
+    assert 'requests_total{route="/",worker="1"} 1.0' not in first.render().splitlines()
+    second_render = second.render()
+    first_render = first.render()
+
+    assert first_render == second_render
+    lines = first_render.splitlines()
+    assert 'requests_total{route="/",worker="0"} 3.0' in lines
+    assert 'requests_total{route="/",worker="1"} 1.0' in lines
+    assert 'latency_seconds_bucket{worker="0",le="1.0"} 1' in lines
+    assert 'latency_seconds_count{worker="0"} 1' in lines
+    assert sum(line.startswith("# TYPE requests_total") for line in lines) == 1
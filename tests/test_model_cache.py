@@ -0,0 +1,56 @@
+import dataclasses
+
+import numpy as np
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.pipline.model_cache import ModelCache
+from src.pipline.prediction_cache import PredictionCache
+from src.pipline.prediction_pipeline import VehicleDataClassifier, VehicleRecord
+
+RECORD = VehicleRecord(Gender=1, Age=44, Driving_License=1, Region_Code=28.0, Previously_Insured=0,
+                       Annual_Premium=40454.0, Policy_Sales_Channel=26.0, Vintage=217,
+                       Vehicle_Age_lt_1_Year=0, Vehicle_Age_gt_2_Years=1, Vehicle_Damage_Yes=1)
+
+
+class CountingModel:
+    def __init__(self, label: int) -> None:
+        self.label = label
+        self.scored = 0
+
+    def predict_records(self, records):
+        self.scored += len(records)
+        return np.full(len(records), self.label)
+
+
+def test_reload_makes_earlier_prediction_cache_entries_miss():
+    models = [CountingModel(label=0), CountingModel(label=1)]
+    config = dataclasses.replace(VehiclePredictorConfig(), cache_enabled=True)
+    model_cache = ModelCache(config, loader=lambda: models.pop(0))
+    prediction_cache = PredictionCache(config)
+    classifier = VehicleDataClassifier(config, model_cache=model_cache, prediction_cache=prediction_cache)
+
+    first_model = model_cache.get_model()
+    assert classifier.predict_records([RECORD]).tolist() == [0]
+    assert classifier.predict_records([RECORD]).tolist() == [0]
+    assert (first_model.scored, prediction_cache.hits) == (1, 1)
+
+    second_model = model_cache.reload()
+    assert classifier.predict_records([RECORD]).tolist() == [1]
+    assert second_model.scored == 1
+    assert prediction_cache.stats()["invalidations"] == 1
+
+
+def test_refresh_reloads_only_when_the_source_version_changed():
+    source = {"version": "etag-1"}
+    model_cache = ModelCache(loader=lambda: CountingModel(label=0), source_version=lambda: source["version"])
+
+    assert not model_cache.refresh()  # a cold cache is loaded by the next request, not by the refresher
+    model_cache.get_model()
+    assert not model_cache.refresh()
+    assert model_cache.version == 1
+
+    source["version"] = "etag-2"
+    assert model_cache.refresh()
+    assert model_cache.version == 2
+    assert model_cache.status()["source_version"] == "etag-2"
+    assert not model_cache.refresh()
@@ -0,0 +1,79 @@
+import dataclasses
+
+import numpy as np
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.pipline.model_cache import ModelCache
+from src.pipline.prediction_cache import PredictionCache
+from src.pipline.prediction_pipeline import VehicleDataClassifier, VehicleRecord
+
+
+class AgeModel:
+    def __init__(self) -> None:
+        self.scored = []
+
+    def predict_records(self, records):
+        self.scored.append([int(record.Age) for record in records])
+        return np.array([int(record.Age) for record in records])
+
+
+def vehicle_record(age: int) -> VehicleRecord:
+    return VehicleRecord(Gender=1, Age=age, Driving_License=1, Region_Code=28.0, Previously_Insured=0,
+                         Annual_Premium=40454.0, Policy_Sales_Channel=26.0, Vintage=217,
+                         Vehicle_Age_lt_1_Year=0, Vehicle_Age_gt_2_Years=1, Vehicle_Damage_Yes=1)
+
+
+def prediction_cache(**overrides) -> PredictionCache:
+    return PredictionCache(dataclasses.replace(VehiclePredictorConfig(), **{
+        "cache_enabled": True, "cache_max_entries": 100, "cache_max_bytes": 0, "cache_ttl_seconds": 0, **overrides}))
+
+
+def test_lookups_hit_stored_keys_and_miss_the_rest():
+    cache = prediction_cache()
+    cache.put_many(1, [("a",), ("b",)], [0, 1])
+
+    assert cache.get_many(1, [("a",), ("c",), ("b",)]) == [0, None, 1]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_newer_model_version_invalidates_every_entry():
+    cache = prediction_cache()
+    cache.put_many(1, [("a",), ("b",)], [0, 1])
+
+    assert cache.get_many(2, [("a",), ("b",)]) == [None, None]
+    assert cache.stats()["entries"] == 0 and cache.invalidations == 1
+
+    # a request still holding the old model neither reads nor refills the cache
+    cache.put_many(1, [("a",)], [0])
+    assert cache.get_many(1, [("a",)]) == [None]
+    assert cache.stats()["entries"] == 0 and cache.stats()["model_version"] == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = prediction_cache(cache_max_entries=2)
+    cache.put_many(1, [("a",), ("b",)], [0, 1])
+    cache.get_many(1, [("a",)])
+
+    cache.put_many(1, [("c",)], [1])
+
+    assert cache.get_many(1, [("a",), ("b",), ("c",)]) == [0, None, 1]
+    assert cache.evictions == 1
+
+
+def test_expired_entries_count_as_misses():
+    cache = prediction_cache(cache_ttl_seconds=1e-9)
+    cache.put_many(1, [("a",)], [0])
+
+    assert cache.get_many(1, [("a",)]) == [None]
+    assert cache.expirations == 1 and cache.stats()["entries"] == 0
+
+
+def test_classifier_scores_only_the_records_missing_from_the_cache():
+    config = dataclasses.replace(VehiclePredictorConfig(), cache_enabled=True)
+    model = AgeModel()
+    classifier = VehicleDataClassifier(config, model_cache=ModelCache(config, loader=lambda: model),
+                                       prediction_cache=PredictionCache(config))
+
+    assert classifier.predict_records([vehicle_record(30)]).tolist() == [30]
+    assert classifier.predict_records([vehicle_record(40), vehicle_record(30)]).tolist() == [40, 30]
+    assert model.scored == [[30], [40]]
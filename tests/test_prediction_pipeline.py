@@ -0,0 +1,21 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.pipline.prediction_pipeline import get_vehicle_input_frame_from_raw, vehicle_input_errors
+
+CSV_HEADER = ("Gender,Age,Driving_License,Region_Code,Previously_Insured,Annual_Premium,"
+              "Policy_Sales_Channel,Vintage,Vehicle_Age,Vehicle_Damage\n")
+
+
+def test_mostly_encoded_gender_column_only_flags_the_bad_row():
+    chunk = pd.read_csv(io.StringIO(CSV_HEADER + "1,44,1,28,0,40454,26,217,> 2 Years,Yes\n"
+                                                 "na,44,1,28,0,40454,26,217,> 2 Years,Yes\n"
+                                                 "0,21,1,3,1,2630,152,27,< 1 Year,No\n"
+                                                 "Male,30,1,8,0,33536,26,80,1-2 Year,No\n"))
+
+    input_df = get_vehicle_input_frame_from_raw(chunk)
+
+    np.testing.assert_array_equal(input_df["Gender"], [1.0, np.nan, 0.0, 1.0])
+    assert list(vehicle_input_errors(input_df)) == ["", "Missing or invalid value for Gender", "", ""]
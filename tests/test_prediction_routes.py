@@ -0,0 +1,138 @@
+import json
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from src.pipline.inference_executor import InferenceOverloadedError
+from src.pipline.prediction_pipeline import VehicleDataClassifier
+
+VALID_RECORD = {
+    "Gender": 1, "Age": 44, "Driving_License": 1, "Region_Code": 28.0, "Previously_Insured": 0,
+    "Annual_Premium": 40454.0, "Policy_Sales_Channel": 26.0, "Vintage": 217,
+    "Vehicle_Age_lt_1_Year": 0, "Vehicle_Age_gt_2_Years": 1, "Vehicle_Damage_Yes": 1,
+}
+
+
+@pytest.fixture
+def client():
+    # without the context manager the lifespan does not run, so no model is loaded from S3
+    with mock.patch.object(app_module, "predict_records", lambda records: np.ones(len(records), dtype=np.int64)):
+        yield TestClient(app_module.app)
+
+
+def test_form_scores_a_valid_record(client):
+    response = client.post("/", data={column: str(value) for column, value in VALID_RECORD.items()})
+
+    assert response.status_code == 200
+    assert "Response-Yes" in response.text
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-Infinity"])
+def test_form_rejects_non_finite_values(client, value):
+    response = client.post("/", data={**{column: str(v) for column, v in VALID_RECORD.items()}, "Age": value})
+
+    assert response.json() == {"status": False, "error": f"Invalid value for Age: {value!r}"}
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity"])
+def test_batch_rejects_non_finite_values(client, value):
+    # json.dumps writes float("nan") as NaN, which the JSON parser of the route accepts
+    body = json.dumps({"records": [VALID_RECORD, {**VALID_RECORD, "Annual_Premium": float(value)}]})
+
+    response = client.post("/predict/batch", content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "records", 1, "Annual_Premium"]
+
+
+def test_batch_scores_valid_records(client):
+    response = client.post("/predict/batch", json={"records": [VALID_RECORD, VALID_RECORD]})
+
+    assert response.status_code == 200
+    assert response.json() == {"predictions": [1, 1], "labels": ["Response-Yes", "Response-Yes"]}
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (InferenceOverloadedError("inference queue is full"), 503),
+    (TimeoutError("inference timed out"), 504),
+])
+def test_form_and_batch_map_overload_errors(client, error, status_code):
+    with mock.patch.object(app_module.inference_executor, "run", side_effect=error):
+        form_response = client.post("/", data={column: str(value) for column, value in VALID_RECORD.items()})
+        batch_response = client.post("/predict/batch", json={"records": [VALID_RECORD]})
+
+    assert (form_response.status_code, batch_response.status_code) == (status_code, status_code)
+    assert form_response.json() == {"status": False, "error": f"{error}"}
+
+
+def test_batch_hands_the_served_request_to_the_shadow_scorer(client):
+    with mock.patch.object(app_module, "shadow_scorer") as shadow_scorer:
+        shadow_scorer.enabled = True
+        response = client.post("/predict/batch", json={"records": [VALID_RECORD, VALID_RECORD]})
+
+    assert response.json()["predictions"] == [1, 1]
+    route, records, predictions = shadow_scorer.submit.call_args.args
+    assert (route, len(records), predictions.tolist()) == ("/predict/batch", 2, [1, 1])
+
+
+def msgpack_body(**overrides):
+    msgpack = pytest.importorskip("msgpack")
+    return msgpack.packb({"columns": {column: [overrides.get(column, value)] for column, value in VALID_RECORD.items()}})
+
+
+def post_bulk(client, body, content_type="application/msgpack", **headers):
+    return client.post("/predict/bulk", content=body, headers={"Content-Type": content_type, **headers})
+
+
+@pytest.mark.parametrize("content_type, headers, status_code", [
+    ("text/plain", {}, 415),
+    ("application/msgpack", {"Accept": "text/html"}, 406),
+])
+def test_bulk_rejects_unsupported_formats(client, content_type, headers, status_code):
+    assert post_bulk(client, msgpack_body(), content_type, **headers).status_code == status_code
+
+
+def test_bulk_maps_client_errors(client):
+    assert post_bulk(client, b"\xc1 not msgpack").status_code == 400
+    assert post_bulk(client, msgpack_body(Age=float("nan"))).status_code == 422
+    with mock.patch.object(app_module, "PREDICTION_BULK_MAX_BYTES", 16):
+        response = post_bulk(client, msgpack_body())
+    assert response.status_code == 413
+
+
+def test_bulk_answers_500_when_the_model_fails(client):
+    with mock.patch.object(VehicleDataClassifier, "predict_columns", side_effect=RuntimeError("model file is corrupt")):
+        response = post_bulk(client, msgpack_body())
+
+    assert response.status_code == 500
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (InferenceOverloadedError("inference queue is full"), 503),
+    (TimeoutError("inference timed out"), 504),
+])
+def test_bulk_maps_overload_errors(client, error, status_code):
+    with mock.patch.object(app_module, "score_columnar_request", side_effect=error):
+        response = post_bulk(client, msgpack_body())
+
+    assert response.status_code == status_code
+
+
+def post_csv(client, frame):
+    return client.post("/predict/csv", files={"file": ("vehicles.csv", frame.to_csv(index=False), "text/csv")})
+
+
+def test_csv_maps_errors(client):
+    frame = pd.DataFrame([VALID_RECORD, VALID_RECORD])
+    with mock.patch.object(VehicleDataClassifier, "predict", lambda self, dataframe: np.ones(len(dataframe))):
+        assert post_csv(client, frame).status_code == 200
+        response = post_csv(client, frame.drop(columns=["Vintage"]))
+    assert response.status_code == 400
+    assert response.json()["error"] == "Missing vehicle columns ['Vintage']"
+
+    with mock.patch.object(VehicleDataClassifier, "predict", side_effect=RuntimeError("model file is corrupt")):
+        assert post_csv(client, frame).status_code == 500
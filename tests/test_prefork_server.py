@@ -0,0 +1,83 @@
+import collections
+import http.client
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from src.metrics import CONTENT_TYPE_LATEST, registry
+from src.pipline.model_cache import ModelCache
+from src.pipline.prefork_server import PreforkServer
+
+PING_TOTAL = registry.counter("test_prefork_pings_total", "Pings answered by the test app")
+
+
+def serve(port: int, metrics_dir: str) -> None:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        PING_TOTAL.inc()
+        return PlainTextResponse(str(os.getpid()))
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+    PreforkServer(app, host="127.0.0.1", port=port, workers=2, model_cache=ModelCache(loader=object),
+                  log_level="warning", metrics_dir=metrics_dir, metrics_snapshot_seconds=0.1).run()
+
+
+def get(port: int, path: str) -> str:
+    # a new connection per request, so every request may be accepted by another worker
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.request("GET", path)
+        return connection.getresponse().read().decode()
+    finally:
+        connection.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="the prefork server needs fork")
+def test_every_worker_answers_metrics_with_the_counts_of_all_workers(tmp_path):
+    port = free_port()
+    server = multiprocessing.get_context("fork").Process(target=serve, args=(port, str(tmp_path)))
+    server.start()
+    try:
+        deadline = time.monotonic() + 30
+        while len(list(tmp_path.glob("worker-*.json"))) < 2 or not _accepts(port):
+            assert time.monotonic() < deadline, "prefork workers did not start"
+            time.sleep(0.05)
+
+        answered_by = collections.Counter(get(port, "/ping") for _ in range(40))
+        time.sleep(0.5)  # a few snapshot intervals, every worker has written its count
+
+        for _ in range(10):
+            counts = re.findall(r'^test_prefork_pings_total\{worker="([01])"\} (\S+)$', get(port, "/metrics"),
+                                flags=re.MULTILINE)
+            assert sum(float(count) for _, count in counts) == 40
+            assert sorted(float(count) for _, count in counts) == sorted(map(float, answered_by.values()))
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join(timeout=30)
+    assert server.exitcode == 0
+
+
+def _accepts(port: int) -> bool:
+    try:
+        get(port, "/metrics")
+    except OSError:
+        return False
+    return True
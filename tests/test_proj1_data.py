@@ -0,0 +1,53 @@
+import types
+
+import pandas as pd
+import pytest
+
+from src.constants import DATABASE_NAME
+from src.data_access.proj1_data import Proj1Data
+from src.utils.main_utils import read_dataframe
+
+mongomock = pytest.importorskip("mongomock")
+
+COLLECTION_NAME = "vehicles"
+
+
+@pytest.fixture
+def proj1_data():
+    client = mongomock.MongoClient()
+    documents = [{"id": index, "Age": 20 + index % 60, "Response": index % 2} for index in range(1, 1001)]
+    for index in range(0, 1000, 40):
+        del documents[index]["id"]
+    for index in range(5, 1000, 100):
+        documents[index]["id"] = None
+    client[DATABASE_NAME][COLLECTION_NAME].insert_many(documents)
+    return Proj1Data(mongo_client=types.SimpleNamespace(client=client, database=client[DATABASE_NAME]))
+
+
+@pytest.mark.parametrize("key", ["_id", "id"])
+def test_partition_queries_cover_every_document_once(proj1_data, key):
+    collection = proj1_data._get_collection(COLLECTION_NAME)
+
+    queries = proj1_data.partition_queries(COLLECTION_NAME, partitions=4, key=key)
+
+    counts = [collection.count_documents(query) for query in queries]
+    assert sum(counts) == 1000
+    matched = [document["_id"] for query in queries for document in collection.find(query, {"_id": 1})]
+    assert len(set(matched)) == 1000
+    if key == "id":
+        # 25 documents without id and 10 with a null id
+        assert queries[0] == {"id": None} and counts[0] == 35
+    # the sampled boundaries split the keyed documents roughly evenly
+    assert min(counts[-4:]) > 150
+
+
+def test_shard_export_keeps_documents_without_the_key(proj1_data, tmp_path):
+    shard_paths = proj1_data.export_collection_to_shards(COLLECTION_NAME, str(tmp_path / "shards"), workers=2,
+                                                         partitions=4, key="id")
+    serial_path = str(tmp_path / "serial.parquet")
+    proj1_data.export_collection_to_file(COLLECTION_NAME, serial_path, sort_key="id")
+
+    sharded = pd.concat([read_dataframe(shard_path, column_types={}) for shard_path in shard_paths],
+                        ignore_index=True)
+    assert len(sharded) == 1000
+    assert sharded["_id"].tolist() == read_dataframe(serial_path, column_types={})["_id"].tolist()
@@ -0,0 +1,87 @@
+import dataclasses
+import threading
+
+import numpy as np
+
+from src.entity.config_entity import VehiclePredictorConfig
+from src.pipline.model_cache import ModelCache
+from src.pipline.prediction_pipeline import VehicleRecord
+from src.pipline.shadow_scorer import ShadowScorer
+
+RECORD = VehicleRecord(Gender=1, Age=44, Driving_License=1, Region_Code=28.0, Previously_Insured=0,
+                       Annual_Premium=40454.0, Policy_Sales_Channel=26.0, Vintage=217,
+                       Vehicle_Age_lt_1_Year=0, Vehicle_Age_gt_2_Years=1, Vehicle_Damage_Yes=1)
+
+
+class ChallengerModel:
+    def __init__(self, label: int = 1) -> None:
+        self.label = label
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict_records(self, records):
+        self.started.set()
+        self.release.wait()
+        return np.full(len(records), self.label)
+
+
+def shadow_scorer(model, **overrides) -> ShadowScorer:
+    config = dataclasses.replace(VehiclePredictorConfig(), **{
+        "shadow_enabled": True, "shadow_sample_rate": 1.0, "shadow_max_queue": 8, "shadow_buffer_size": 16,
+        **overrides})
+    return ShadowScorer(config, model_cache=ModelCache(config, loader=lambda: model))
+
+
+def test_challenger_predictions_are_kept_next_to_the_champion():
+    scorer = shadow_scorer(ChallengerModel(label=1))
+
+    assert scorer.submit("/predict/batch", [RECORD, RECORD], np.array([1, 0]))
+    scorer.stop()
+
+    results = scorer.results(drain=True)
+    assert [(row["route"], row["champion"], row["challenger"]) for row in results] == [
+        ("/predict/batch", 1, 1), ("/predict/batch", 0, 1)]
+    assert results[0]["features"][1] == 44.0
+    assert scorer.stats()["agreement"] == 0.5
+    assert scorer.results() == []
+
+
+def test_full_queue_drops_the_request_instead_of_blocking():
+    model = ChallengerModel()
+    model.release.clear()
+    scorer = shadow_scorer(model, shadow_max_queue=1)
+
+    try:
+        assert scorer.submit("/", [RECORD], [1])
+        assert model.started.wait(5)
+        # the worker is busy with the first request, the second fills the queue of one
+        assert scorer.submit("/", [RECORD], [1])
+        assert not scorer.submit("/", [RECORD], [1])
+    finally:
+        model.release.set()
+        scorer.stop()
+
+    assert (scorer.submitted, scorer.dropped, scorer.scored) == (2, 1, 2)
+
+
+def test_failing_challenger_is_counted_and_skipped():
+    def broken_loader():
+        raise RuntimeError("challenger model missing")
+
+    config = dataclasses.replace(VehiclePredictorConfig(), shadow_enabled=True, shadow_sample_rate=1.0)
+    scorer = ShadowScorer(config, model_cache=ModelCache(config, loader=broken_loader))
+
+    assert scorer.submit("/", [RECORD], [1])
+    scorer.stop()
+
+    assert (scorer.scored, scorer.failed) == (0, 1)
+    assert scorer.results() == []
+
+
+def test_disabled_or_sampled_out_requests_are_not_queued():
+    assert not shadow_scorer(ChallengerModel(), shadow_enabled=False).submit("/", [RECORD], [1])
+
+    scorer = shadow_scorer(ChallengerModel(), shadow_sample_rate=0.0)
+    assert not scorer.submit("/", [RECORD], [1])
+    assert (scorer.sampled_out, scorer.is_running) == (1, False)